@@ -34,7 +34,10 @@ async function loadProfile() {
     document.getElementById("accountName").value = profile.beneficiary_name || "";
 
     if (profile.profile_picture) {
-      document.getElementById("profile-image").src = profile.profile_picture;
+      const profileImage = document.getElementById("profile-image");
+      // ✅ Smallest variant is plenty for the avatar; fall back to the upload
+      const variant = (profile.profile_picture_srcset || {})["160w"];
+      profileImage.src = variant || profile.profile_picture;
     }
   } catch (err) {
     console.error(err);
@@ -98,21 +101,22 @@ async function loadDashboard() {
 }
 
 // ================= CASHOUT =================
-async function loadCashoutHistory() {
+let cashoutNextPage = null;
+
+async function loadCashoutHistory(url = `${API_BASE}/cashout/history/`) {
   try {
-    // ✅ use POST with action=history
-    const res = await fetch(`${API_BASE}/cashout/`, {
-      method: "POST",
-      headers: authHeaders({ "Content-Type": "application/json" }),
-      body: JSON.stringify({ action: "history" })
+    // ✅ paginated GET; "next" holds the cursor for the following page
+    const res = await fetch(url, {
+      headers: authHeaders()
     });
     if (!res.ok) throw new Error("Failed to fetch cashout history");
 
-    const data = await res.json(); 
-    const history = data.cashout_history || [];
+    const data = await res.json();
+    const history = data.results || [];
+    cashoutNextPage = data.next;
 
     const tbody = document.getElementById("cashoutTableBody");
-    tbody.innerHTML = "";
+    if (url === `${API_BASE}/cashout/history/`) tbody.innerHTML = "";
     history.forEach(row => {
       tbody.innerHTML += `
         <tr>
@@ -130,6 +134,11 @@ async function loadCashoutHistory() {
   }
 }
 
+function loadMoreCashoutHistory() {
+  if (cashoutNextPage) loadCashoutHistory(cashoutNextPage);
+}
+window.loadMoreCashoutHistory = loadMoreCashoutHistory;
+
 // Cashout form submit with validation
 document.getElementById("cashoutForm").addEventListener("submit", async (e) => {
   e.preventDefault();
@@ -176,8 +185,11 @@ async function loadMarketingMaterials() {
     videoList.innerHTML = "";
     pictureList.innerHTML = "";
 
+    // download_url resumes interrupted downloads (HTTP Range)
+    const origin = new URL(API_BASE).origin;
     (data.video || []).forEach(v => {
-      videoList.innerHTML += `<video controls src="${v.file}"></video>`;
+      videoList.innerHTML += `<video controls src="${v.file}"></video>
+        <a href="${origin}${v.download_url}" download>Download</a>`;
     });
 
     (data.image || []).forEach(p => {
@@ -1,4 +1,4 @@
-const API_URL = "http://127.0.0.1:8000/api/accounts/login/";
+const API_URL = "http://127.0.0.1:8000/api/accounts/async/login/";
 const errormessage = document.getElementById("errormessage");
 
 document.addEventListener("DOMContentLoaded", () => {
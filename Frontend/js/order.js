@@ -4,7 +4,6 @@ document.addEventListener("DOMContentLoaded", function () {
   const params = new URLSearchParams(window.location.search);
   const productId = params.get("product_id");
   const ref = params.get("ref"); // affiliate username
-  const token = localStorage.getItem("access");
 
   if (!productId || !ref) {
     alert("Invalid order link.");
@@ -16,15 +15,10 @@ document.addEventListener("DOMContentLoaded", function () {
   const productPriceEl = document.getElementById("productPrice");
   const bankDetailsEl = document.getElementById("bankDetails");
 
-  // ✅ Fetch product details
-  fetch(`http://127.0.0.1:8000/api/accounts/products/`, {
-    headers: {
-      Authorization: `Bearer ${token}`,
-    },
-  })
-    .then((res) => res.json())
-    .then((products) => {
-      const product = products.find((p) => p.id == productId);
+  // ✅ Fetch product details (public endpoint)
+  fetch(`http://127.0.0.1:8000/api/accounts/async/products/${productId}/`)
+    .then((res) => (res.ok ? res.json() : null))
+    .then((product) => {
       if (product) {
         productNameEl.textContent = product.name;
         productPriceEl.textContent = parseFloat(product.price).toLocaleString();
@@ -47,6 +41,23 @@ document.addEventListener("DOMContentLoaded", function () {
   const orderForm = document.getElementById("orderForm");
   const messageDiv = document.getElementById("message");
 
+  function uploadProof(file) {
+    return fetch("http://127.0.0.1:8000/api/accounts/orders/proof-upload/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ content_type: file.type, size: file.size }),
+    })
+      .then((res) => (res.status === 201 ? res.json() : null))
+      .then((slot) => {
+        if (!slot) return null;
+        const upload = new FormData();
+        Object.entries(slot.fields).forEach(([key, value]) => upload.append(key, value));
+        upload.append("file", file); // must come after the policy fields
+        return fetch(slot.url, { method: "POST", body: upload }).then((res) => (res.ok ? slot.token : null));
+      })
+      .catch(() => null);
+  }
+
   orderForm.addEventListener("submit", function (e) {
     e.preventDefault();
 
@@ -59,20 +70,26 @@ document.addEventListener("DOMContentLoaded", function () {
       return;
     }
 
-    const formData = new FormData();
-    formData.append("product", productId);
-    formData.append("buyer_phone", buyerPhone);
-    formData.append("payment_method", paymentMethod);
-    formData.append("proof_of_payment", proofOfPayment);
-    formData.append("affiliate_username", ref);
+    // Send the proof straight to the media bucket when the server offers a
+    // slot (404 means local storage), else upload it with the order
+    uploadProof(proofOfPayment)
+      .then((proofToken) => {
+        const formData = new FormData();
+        formData.append("product", productId);
+        formData.append("buyer_phone", buyerPhone);
+        formData.append("payment_method", paymentMethod);
+        if (proofToken) {
+          formData.append("proof_upload", proofToken);
+        } else {
+          formData.append("proof_of_payment", proofOfPayment);
+        }
+        formData.append("affiliate_username", ref);
 
-    fetch("http://127.0.0.1:8000/api/accounts/orders/", {
-      method: "POST",
-      headers: {
-        Authorization: `Bearer ${token}`,
-      },
-      body: formData,
-    })
+        return fetch("http://127.0.0.1:8000/api/accounts/async/orders/", {
+          method: "POST",
+          body: formData,
+        });
+      })
       .then((res) => res.json().then((data) => ({ status: res.status, body: data })))
       .then(({ status, body }) => {
         if (status === 201) {
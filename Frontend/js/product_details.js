@@ -4,6 +4,7 @@ document.addEventListener("DOMContentLoaded", function () {
   const params = new URLSearchParams(window.location.search);
   const productId = params.get("product_id");
   const ref = params.get("ref"); // affiliate username
+  const linkToken = params.get("t"); // signature from the affiliate link
   const token = localStorage.getItem("access");
 
   if (!productId) {
@@ -12,6 +13,16 @@ document.addEventListener("DOMContentLoaded", function () {
     return;
   }
 
+  // ✅ Count the visit for the affiliate (fire-and-forget)
+  if (ref && linkToken) {
+    const click = JSON.stringify({ ref: ref, product: productId, t: linkToken });
+    const clickUrl = "http://127.0.0.1:8000/api/accounts/clicks/";
+    if (!(navigator.sendBeacon && navigator.sendBeacon(clickUrl, new Blob([click], { type: "application/json" })))) {
+      fetch(clickUrl, { method: "POST", headers: { "Content-Type": "application/json" }, body: click, keepalive: true })
+        .catch(() => {});
+    }
+  }
+
   fetch(`http://127.0.0.1:8000/api/accounts/products/${productId}/`, {
     method: "GET",
     headers: {
@@ -27,16 +38,20 @@ document.addEventListener("DOMContentLoaded", function () {
       const detailsDiv = document.getElementById("productDetails");
 
       const price = parseFloat(product.price).toLocaleString();
-      const affiliateLink = `product_details.html?product_id=${product.id}&ref=${ref}`;
+      const affiliateLink = `product_details.html?product_id=${product.id}&ref=${ref}` +
+        (linkToken ? `&t=${linkToken}` : "");
 
       const imageUrl = product.picture
         ? product.picture
         : "https://via.placeholder.com/600x400?text=No+Image";
+      const srcset = Object.entries(product.picture_srcset || {})
+        .map(([width, url]) => `${url} ${width}`)
+        .join(", ");
 
       detailsDiv.innerHTML = `
         <div class="row g-4">
           <div class="col-md-6">
-            <img src="${imageUrl}" class="img-fluid product-image rounded" alt="${product.name}">
+            <img src="${imageUrl}" srcset="${srcset}" sizes="(min-width: 768px) 50vw, 100vw" class="img-fluid product-image rounded" alt="${product.name}">
           </div>
           <div class="col-md-6">
             <h3>${product.name}</h3>
@@ -2,7 +2,6 @@
 
 document.addEventListener("DOMContentLoaded", function () {
   const token = localStorage.getItem("access");
-  const username = localStorage.getItem("username"); // ✅ unique identifier
 
   if (!token) {
     alert("You must login to view products.");
@@ -10,63 +9,102 @@ document.addEventListener("DOMContentLoaded", function () {
     return;
   }
 
-  fetch("http://127.0.0.1:8000/api/accounts/products/", {
-    method: "GET",
-    headers: {
-      Authorization: `Bearer ${token}`,
-      "Content-Type": "application/json",
-    },
-  })
-    .then((res) => {
-      if (!res.ok) {
-        return res.text().then((text) => {
-          throw new Error(`Failed to load products: ${res.status} ${text}`);
-        });
-      }
-      return res.json();
-    })
-    .then((products) => {
-      const productGrid = document.getElementById("productGrid");
+  const productGrid = document.getElementById("productGrid");
+  const loadMoreBtn = document.getElementById("loadMoreProducts");
+  const fields = "id,name,price,commission_amount,picture,picture_srcset";
+  let nextPage = `http://127.0.0.1:8000/api/accounts/products/?page_size=24&fields=${fields}`;
+  // ✅ Signed ref and token per product, from the server's affiliate links
+  let linkParams = {};
 
-      if (!products || products.length === 0) {
-        productGrid.innerHTML = "<p>No products available.</p>";
-        return;
-      }
+  function renderProducts(products) {
+    products.forEach((product) => {
+      const card = document.createElement("div");
+      card.className = "col";
 
-      products.forEach((product) => {
-        const card = document.createElement("div");
-        card.className = "col";
+      const price = parseFloat(product.price).toLocaleString();
+      const commission = parseFloat(product.commission_amount).toLocaleString();
 
-        const price = parseFloat(product.price).toLocaleString();
-        const commission = parseFloat(product.commission_amount).toLocaleString();
+      // ✅ Now point to frontend details page; the token lets the visit count as a click
+      const affiliateLink = `product_details.html?product_id=${product.id}&${linkParams[product.id] || ""}`;
 
-        // ✅ Now point to frontend details page
-        const affiliateLink = `product_details.html?product_id=${product.id}&ref=${username}`;
+      const imageUrl = product.picture
+        ? product.picture
+        : "https://via.placeholder.com/300x200?text=No+Image";
+      // ✅ Let the browser pick a resized variant instead of the full upload
+      const srcset = Object.entries(product.picture_srcset || {})
+        .map(([width, url]) => `${url} ${width}`)
+        .join(", ");
 
-        const imageUrl = product.picture
-          ? product.picture
-          : "https://via.placeholder.com/300x200?text=No+Image";
-
-        card.innerHTML = `
-          <div class="card h-100">
-            <img src="${imageUrl}" class="card-img-top" alt="${product.name}" style="height:200px; object-fit:cover;">
-            <div class="card-body d-flex flex-column">
-              <h5 class="card-title">${product.name}</h5>
-              <p class="card-text"><strong>Price:</strong> ₦${price}</p>
-              <p class="card-text"><strong>Commission:</strong> ₦${commission}</p>
-              <p class="affiliate-link mt-auto"><strong>Link:</strong><br>
-                <a href="${affiliateLink}" target="_blank">${affiliateLink}</a>
-              </p>
-              <a href="${affiliateLink}" class="btn btn-primary mt-2">Promote</a>
-            </div>
+      card.innerHTML = `
+        <div class="card h-100">
+          <img src="${imageUrl}" srcset="${srcset}" sizes="(min-width: 992px) 25vw, (min-width: 576px) 50vw, 100vw" class="card-img-top" alt="${product.name}" style="height:200px; object-fit:cover;" loading="lazy">
+          <div class="card-body d-flex flex-column">
+            <h5 class="card-title">${product.name}</h5>
+            <p class="card-text"><strong>Price:</strong> ₦${price}</p>
+            <p class="card-text"><strong>Commission:</strong> ₦${commission}</p>
+            <p class="affiliate-link mt-auto"><strong>Link:</strong><br>
+              <a href="${affiliateLink}" target="_blank">${affiliateLink}</a>
+            </p>
+            <a href="${affiliateLink}" class="btn btn-primary mt-2">Promote</a>
           </div>
-        `;
+        </div>
+      `;
+
+      productGrid.appendChild(card);
+    });
+  }
+
+  // ✅ Products are paginated: load one page at a time
+  function loadProducts() {
+    if (!nextPage) return;
+
+    fetch(nextPage, {
+      method: "GET",
+      headers: {
+        Authorization: `Bearer ${token}`,
+        "Content-Type": "application/json",
+      },
+    })
+      .then((res) => {
+        if (!res.ok) {
+          return res.text().then((text) => {
+            throw new Error(`Failed to load products: ${res.status} ${text}`);
+          });
+        }
+        return res.json();
+      })
+      .then((page) => {
+        const products = page.results || [];
+        nextPage = page.next;
+        loadMoreBtn.style.display = nextPage ? "inline-block" : "none";
+
+        if (products.length === 0 && productGrid.children.length === 0) {
+          productGrid.innerHTML = "<p>No products available.</p>";
+          return;
+        }
 
-        productGrid.appendChild(card);
+        renderProducts(products);
+      })
+      .catch((error) => {
+        console.error("Error:", error);
+        alert("Could not load products. Please try again.");
       });
+  }
+
+  function loadLinks() {
+    return fetch("http://127.0.0.1:8000/api/accounts/affiliate-links/", {
+      headers: { Authorization: `Bearer ${token}` },
     })
-    .catch((error) => {
-      console.error("Error:", error);
-      alert("Could not load products. Please try again.");
-    });
+      .then((res) => (res.ok ? res.json() : []))
+      .then((links) => {
+        links.forEach((link) => {
+          const params = new URL(link.link).searchParams;
+          linkParams[link.product_id] = new URLSearchParams({ ref: params.get("ref"), t: params.get("t") }).toString();
+        });
+      })
+      .catch((error) => console.error("Error loading affiliate links:", error));
+  }
+
+  loadMoreBtn.addEventListener("click", loadProducts);
+  loadLinks().then(loadProducts);
 });
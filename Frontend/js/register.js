@@ -21,7 +21,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     try {
-      const response = await fetch("http://127.0.0.1:8000/api/accounts/register/", {
+      const response = await fetch("http://127.0.0.1:8000/api/accounts/async/register/", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ username, phone, email, password }),
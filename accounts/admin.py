@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils.html import format_html
+from . import approvals
 from .models import (
     CustomUser, Order, Commission, MarketingMaterial,
     Product, AffiliateLink, CashoutRequest, Referral
@@ -8,21 +10,31 @@ from .models import (
 # --------------------- ORDER ---------------------
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "product", "affiliate", "buyer_phone", "payment_method", "status", "created_at")
+    list_display = ("id", "proof_preview", "product", "affiliate", "buyer_phone", "payment_method", "status", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("affiliate__username", "buyer_phone", "product__name")
+    list_select_related = ("product", "affiliate")
     actions = ["approve_orders", "reject_orders"]
 
-    # Bulk approval (action)
+    # Small thumbnail written by the background re-encode (accounts/proofs.py)
+    @admin.display(description="Proof")
+    def proof_preview(self, obj):
+        if obj.proof_thumbnail:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" width="48" height="48" alt="proof"></a>',
+                obj.proof_of_payment.url, obj.proof_thumbnail.url,
+            )
+        if obj.proof_of_payment:
+            return format_html('<a href="{}" target="_blank">view</a>', obj.proof_of_payment.url)
+        return "—"
+
+    # Bulk approval (action) — set-based, see accounts.approvals
     def approve_orders(self, request, queryset):
-        created_count = 0
-        for order in queryset:
-            if order.status == "pending":
-                order.status = "approved"
-                order.save()
-                if self._approve_order(order):
-                    created_count += 1
-        self.message_user(request, f"✅ {created_count} commissions created.")
+        counts = approvals.approve_orders(queryset)
+        self.message_user(
+            request,
+            f"✅ {counts['approved']} orders approved, {counts['commissions']} commissions created."
+        )
     approve_orders.short_description = "Approve selected orders & credit commission"
 
     def reject_orders(self, request, queryset):
@@ -38,23 +50,25 @@ class OrderAdmin(admin.ModelAdmin):
 
     # Shared commission creation logic
     def _approve_order(self, order):
-        # Prevent duplicate commissions
-        if not Commission.objects.filter(
-            user=order.affiliate,
-            sale_reference=f"Order {order.id} - {order.product.name}"
-        ).exists():
-            Commission.objects.create(
-                user=order.affiliate,
-                amount=order.product.commission_amount,
-                commission_type="flat",
-                status="pending",
-                sale_reference=f"Order {order.id} - {order.product.name}"
+        # Prevent duplicate commissions via the (order, user) unique constraint;
+        # the Commission post_save receiver credits each user's balance
+        splits = approvals.commission_splits(
+            order.affiliate_id, order.affiliate.referral_path, order.product.commission_amount
+        )
+        created_any = False
+        for user_id, amount, level in splits:
+            _, created = Commission.objects.get_or_create(
+                order=order,
+                user_id=user_id,
+                defaults={
+                    "amount": amount,
+                    "commission_type": "referral" if level else "flat",
+                    "status": "pending",
+                    "sale_reference": approvals.sale_reference(order.id, order.product.name, level),
+                },
             )
-            # Update affiliate commission balance
-            order.affiliate.commission_balance += order.product.commission_amount
-            order.affiliate.save()
-            return True
-        return False
+            created_any |= created
+        return created_any
 
 
 # --------------------- REFERRAL ---------------------
@@ -97,8 +111,9 @@ class CommissionAdmin(admin.ModelAdmin):
 # --------------------- CUSTOM USER ---------------------
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
-    list_display = ('email', 'username', 'is_staff', 'is_active')
+    list_display = ('email', 'username', 'is_staff', 'is_active', 'date_joined')
     list_filter = ('is_staff', 'is_active', 'groups')
+    actions = ["approve_users"]
     fieldsets = (
         (None, {'fields': ('email', 'username', 'password', 'profile_picture')}),
         ('Bank Details', {'fields': ('bank_name', 'bank_account', 'beneficiary_name')}),
@@ -113,6 +128,23 @@ class CustomUserAdmin(UserAdmin):
     )
     search_fields = ('email', 'username')
     ordering = ('email',)
+    # Moved only by F() credits and debits (accounts/balances.py); save() never writes it
+    readonly_fields = ('commission_balance',)
+
+    # Bulk approval (action) — set-based, see accounts.approvals
+    def approve_users(self, request, queryset):
+        counts = approvals.approve_users(queryset)
+        self.message_user(
+            request,
+            f"✅ {counts['approved']} users approved, {counts['referrals']} referrals recorded."
+        )
+    approve_users.short_description = "Approve selected users"
+
+    # Single user approval (form save)
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and obj.is_active and "is_active" in form.changed_data:
+            approvals.users_approved([(obj.pk, obj.referred_by_id)])
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -121,6 +153,6 @@ admin.site.register(CustomUser, CustomUserAdmin)
 # --------------------- MARKETING MATERIAL ---------------------
 @admin.register(MarketingMaterial)
 class MarketingMaterialAdmin(admin.ModelAdmin):
-    list_display = ("title", "material_type", "uploaded_at")
+    list_display = ("title", "material_type", "uploaded_at", "download_count")
     list_filter = ("material_type", "uploaded_at")
     search_fields = ("title",)
@@ -0,0 +1,168 @@
+# accounts/approvals.py
+from collections import defaultdict
+from decimal import ROUND_DOWN, Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import background, balances, ledger, onboarding, referral_tree
+from .authentication import user_cache
+from .models import Commission, CustomUser, Order, Referral
+
+
+CENT = Decimal("0.01")
+
+
+def sale_reference(order_id, product_name, level=0):
+    reference = f"Order {order_id} - {product_name}"
+    return f"{reference} (referral level {level})" if level else reference
+
+
+def check_commission_rates(rates):
+    """Raise ImproperlyConfigured unless every rate is in [0, 1] and together they leave the affiliate a share."""
+    listed = ",".join(str(rate) for rate in rates)
+    if any(not 0 <= rate <= 1 for rate in rates):
+        raise ImproperlyConfigured(f"REFERRAL_COMMISSION_RATES must each be between 0 and 1, got {listed}")
+    if sum(rates) > 1:
+        raise ImproperlyConfigured(f"REFERRAL_COMMISSION_RATES add up to more than 1: {listed}")
+
+
+def commission_splits(affiliate_id, referral_path, amount):
+    """
+    How one order's commission is shared, as ``[(user_id, amount, level)]``.
+
+    Level 0 is the affiliate; level n is their n-th referrer up the tree
+    (``referral_path``, accounts/referral_tree.py), paid
+    ``REFERRAL_COMMISSION_RATES[n - 1]`` of ``amount``, rounded down to the
+    cent. The affiliate keeps the rest.
+    """
+    uplines = []
+    for level, (user_id, rate) in enumerate(
+        zip(referral_tree.ancestor_ids(referral_path), settings.REFERRAL_COMMISSION_RATES), start=1
+    ):
+        share = (amount * rate).quantize(CENT, rounding=ROUND_DOWN)
+        if share:
+            uplines.append((user_id, share, level))
+    return [(affiliate_id, amount - sum(share for _, share, _ in uplines), 0)] + uplines
+
+
+def approve_orders(queryset):
+    """
+    Approve every pending order in ``queryset`` and credit its commission,
+    split up the affiliate's referral tree (:func:`commission_splits`).
+
+    Set-based: one status UPDATE, one ``bulk_create`` of Commissions, one
+    per-user balance UPDATE and a bounded ledger update, all in one
+    transaction, so the query count does not grow with the batch size.
+    Commissions go in with ON CONFLICT DO NOTHING against the (order, user)
+    unique index, and only the rows actually inserted are credited.
+    ``bulk_create`` skips the Commission post_save receivers, so the balance
+    and DailyLedger are credited here instead.
+
+    Returns ``{"approved": ..., "commissions": ...}``.
+    """
+    with transaction.atomic():
+        # Lock the order rows alone: FOR UPDATE on a joined query would lock
+        # the products and affiliates too (of= is ignored on values_list())
+        locked = list(
+            Order.objects.filter(pk__in=queryset.values("pk"), status="pending")
+            .select_for_update()
+            .values_list("id", flat=True)
+        )
+        if not locked:
+            return {"approved": 0, "commissions": 0}
+        orders = list(Order.objects.filter(pk__in=locked).values_list(
+            "id", "affiliate_id", "affiliate__referral_path", "product__name", "product__commission_amount"
+        ))
+
+        approved = Order.objects.filter(pk__in=locked, status="pending").update(status="approved")
+
+        commissions = [
+            Commission(
+                user_id=user_id,
+                order_id=order_id,
+                amount=amount,
+                commission_type="referral" if level else "flat",
+                status="pending",
+                sale_reference=sale_reference(order_id, product_name, level),
+            )
+            for order_id, affiliate_id, referral_path, product_name, commission_amount in orders
+            for user_id, amount, level in commission_splits(affiliate_id, referral_path, commission_amount)
+        ]
+        # Rows skipped as duplicates get no pk back, so read the inserted ones
+        # from above the previous highest id (the orders are locked meanwhile)
+        watermark = Commission.objects.aggregate(last=Max("pk"))["last"] or 0
+        Commission.objects.bulk_create(commissions, ignore_conflicts=True)
+        inserted = Commission.objects.filter(
+            order_id__in=locked, pk__gt=watermark
+        ).values_list("user_id", "amount")
+
+        credits = defaultdict(Decimal)
+        count = 0
+        for user_id, amount in inserted:
+            credits[user_id] += amount
+            count += 1
+        balances.credit_many(credits)
+        ledger.record_many(
+            timezone.localdate(),
+            {user_id: (amount, ledger.ZERO) for user_id, amount in credits.items()},
+        )
+
+    return {"approved": approved, "commissions": count}
+
+
+def record_referrals(users):
+    """
+    Bulk-create the Referral rows missing for ``(user_id, referred_by_id)``
+    pairs; users without a referrer are skipped. Returns how many were created.
+    """
+    pairs = {(referrer_id, user_id) for user_id, referrer_id in users if referrer_id}
+    if not pairs:
+        return 0
+    existing = set(Referral.objects.filter(
+        referred_user_id__in=[user_id for _, user_id in pairs]
+    ).values_list("user_id", "referred_user_id"))
+    referrals = [
+        Referral(user_id=referrer_id, referred_user_id=user_id)
+        for referrer_id, user_id in sorted(pairs - existing)
+    ]
+    Referral.objects.bulk_create(referrals)
+    return len(referrals)
+
+
+def users_approved(users):
+    """Referrals and onboarding for ``(user_id, referred_by_id)`` pairs that were just activated."""
+    referrals = record_referrals(users)
+    for user_id, _ in users:
+        user_cache.evict(user_id)  # update() skips the post_save eviction
+    background.on_commit(onboarding.onboard, [user_id for user_id, _ in users])
+    return referrals
+
+
+def approve_users(queryset):
+    """
+    Activate every pending user in ``queryset``.
+
+    Set-based like :func:`approve_orders`: one UPDATE of ``is_active`` and one
+    ``bulk_create`` of Referrals from ``referred_by``, in one transaction.
+    Default links and welcome emails (accounts/onboarding.py) go to the
+    background pool after the commit.
+
+    Returns ``{"approved": ..., "referrals": ...}``.
+    """
+    with transaction.atomic():
+        users = list(
+            queryset.filter(is_active=False).select_for_update().values_list("id", "referred_by_id")
+        )
+        if not users:
+            return {"approved": 0, "referrals": 0}
+
+        approved = CustomUser.objects.filter(
+            pk__in=[user_id for user_id, _ in users], is_active=False
+        ).update(is_active=True)
+        referrals = users_approved(users)
+
+    return {"approved": approved, "referrals": referrals}
@@ -6,4 +6,10 @@ class AccountsConfig(AppConfig):
     name = "accounts"
 
     def ready(self):
+        from django.conf import settings
+
         import accounts.signals
+        from accounts.approvals import check_commission_rates
+
+        # Fail at startup rather than when the first order is approved
+        check_commission_rates(settings.REFERRAL_COMMISSION_RATES)
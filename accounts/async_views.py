@@ -0,0 +1,149 @@
+# accounts/async_views.py
+"""
+Async variants of the public order, product and auth endpoints, for ASGI
+deployments (see bjsolutions/gunicorn.conf.py).
+
+Under ASGI, Django reads the request body off the event loop into a spooled
+temporary file before the view runs, so a slow ``proof_of_payment`` upload
+costs an idle coroutine rather than a whole sync worker. The views below then
+keep the event loop free: database work goes through the async ORM, and
+multipart parsing and image validation (blocking file I/O and Pillow) run in
+the thread pool.
+
+Login and registration hash passwords on the bounded pool in
+accounts/passwords.py, so a login spike queues on CPU cores rather than
+blocking the loop or the default thread pool. The same rate limits as the
+DRF views (accounts/throttling.py) are checked first, before any parsing or
+hashing, with their cache round trips in the thread pool.
+
+Responses match the DRF views in accounts/views.py. These are plain Django
+views (DRF's views are sync-only), so they do no authentication; all of
+these endpoints are public anyway.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, serializers
+from rest_framework.request import Request
+
+from . import catalogue, direct_uploads, passwords, throttling
+from .authentication import login_payload
+from .models import CustomUser, Product
+from .serializers import LoginSerializer, OrderSerializer, ProductSerializer, RegisterSerializer
+from .uploads import UploadTooLarge, limit_upload_size
+
+
+class AsyncOrderSerializer(OrderSerializer):
+    """OrderSerializer with ``product`` as a plain id, so validation never queries the database."""
+    product = serializers.IntegerField(source="product_id")
+
+
+class AsyncLoginSerializer(LoginSerializer):
+    """LoginSerializer without the credential check, which the view awaits on the hashing pool."""
+
+    def validate(self, data):
+        return data
+
+
+def _parse_upload(request):
+    # Touching POST/FILES runs the multipart parser, which streams file parts
+    # to disk and enforces the size cap (accounts/uploads.py)
+    limit_upload_size(request)
+    return request.POST, request.FILES
+
+
+def _form_data(request):
+    """JSON or form-encoded POST data as a dict; None if the JSON is malformed."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+@require_GET
+async def product_detail(request, pk):
+    async def build():
+        product = await Product.objects.filter(pk=pk).afirst()
+        if product is None:
+            return {"detail": "No Product matches the given query."}, 404
+        return ProductSerializer(product, context={"request": Request(request)}).data, 200
+
+    return await catalogue.acached_response(request, build)
+
+
+@csrf_exempt
+@require_POST
+async def place_order(request):
+    if rejected := await throttling.athrottled_response(request, [throttling.OrderRateThrottle]):
+        return rejected
+    try:
+        post, files = await sync_to_async(_parse_upload, thread_sensitive=False)(request)
+    except UploadTooLarge as exc:
+        return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+    serializer = AsyncOrderSerializer(data={**post.dict(), **files.dict()})
+    if not await sync_to_async(serializer.is_valid, thread_sensitive=False)():
+        return JsonResponse(serializer.errors, status=400)
+
+    data = AsyncOrderSerializer.attach_upload(dict(serializer.validated_data))
+    product_id = data.pop("product_id")
+    product = await Product.objects.filter(pk=product_id).afirst()
+    if product is None:
+        return JsonResponse({"product": [f'Invalid pk "{product_id}" - object does not exist.']}, status=400)
+    affiliate = await CustomUser.objects.filter(username=data.pop("affiliate_username")).afirst()
+    if affiliate is None:
+        return JsonResponse({"affiliate_username": "Invalid affiliate username."}, status=400)
+
+    try:
+        order = await sync_to_async(direct_uploads.create_order)(product=product, affiliate=affiliate, **data)
+    except serializers.ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    return JsonResponse(
+        AsyncOrderSerializer(order, context={"request": Request(request)}).data, status=201
+    )
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    if rejected := await throttling.athrottled_response(request, [throttling.LoginRateThrottle]):
+        return rejected
+    data = _form_data(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+    serializer = AsyncLoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        user = await passwords.aauthenticate(**serializer.validated_data, ip=throttling.client_ip(request))
+    except serializers.ValidationError as exc:
+        return JsonResponse({"non_field_errors": exc.detail}, status=400)
+    except exceptions.Throttled as exc:
+        return throttling.json_response(exc)
+    return JsonResponse(await sync_to_async(login_payload)(user))
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    if rejected := await throttling.athrottled_response(request, [throttling.RegisterRateThrottle]):
+        return rejected
+    data = _form_data(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+    serializer = RegisterSerializer(data=data)
+    # Uniqueness validators query the database, so run on the ORM's thread
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    fields = dict(serializer.validated_data)
+    fields["password"] = await passwords.hashing(make_password, fields["password"])
+    await CustomUser.objects.acreate(is_active=False, **fields)  # pending approval
+    return JsonResponse({"message": "Registration successful. Wait for admin approval."}, status=201)
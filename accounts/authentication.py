@@ -0,0 +1,148 @@
+# accounts/authentication.py
+"""
+JWT authentication without a user row fetch per request.
+
+simplejwt's ``JWTAuthentication`` loads the whole ``CustomUser`` row (bank
+details, picture path, balances) for every request, although most views only
+need the caller's id. :class:`ClaimsJWTAuthentication` validates the token the
+same way, but for safe methods (GET/HEAD/OPTIONS) trusts its signed claims and
+returns a :class:`LazyUser`: ``pk``/``id`` and ``is_authenticated`` come
+straight from the token, and the row is loaded (through the cache) only when
+a view touches another attribute. Mutable fields such as ``username`` are
+never taken from the token: a rename would leave them stale until it expired. Writes still get a freshly loaded user,
+with simplejwt's ``is_active`` check.
+
+Loaded users are shared through :data:`user_cache`, a per-process cache with a
+short TTL (``AUTH_USER_CACHE_TTL`` seconds) that drops a user when they are
+saved or deleted in this process. Balances change through queryset updates
+(accounts/balances.py) that bypass that, so views showing money read it from
+the database themselves.
+
+Trade-off: a deactivated user keeps read access until their access token
+expires (``SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]``).
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.utils.functional import LazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+
+
+class UserCache:
+    """``{user id: (expires, user)}`` for the current process, bounded by ``AUTH_USER_CACHE_SIZE``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+
+    # Settings are read lazily so tests can override them
+    @property
+    def ttl(self):
+        return getattr(settings, "AUTH_USER_CACHE_TTL", 30)
+
+    @property
+    def max_size(self):
+        return getattr(settings, "AUTH_USER_CACHE_SIZE", 10_000)
+
+    def get(self, user_id):
+        """A private copy of the user, loaded from the database on a miss; None if it does not exist."""
+        now = time.monotonic()
+        with self._lock:
+            expires, user = self._users.get(user_id, (0, None))
+        if expires <= now:
+            user = CustomUser.objects.filter(pk=user_id).first()
+            if user is not None:
+                self._store(user_id, copy.copy(user), now)
+            return user
+        # Views may mutate request.user; never hand out the shared instance
+        return copy.copy(user)
+
+    def _store(self, user_id, user, now):
+        if not self.ttl:
+            return
+        with self._lock:
+            if len(self._users) >= self.max_size:
+                self._users = {key: entry for key, entry in self._users.items() if entry[0] > now}
+                if len(self._users) >= self.max_size:
+                    self._users.clear()
+            self._users[user_id] = (now + self.ttl, user)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class LazyUser(LazyObject):
+    """
+    The token's user, loaded on first use of anything but ``pk``/``id`` and
+    the authentication flags.
+    """
+
+    def __init__(self, token):
+        super().__init__()
+        # LazyObject forwards attribute writes to the wrapped user
+        self.__dict__["_user_id"] = CustomUser._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+
+    def _setup(self):
+        user = user_cache.get(self._user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        self._wrapped = user
+
+    @property
+    def pk(self):
+        return self._user_id
+
+    id = pk
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise AuthenticationFailed("Token contained no recognizable user identification")
+            return LazyUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+
+def login_payload(user):
+    """The login response: a token pair and the user's public details."""
+    refresh = RefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+        "user": {
+            "username": user.username,
+            "email": user.email,
+            "phone": user.phone,
+        },
+    }
@@ -0,0 +1,50 @@
+# accounts/background.py
+"""
+In-process background work: a shared thread pool for jobs that must not run
+on the request path (image re-encoding and the like).
+
+Jobs are submitted once the current transaction commits, so they always see
+the rows that triggered them. Set ``BACKGROUND_WORKERS = 0`` to run them
+inline instead (tests, one-off scripts).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="background")
+    return _executor
+
+
+def _run(fn, args):
+    try:
+        return fn(*args)
+    except Exception:
+        logger.exception("Background job %s%r failed", fn.__qualname__, args)
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args):
+    """Run ``fn(*args)`` on the pool now, outside any transaction."""
+    if settings.BACKGROUND_WORKERS:
+        executor().submit(_run, fn, args)
+    else:
+        fn(*args)
+
+
+def on_commit(fn, *args):
+    """Run ``fn(*args)`` on the pool after the current transaction commits."""
+    transaction.on_commit(lambda: submit(fn, *args))
@@ -0,0 +1,37 @@
+# accounts/balances.py
+from django.db.models import Case, DecimalField, F, Value, When
+
+from .models import CustomUser
+
+
+def credit(user_id, amount):
+    """Add ``amount`` to the user's commission balance in a single UPDATE."""
+    CustomUser.objects.filter(pk=user_id).update(
+        commission_balance=F("commission_balance") + amount
+    )
+
+
+def debit(user_id, amount, allow_negative=False):
+    """
+    Subtract ``amount`` from the user's commission balance in a single UPDATE.
+
+    Unless ``allow_negative`` is set the row only changes when the balance
+    covers the amount, so concurrent debits can never overdraw it. Returns
+    whether the debit was applied.
+    """
+    users = CustomUser.objects.filter(pk=user_id)
+    if not allow_negative:
+        users = users.filter(commission_balance__gte=amount)
+    return users.update(commission_balance=F("commission_balance") - amount) == 1
+
+
+def credit_many(amounts):
+    """Credit several users at once from ``{user_id: amount}`` in a single UPDATE."""
+    if not amounts:
+        return
+    CustomUser.objects.filter(pk__in=amounts).update(
+        commission_balance=F("commission_balance") + Case(
+            *[When(pk=user_id, then=Value(amount)) for user_id, amount in amounts.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
@@ -0,0 +1,158 @@
+# accounts/benchmarking.py
+"""
+Shared helpers for the ``benchmark_*`` management commands.
+
+Benchmarks never touch the configured database: they run inside a disposable
+test database created (and dropped) by :func:`throwaway_database`.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import ledger
+from .models import (
+    CustomUser, Commission, CashoutRequest, Withdrawal, Referral,
+    MarketingMaterial, Product, Order
+)
+
+BENCH_PASSWORD = "bench-pass-123"
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """Create and migrate a disposable test database, dropping it afterwards."""
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        # DEBUG would keep every executed query in memory for the whole run
+        with override_settings(DEBUG=False):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+@contextmanager
+def backdatable(*models):
+    """Let ``created_at`` be set explicitly on ``models`` (auto_now_add normally overwrites it)."""
+    fields = [model._meta.get_field("created_at") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def seed(users=200, commissions=100, cashouts=10, products=50, orders=5000, materials=30,
+         days=365, batch_size=1000):
+    """
+    Fill the database with ``users`` affiliates and per-user history spread
+    over ``days`` days. Returns the affiliates in creation order.
+    """
+    rng = random.Random(1234)
+    now = timezone.now()
+    password = make_password(BENCH_PASSWORD)
+
+    def when():
+        return now - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f"bench{i}", phone=f"0800{i:07d}", email=f"bench{i}@example.com",
+            password=password, referral_code=f"BENCH{i:05d}",
+            commission_balance=Decimal("50000.00"),
+        )
+        for i in range(users)
+    ], batch_size=batch_size)
+    affiliates = list(CustomUser.objects.filter(username__startswith="bench").order_by("pk"))
+
+    Product.objects.bulk_create([
+        Product(
+            name=f"Product {i}", price=Decimal(rng.randrange(1000, 100000)),
+            commission_amount=Decimal(rng.randrange(100, 5000)), picture=f"products/bench{i}.jpeg",
+        )
+        for i in range(products)
+    ], batch_size=batch_size)
+    catalogue = list(Product.objects.order_by("pk"))
+
+    MarketingMaterial.objects.bulk_create([
+        MarketingMaterial(
+            title=f"Material {i}", file=f"marketing_materials/bench{i}",
+            material_type=("image", "video", "pdf")[i % 3],
+        )
+        for i in range(materials)
+    ], batch_size=batch_size)
+
+    Referral.objects.bulk_create([
+        Referral(user=affiliates[i // 2], referred_user=affiliates[i])
+        for i in range(1, len(affiliates))
+    ], batch_size=batch_size)
+
+    with backdatable(Commission, CashoutRequest, Withdrawal, Order):
+        Order.objects.bulk_create([
+            Order(
+                product=rng.choice(catalogue), affiliate=rng.choice(affiliates),
+                buyer_phone="0800", payment_method="bank",
+                status=rng.choice(["pending", "approved", "rejected"]), created_at=when(),
+            )
+            for _ in range(orders)
+        ], batch_size=batch_size)
+
+        for affiliate in affiliates:
+            Commission.objects.bulk_create([
+                Commission(
+                    user=affiliate, amount=Decimal(rng.randrange(100, 5000)),
+                    status=rng.choice(["pending", "paid"]), created_at=when(),
+                )
+                for _ in range(commissions)
+            ], batch_size=batch_size)
+            CashoutRequest.objects.bulk_create([
+                CashoutRequest(
+                    user=affiliate, requested_amount=Decimal("6000.00"), processing_fee=Decimal("1000.00"),
+                    net_amount=Decimal("5000.00"), status=rng.choice(["pending", "approved", "rejected"]),
+                    created_at=when(),
+                )
+                for _ in range(cashouts)
+            ], batch_size=batch_size)
+            Withdrawal.objects.bulk_create([
+                Withdrawal(user=affiliate, amount=Decimal("500.00"), created_at=when())
+                for _ in range(cashouts)
+            ], batch_size=batch_size)
+
+    ledger.rebuild([affiliate.pk for affiliate in affiliates], batch_size=batch_size)
+    return affiliates
+
+
+def measure(fn, iterations=20, warmup=2):
+    """Call ``fn`` repeatedly and return latency statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def format_table(headers, rows):
+    """Render ``rows`` as a fixed-width text table."""
+    cells = [headers] + [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
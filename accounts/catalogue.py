@@ -0,0 +1,114 @@
+# accounts/catalogue.py
+"""
+Read-through cache for the public product catalogue and other rarely
+changing listings.
+
+Every cached payload is keyed by a version that the model's save/delete
+receivers bump, so a change invalidates all entries at once without
+enumerating keys. The version doubles as the validator for
+ETag/Last-Modified conditional GETs, which are answered without touching
+the database. Each listing has its own ``namespace`` (products use
+``"catalogue"``, marketing materials ``"marketing"``), so bumping one leaves
+the others cached.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+CATALOGUE = "catalogue"
+MARKETING = "marketing"
+
+
+def _cache():
+    return caches[getattr(settings, "CATALOGUE_CACHE_ALIAS", "default")]
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def current_version(namespace=CATALOGUE):
+    """The ``namespace`` version, seeded from the clock if the cache lost it."""
+    cache = _cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+async def acurrent_version(namespace=CATALOGUE):
+    cache = _cache()
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(_version_key(namespace), time.time_ns(), timeout=None)
+        version = await cache.aget(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace=CATALOGUE):
+    """Invalidate every cached payload in ``namespace``."""
+    _cache().set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def _validators(request, namespace, version):
+    """``(payload cache key, ETag, Last-Modified)`` for ``request`` at ``namespace`` ``version``."""
+    url = request.build_absolute_uri()
+    digest = hashlib.sha1(f"{namespace}:{version}:{url}".encode()).hexdigest()
+    return f"{namespace}:payload:{digest}", quote_etag(digest), version // 1_000_000_000
+
+
+def _finish(response, etag, last_modified, public):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Let clients keep the body but revalidate it cheaply on every use
+    patch_cache_control(response, no_cache=True, **({"public": True} if public else {"private": True}))
+    return response
+
+
+def cached_response(request, build, public=True, namespace=CATALOGUE):
+    """
+    Serve ``build()``'s payload for ``request`` from the ``namespace`` cache.
+
+    Entries are keyed by catalogue version and the absolute request URL
+    (serialized picture URLs embed the host, and query strings select
+    different pages). Returns 304 when the client's ETag or
+    If-Modified-Since still matches the current version.
+    """
+    key, etag, last_modified = _validators(request, namespace, current_version(namespace))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        data = _cache().get(key)
+        if data is None:
+            data = build()
+            _cache().set(key, data, timeout=getattr(settings, "CATALOGUE_CACHE_TIMEOUT", 3600))
+        response = Response(data)
+    return _finish(response, etag, last_modified, public)
+
+
+async def acached_response(request, build, public=True, namespace=CATALOGUE):
+    """
+    :func:`cached_response` for async views: ``build`` is a coroutine
+    function returning ``(payload, status)``, and the payload is returned as
+    a ``JsonResponse``. Only status 200 payloads are cached.
+    """
+    key, etag, last_modified = _validators(request, namespace, await acurrent_version(namespace))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return _finish(response, etag, last_modified, public)
+
+    data = await _cache().aget(key)
+    if data is None:
+        data, status = await build()
+        if status != 200:
+            return JsonResponse(data, status=status)
+        await _cache().aset(key, data, timeout=getattr(settings, "CATALOGUE_CACHE_TIMEOUT", 3600))
+    return _finish(JsonResponse(data), etag, last_modified, public)
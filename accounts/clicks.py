@@ -0,0 +1,189 @@
+# accounts/clicks.py
+"""
+Referral click ingestion.
+
+The public click endpoint only appends to an in-process buffer; events reach
+the database in batched ``bulk_create`` calls once the buffer holds
+``CLICK_BUFFER_SIZE`` events or ``CLICK_FLUSH_INTERVAL`` seconds have passed
+(a daemon thread covers idle periods). Flushes run on the background pool
+(accounts/background.py), never on the request path; a batch whose write
+fails goes back into the buffer for the next flush. Repeat clicks from the same visitor
+fingerprint on the same link within ``CLICK_DEDUP_WINDOW`` seconds are
+dropped before they are buffered.
+
+The buffer is per process: a crash loses at most one unflushed batch, and
+dedup is per worker, which only lets an occasional duplicate through.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from . import background, throttling
+from .models import AffiliateClick, AffiliateClickHourly, CustomUser, Product
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(request):
+    """Stable, non-reversible visitor id from client IP and user agent."""
+    # The same client IP the throttles use: a rotated X-Forwarded-For is no new visitor
+    ip = throttling.client_ip(request)
+    agent = request.META.get("HTTP_USER_AGENT", "")
+    return hashlib.sha256(f"{ip}|{agent}".encode()).hexdigest()
+
+
+class ClickBuffer:
+    def __init__(self, size=None, interval=None, dedup_window=None):
+        self._size = size
+        self._interval = interval
+        self._dedup_window = dedup_window
+        self._lock = threading.Lock()
+        self._events = []
+        self._seen = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._flush_queued = False
+        self.stats = Counter()
+
+    # Settings are read lazily so tests can override them
+    @property
+    def size(self):
+        return self._size or getattr(settings, "CLICK_BUFFER_SIZE", 500)
+
+    @property
+    def interval(self):
+        return self._interval if self._interval is not None else getattr(settings, "CLICK_FLUSH_INTERVAL", 5)
+
+    @property
+    def dedup_window(self):
+        return self._dedup_window if self._dedup_window is not None else getattr(settings, "CLICK_DEDUP_WINDOW", 1800)
+
+    def record(self, affiliate_username, product_id, visitor):
+        """Buffer one click; returns False if it was a duplicate within the dedup window."""
+        now = time.monotonic()
+        key = (visitor, affiliate_username, product_id)
+        with self._lock:
+            if self._seen.get(key, 0) > now:
+                self.stats["duplicates"] += 1
+                return False
+            self._seen[key] = now + self.dedup_window
+            self._events.append((affiliate_username, product_id, visitor, timezone.now()))
+            self.stats["accepted"] += 1
+            due = len(self._events) >= self.size or (self.interval and now - self._last_flush >= self.interval)
+            queue = due and not self._flush_queued
+            self._flush_queued = self._flush_queued or queue
+
+        self._ensure_timer()
+        if queue:
+            background.submit(self._flush_in_background)
+        return True
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._flush_queued = False
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing buffered affiliate clicks failed; they stay buffered")
+
+    def flush(self):
+        """Write every buffered click in one batch and refresh the affected hourly rollups."""
+        with self._lock:
+            events, self._events = self._events, []
+            self._last_flush = now = time.monotonic()
+            self._seen = {key: expires for key, expires in self._seen.items() if expires > now}
+        if not events:
+            return 0
+
+        try:
+            affiliates = dict(CustomUser.objects.filter(
+                username__in={username for username, *_ in events}
+            ).values_list("username", "pk"))
+            products = set(Product.objects.filter(
+                pk__in={product_id for _, product_id, *_ in events}
+            ).values_list("pk", flat=True))
+
+            clicks = [
+                AffiliateClick(
+                    affiliate_id=affiliates[username], product_id=product_id,
+                    fingerprint=visitor, created_at=created_at,
+                )
+                for username, product_id, visitor, created_at in events
+                if username in affiliates and product_id in products
+            ]
+            with transaction.atomic():
+                AffiliateClick.objects.bulk_create(clicks, batch_size=1000)
+                self._refresh_rollups(clicks)
+        except Exception:
+            # Nothing was written: put the batch back ahead of newer clicks
+            with self._lock:
+                self._events[:0] = events
+            raise
+        self.stats["dropped"] += len(events) - len(clicks)
+        self.stats["flushed"] += len(clicks)
+        return len(clicks)
+
+    def _refresh_rollups(self, clicks):
+        """Recount the touched (affiliate, product, hour) buckets from the raw table and upsert them."""
+        if not clicks:
+            return
+        touched = {(click.affiliate_id, click.product_id) for click in clicks}
+        # Truncate in the current time zone, as TruncHour does
+        since = timezone.localtime(min(click.created_at for click in clicks)).replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        counts = AffiliateClick.objects.filter(
+            affiliate_id__in={affiliate_id for affiliate_id, _ in touched},
+            product_id__in={product_id for _, product_id in touched},
+            created_at__gte=since,
+        ).annotate(hour=TruncHour("created_at")).order_by().values(
+            "affiliate_id", "product_id", "hour"
+        ).annotate(clicks=Count("id"))
+
+        AffiliateClickHourly.objects.bulk_create(
+            [
+                AffiliateClickHourly(
+                    affiliate_id=row["affiliate_id"], product_id=row["product_id"],
+                    hour=row["hour"], clicks=row["clicks"],
+                )
+                for row in counts
+                if (row["affiliate_id"], row["product_id"]) in touched
+            ],
+            update_conflicts=True,
+            unique_fields=["affiliate", "product", "hour"],
+            update_fields=["clicks"],
+        )
+
+    def _ensure_timer(self):
+        if self._timer is not None or not self.interval:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name="click-buffer", daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.interval)
+            if time.monotonic() - self._last_flush < self.interval:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered affiliate clicks failed")
+            finally:
+                close_old_connections()
+
+
+click_buffer = ClickBuffer()
+atexit.register(click_buffer.flush)
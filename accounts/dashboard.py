@@ -0,0 +1,131 @@
+# accounts/dashboard.py
+from datetime import timedelta
+
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import CustomUser, Referral, Withdrawal, Commission, CashoutRequest, DailyLedger
+
+GRANULARITIES = ("day", "week", "month")
+
+# Most recent cashouts embedded in the dashboard; the rest is paged on cashout/history/
+DASHBOARD_CASHOUT_HISTORY = 10
+
+
+def _per_user(queryset, aggregate):
+    """Correlated subquery computing ``aggregate`` over ``queryset`` for the outer user row."""
+    return Subquery(
+        queryset.filter(user=OuterRef("pk"))
+        .order_by()
+        .values("user")
+        .annotate(total=aggregate)
+        .values("total")[:1]
+    )
+
+
+def dashboard_counters(user):
+    """All scalar dashboard counters for ``user``, balances included, in one round-trip."""
+    return CustomUser.objects.filter(pk=user.pk).annotate(
+        total_referrals=Coalesce(_per_user(Referral.objects.all(), Count("id")), Value(0)),
+        pending_withdrawals=_per_user(Withdrawal.objects.filter(status="pending"), Sum("amount")),
+        pending_commissions=_per_user(Commission.objects.filter(status="pending"), Sum("amount")),
+        total_cashout=_per_user(CashoutRequest.objects.filter(status="approved"), Sum("net_amount")),
+    ).values(
+        "balance", "commission_balance", "downline_size", "referral_depth",
+        "total_referrals", "pending_withdrawals", "pending_commissions", "total_cashout",
+    ).get()
+
+
+# --------------------- COMMISSION HISTORY ---------------------
+def parse_series_params(params):
+    """Validate the optional ``from``/``to``/``granularity`` query parameters."""
+    parsed = {"granularity": params.get("granularity") or "day"}
+    if parsed["granularity"] not in GRANULARITIES:
+        raise ValidationError({"granularity": f"Must be one of: {', '.join(GRANULARITIES)}."})
+
+    for key in ("from", "to"):
+        value = params.get(key)
+        try:
+            parsed[key] = parse_date(value) if value else None
+        except ValueError:
+            parsed[key] = None
+        if value and parsed[key] is None:
+            raise ValidationError({key: "Invalid date, expected YYYY-MM-DD."})
+
+    if parsed["from"] and parsed["to"] and parsed["from"] > parsed["to"]:
+        raise ValidationError({"from": "Must not be after 'to'."})
+    return parsed
+
+
+def _period_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def commission_history(user, start=None, end=None, granularity="day"):
+    """
+    Running commission balance for ``user`` per day/week/month, in date order.
+
+    Reads the DailyLedger rollup with one range scan over the
+    ``(user, date)`` index, so the cost tracks the number of active days in
+    the range rather than the number of commissions. Each period reports the
+    closing balance of its last active day.
+    """
+    rows = DailyLedger.objects.filter(user_id=user.pk)
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+
+    closing_by_period = {}
+    for day, closing_balance in rows.order_by("date").values_list("date", "closing_balance"):
+        closing_by_period[_period_start(day, granularity)] = closing_balance
+
+    return [
+        {"date": period.isoformat(), "amount": float(closing)}
+        for period, closing in closing_by_period.items()
+    ]
+
+
+def build_dashboard(user, start=None, end=None, granularity="day"):
+    """
+    Assemble the DashboardView payload for ``user``.
+
+    Three queries regardless of history size: the counters row, a
+    DailyLedger range scan for the commission history, and the latest
+    DASHBOARD_CASHOUT_HISTORY cashouts.
+    """
+    counters = dashboard_counters(user)
+    history = commission_history(user, start=start, end=end, granularity=granularity)
+
+    cashouts = CashoutRequest.objects.filter(user_id=user.pk).order_by("-created_at", "-id").only(
+        "requested_amount", "net_amount", "status", "created_at"
+    )[:DASHBOARD_CASHOUT_HISTORY]
+    cashout_history = [
+        {
+            "date": c.created_at.strftime("%Y-%m-%d"),
+            "requested": float(c.requested_amount),
+            "net": float(c.net_amount),
+            "status": c.status,
+        }
+        for c in cashouts
+    ]
+
+    return {
+        "total_earnings": counters["balance"],
+        "total_referrals": counters["total_referrals"],
+        # Whole referral tree below / above the user (accounts/referral_tree.py)
+        "downline_size": counters["downline_size"],
+        "referral_depth": counters["referral_depth"],
+        "pending_withdrawals": counters["pending_withdrawals"] or 0,
+        "pending_commissions": counters["pending_commissions"] or 0,
+        "available_commission": float(counters["commission_balance"]),
+        "total_cashout": float(counters["total_cashout"] or 0),
+        "commission_history": history,
+        "cashout_history": cashout_history,
+    }
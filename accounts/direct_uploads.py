@@ -0,0 +1,96 @@
+# accounts/direct_uploads.py
+"""
+Direct-to-bucket uploads of ``proof_of_payment``.
+
+When proofs live in an S3-compatible bucket (``MEDIA_STORAGE=s3``), the
+browser asks ``orders/proof-upload/`` for an upload slot, POSTs the image
+straight to the bucket with the returned form fields, then places the order
+with the slot's ``token`` in ``proof_upload`` instead of a file. The bytes
+never pass through a Django worker; the presigned policy makes the bucket
+enforce the size cap and content type.
+
+Tokens are signed, so a client can only attach an object this module handed
+out, and only once it actually exists in the bucket. Each upload backs one
+order: a token whose object is already attached is refused, and a unique
+constraint on ``Order.proof_of_payment`` settles concurrent claims.
+Uploads never claimed are removed by ``manage.py sweep_proof_uploads``
+once their token has expired.
+"""
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import storages
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import Order
+
+SALT = "accounts.proof-upload"
+UPLOAD_PREFIX = "payments/uploads/"
+SLOT_TTL = 15 * 60       # seconds the browser has to start the upload
+TOKEN_MAX_AGE = 60 * 60  # seconds the token stays valid for placing the order
+ALREADY_USED = "This proof of payment is already attached to an order."
+CONTENT_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+
+def storage():
+    return storages["proofs"]
+
+
+def enabled():
+    """Whether proofs are stored in a bucket that can take direct uploads."""
+    return hasattr(storage(), "bucket_name")
+
+
+def presign(content_type):
+    """``{url, fields, token, expires_in}`` for one proof upload of ``content_type``."""
+    store = storage()
+    name = f"{UPLOAD_PREFIX}{uuid.uuid4().hex}.{CONTENT_TYPES[content_type]}"
+    post = store.connection.meta.client.generate_presigned_post(
+        Bucket=store.bucket_name,
+        Key=store._normalize_name(name),
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, settings.PROOF_OF_PAYMENT_MAX_BYTES],
+        ],
+        ExpiresIn=SLOT_TTL,
+    )
+    return {
+        "url": post["url"],
+        "fields": post["fields"],
+        "token": signing.dumps(name, salt=SALT),
+        "expires_in": SLOT_TTL,
+    }
+
+
+def claim(token):
+    """The storage name an upload ``token`` was issued for, once the object exists."""
+    try:
+        name = signing.loads(token, salt=SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        raise serializers.ValidationError("Invalid or expired upload token.")
+    if not storage().exists(name):
+        raise serializers.ValidationError("The proof of payment has not been uploaded yet.")
+    return name
+
+
+def create_order(**fields):
+    """``Order.objects.create``, refusing a claimed upload that already backs an order."""
+    name = fields.get("proof_of_payment")
+    claimed = isinstance(name, str)  # a name from claim() rather than an uploaded file
+    if claimed and Order.objects.filter(proof_of_payment=name).exists():
+        raise serializers.ValidationError({"proof_upload": [ALREADY_USED]})
+    try:
+        with transaction.atomic():
+            return Order.objects.create(**fields)
+    except IntegrityError:
+        if claimed:  # a concurrent order got it first
+            raise serializers.ValidationError({"proof_upload": [ALREADY_USED]})
+        raise
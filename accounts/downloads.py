@@ -0,0 +1,108 @@
+# accounts/downloads.py
+"""
+Batched marketing material download counts.
+
+The download endpoint only bumps an in-process counter; the totals reach
+``MarketingMaterial.download_count`` in a single ``UPDATE ... CASE`` once
+``DOWNLOAD_BUFFER_SIZE`` downloads are pending or ``DOWNLOAD_FLUSH_INTERVAL``
+seconds have passed (a daemon thread covers idle periods). As with the click
+buffer (accounts/clicks.py), a crashed worker loses at most its unflushed
+counts.
+
+Resumed downloads are not counted again: only responses that start at the
+first byte count (see :func:`starts_download`).
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Value, When
+
+from .models import MarketingMaterial
+
+logger = logging.getLogger(__name__)
+
+
+def starts_download(request, response):
+    """
+    Whether ``response`` begins a download: a whole file, or a range from
+    byte 0. Judged from the request too, because offloaded responses
+    (X-Accel-Redirect) leave Range handling to the front-end server.
+    """
+    if request.method != "GET" or response.status_code not in (200, 206, 302):
+        return False
+    byte_range = request.META.get("HTTP_RANGE", "").strip()
+    return not byte_range or byte_range.startswith("bytes=0-")
+
+
+class DownloadCounter:
+    def __init__(self, size=None, interval=None):
+        self._size = size
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    # Settings are read lazily so tests can override them
+    @property
+    def size(self):
+        return self._size or getattr(settings, "DOWNLOAD_BUFFER_SIZE", 100)
+
+    @property
+    def interval(self):
+        return self._interval if self._interval is not None else getattr(settings, "DOWNLOAD_FLUSH_INTERVAL", 10)
+
+    def record(self, material_id):
+        now = time.monotonic()
+        with self._lock:
+            self._pending[material_id] += 1
+            due = sum(self._pending.values()) >= self.size or (
+                self.interval and now - self._last_flush >= self.interval
+            )
+
+        self._ensure_timer()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add every pending count to its material in one UPDATE; returns the downloads written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        MarketingMaterial.objects.filter(pk__in=pending).update(download_count=F("download_count") + Case(
+            *(When(pk=pk, then=Value(count)) for pk, count in pending.items()),
+            default=Value(0),
+        ))
+        return sum(pending.values())
+
+    def _ensure_timer(self):
+        if self._timer is not None or not self.interval:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name="download-counter", daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.interval)
+            if time.monotonic() - self._last_flush < self.interval:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing marketing material download counts failed")
+            finally:
+                close_old_connections()
+
+
+download_counter = DownloadCounter()
+atexit.register(download_counter.flush)
@@ -0,0 +1,40 @@
+# accounts/hashers.py
+"""
+Password hashers with their cost taken from settings.
+
+They keep Django's algorithm names, so existing hashes still verify; when the
+configured cost differs from the one a hash was made with, ``must_update``
+makes ``check_password`` rehash it on the user's next login. The first entry
+of ``PASSWORD_HASHERS`` (``PASSWORD_HASHER`` in settings) hashes new
+passwords.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Needs argon2-cffi (``pip install django[argon2]``)."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
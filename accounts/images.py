@@ -0,0 +1,59 @@
+# accounts/images.py
+"""
+Pillow helpers for re-encoding uploaded images.
+
+Everything here works on bytes in and bytes out, so it can run in any worker
+thread without touching the ORM or storage.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+WEBP_AVAILABLE = features.check("webp")
+
+
+def _load(source):
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    image = ImageOps.exif_transpose(image)  # phone photos rely on the EXIF orientation tag
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    return image
+
+
+def encode(image, quality=80):
+    """``(bytes, extension)`` for ``image`` as WebP, or JPEG where Pillow lacks WebP support."""
+    buffer = BytesIO()
+    if WEBP_AVAILABLE:
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+        return buffer.getvalue(), "webp"
+    image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue(), "jpg"
+
+
+def bounded(source, max_dimension, quality=80):
+    """Re-encode ``source`` (bytes or a file) so neither side exceeds ``max_dimension``."""
+    image = _load(source)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return encode(image, quality)
+
+
+def thumbnail(source, size, quality=70):
+    """A cropped ``size`` x ``size`` square thumbnail of ``source``."""
+    image = ImageOps.fit(_load(source), (size, size), Image.LANCZOS)
+    return encode(image, quality)
+
+
+def widths(source, targets, quality=80):
+    """
+    ``{width: (bytes, extension)}`` with one rendition of ``source`` per
+    target width. Images are never upscaled: targets wider than the source
+    get a re-encode at the source width.
+    """
+    image = _load(source)
+    renditions = {}
+    for width in sorted(targets, reverse=True):
+        scaled = image
+        if width < image.width:
+            scaled = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        renditions[width] = encode(scaled, quality)
+    return renditions
@@ -0,0 +1,187 @@
+# accounts/ledger.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CustomUser, Commission, CashoutRequest, DailyLedger
+
+ZERO = Decimal("0.00")
+
+
+# --------------------- INCREMENTAL MAINTENANCE ---------------------
+def contribution(instance):
+    """
+    The ``(date, commissions_in, cashouts_out)`` a Commission or CashoutRequest
+    adds to its owner's ledger, or ``None`` if it adds nothing.
+    """
+    if instance.pk is None or instance.created_at is None:
+        return None
+    day = timezone.localdate(instance.created_at)
+
+    if isinstance(instance, Commission):
+        return day, instance.amount, ZERO
+    if instance.status != "rejected":
+        return day, ZERO, instance.requested_amount
+    return None
+
+
+def _add_to_day(user_id, day, commissions_in, cashouts_out):
+    return DailyLedger.objects.filter(user_id=user_id, date=day).update(
+        commissions_in=F("commissions_in") + commissions_in,
+        cashouts_out=F("cashouts_out") + cashouts_out,
+        closing_balance=F("closing_balance") + (commissions_in - cashouts_out),
+    )
+
+
+def record(user_id, day, commissions_in=ZERO, cashouts_out=ZERO, create=True):
+    """
+    Apply one movement to ``user_id``'s ledger row for ``day`` and every later
+    closing balance. With ``create=False`` a missing day row is left missing,
+    which is what deletions want (the owner may be going away too).
+    """
+    if not commissions_in and not cashouts_out:
+        return
+    delta = commissions_in - cashouts_out
+
+    with transaction.atomic():
+        if not _add_to_day(user_id, day, commissions_in, cashouts_out) and create:
+            previous = DailyLedger.objects.filter(
+                user_id=user_id, date__lt=day
+            ).order_by("-date").values_list("closing_balance", flat=True).first()
+            try:
+                with transaction.atomic():
+                    DailyLedger.objects.create(
+                        user_id=user_id,
+                        date=day,
+                        commissions_in=commissions_in,
+                        cashouts_out=cashouts_out,
+                        closing_balance=(previous or ZERO) + delta,
+                    )
+            except IntegrityError:
+                # A concurrent writer opened the row first
+                _add_to_day(user_id, day, commissions_in, cashouts_out)
+
+        # Movements are normally dated today, so this rarely touches any rows
+        DailyLedger.objects.filter(user_id=user_id, date__gt=day).update(
+            closing_balance=F("closing_balance") + delta
+        )
+
+
+def apply_change(user_id, before, after, create=True):
+    """Move the ledger from one :func:`contribution` of an object to another."""
+    if before == after:
+        return
+    if before:
+        day, commissions_in, cashouts_out = before
+        record(user_id, day, -commissions_in, -cashouts_out, create=create)
+    if after:
+        day, commissions_in, cashouts_out = after
+        record(user_id, day, commissions_in, cashouts_out)
+
+
+def _per_user_case(values):
+    return Case(
+        *[When(user_id=user_id, then=Value(value)) for user_id, value in values.items()],
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def record_many(day, movements):
+    """
+    Bulk counterpart of :func:`record` for ``{user_id: (commissions_in, cashouts_out)}``
+    all dated ``day``; runs a fixed number of queries however many users move.
+    """
+    movements = {user_id: moved for user_id, moved in movements.items() if any(moved)}
+    if not movements:
+        return
+    commissions_in = {user_id: moved[0] for user_id, moved in movements.items()}
+    cashouts_out = {user_id: moved[1] for user_id, moved in movements.items()}
+    deltas = {user_id: moved[0] - moved[1] for user_id, moved in movements.items()}
+
+    with transaction.atomic():
+        existing = set(DailyLedger.objects.filter(
+            user_id__in=movements, date=day
+        ).values_list("user_id", flat=True))
+
+        if existing:
+            DailyLedger.objects.filter(user_id__in=existing, date=day).update(
+                commissions_in=F("commissions_in") + _per_user_case(commissions_in),
+                cashouts_out=F("cashouts_out") + _per_user_case(cashouts_out),
+                closing_balance=F("closing_balance") + _per_user_case(deltas),
+            )
+
+        missing = [user_id for user_id in movements if user_id not in existing]
+        if missing:
+            previous = CustomUser.objects.filter(pk__in=missing).annotate(
+                closing=Subquery(
+                    DailyLedger.objects.filter(user=OuterRef("pk"), date__lt=day)
+                    .order_by("-date").values("closing_balance")[:1]
+                )
+            ).values_list("pk", "closing")
+            DailyLedger.objects.bulk_create([
+                DailyLedger(
+                    user_id=user_id,
+                    date=day,
+                    commissions_in=commissions_in[user_id],
+                    cashouts_out=cashouts_out[user_id],
+                    closing_balance=(closing or ZERO) + deltas[user_id],
+                )
+                for user_id, closing in previous
+            ])
+
+        DailyLedger.objects.filter(user_id__in=movements, date__gt=day).update(
+            closing_balance=F("closing_balance") + _per_user_case(deltas)
+        )
+
+
+# --------------------- BULK REBUILD ---------------------
+def _ledger_sources():
+    """(queryset, amount field, column index) for each source feeding the ledger."""
+    return [
+        (Commission.objects.all(), "amount", 0),
+        (CashoutRequest.objects.exclude(status="rejected"), "requested_amount", 1),
+    ]
+
+
+def daily_rows(user_ids):
+    """
+    Rebuilt DailyLedger rows (unsaved) for ``user_ids``.
+
+    Each source is grouped per ``(user, day)`` in the database, so the Python
+    side only walks one entry per active day rather than every commission.
+    """
+    days = defaultdict(lambda: [ZERO, ZERO])
+
+    for queryset, field, column in _ledger_sources():
+        totals = queryset.filter(user_id__in=user_ids).annotate(
+            day=TruncDate("created_at")
+        ).order_by().values("user_id", "day").annotate(total=Sum(field))
+
+        for user_id, day, total in totals.values_list("user_id", "day", "total"):
+            days[(user_id, day)][column] += total
+
+    rows = []
+    closing = defaultdict(lambda: ZERO)
+    for (user_id, day), (commissions_in, cashouts_out) in sorted(days.items()):
+        closing[user_id] += commissions_in - cashouts_out
+        rows.append(DailyLedger(
+            user_id=user_id,
+            date=day,
+            commissions_in=commissions_in,
+            cashouts_out=cashouts_out,
+            closing_balance=closing[user_id],
+        ))
+    return rows
+
+
+def rebuild(user_ids, batch_size=1000):
+    """Replace the ledger of ``user_ids`` with one recomputed from raw rows."""
+    rows = daily_rows(user_ids)
+    with transaction.atomic():
+        DailyLedger.objects.filter(user_id__in=user_ids).delete()
+        DailyLedger.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
@@ -0,0 +1,31 @@
+# accounts/links.py
+"""
+Deterministic affiliate links.
+
+A link is derived from the affiliate's username and the product id, plus a
+short HMAC token so a ``ref`` cannot be forged by editing the URL. Nothing
+is stored: the same inputs always produce the same link.
+"""
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+
+TOKEN_LENGTH = 12
+
+_signer = signing.Signer(salt="accounts.affiliate-link")
+
+
+def link_token(username, product_id):
+    return _signer.signature(f"{username}:{product_id}")[:TOKEN_LENGTH]
+
+
+def verify_token(username, product_id, token):
+    return bool(token) and constant_time_compare(link_token(username, product_id), token)
+
+
+def build_link(username, product_id):
+    base_url = settings.AFFILIATE_LINK_BASE_URL.rstrip("/")
+    query = urlencode({"ref": username, "t": link_token(username, product_id)})
+    return f"{base_url}/product/{product_id}/?{query}"
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from accounts import approvals
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Approve pending users in one UPDATE, record their referrals in bulk and queue their "
+        "onboarding (default affiliate links, welcome email)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="users", default=[],
+                            help="Approve this username (repeatable).")
+        parser.add_argument("--joined-before", help="Approve users who registered before this ISO datetime.")
+        parser.add_argument("--all", action="store_true", help="Approve every pending user.")
+
+    def handle(self, *args, **options):
+        if not (options["users"] or options["joined_before"] or options["all"]):
+            raise CommandError("Pass --user, --joined-before or --all.")
+
+        users = CustomUser.objects.filter(is_active=False)
+        if options["users"]:
+            users = users.filter(username__in=options["users"])
+        if options["joined_before"]:
+            joined_before = parse_datetime(options["joined_before"])
+            if joined_before is None:
+                raise CommandError(f"Invalid datetime: {options['joined_before']}")
+            users = users.filter(date_joined__lt=joined_before)
+
+        counts = approvals.approve_users(users)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {counts['approved']} users approved, {counts['referrals']} referrals recorded."
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.models import CustomUser, ReferralCodeSequence
+
+
+class Command(BaseCommand):
+    help = (
+        "Give every user without a referral code one from the sequence (accounts/referral_codes.py), "
+        "one reservation and one bulk UPDATE per chunk. Existing codes are left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Users coded per round.")
+
+    def handle(self, *args, **options):
+        missing = CustomUser.objects.filter(Q(referral_code__isnull=True) | Q(referral_code=""))
+        total = 0
+        while True:
+            with transaction.atomic():
+                users = list(missing.order_by("pk").only("pk")[:options["chunk_size"]])
+                if not users:
+                    break
+                for user, code in zip(users, ReferralCodeSequence.allocate(len(users))):
+                    user.referral_code = code
+                CustomUser.objects.bulk_update(users, ["referral_code"])
+            total += len(users)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} referral codes assigned."))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import benchmarking
+from accounts.authentication import ClaimsJWTAuthentication, user_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request JWT authentication overhead in a throwaway database: simplejwt's "
+        "JWTAuthentication against ClaimsJWTAuthentication, with the user untouched (claims only) "
+        "and touched (served from the per-process user cache)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with benchmarking.throwaway_database():
+            user = benchmarking.seed(users=1, commissions=0, cashouts=0, products=1, orders=0, materials=0)[0]
+            header = f"Bearer {RefreshToken.for_user(user).access_token}"
+            factory = APIRequestFactory()
+            url = reverse("affiliate-links")
+
+            def touch_id(request_user):
+                return request_user.pk
+
+            def touch_row(request_user):
+                return request_user.full_name  # not in the token: needs the user row
+
+            cases = [
+                ("simplejwt JWTAuthentication", JWTAuthentication, touch_id),
+                ("claims, id only", ClaimsJWTAuthentication, touch_id),
+                ("claims, row touched (cached)", ClaimsJWTAuthentication, touch_row),
+            ]
+            rows = []
+            for name, authenticator, touch in cases:
+                user_cache.clear()
+
+                def authenticate():
+                    request = Request(factory.get(url, HTTP_AUTHORIZATION=header), authenticators=[authenticator()])
+                    if not IsAuthenticated().has_permission(request, None):
+                        raise RuntimeError("authentication failed")
+                    touch(request.user)
+
+                authenticate()  # warm up imports and the user cache
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(options["requests"]):
+                        authenticate()
+                    elapsed = time.perf_counter() - started
+                rows.append([
+                    name, f"{elapsed / options['requests'] * 1_000_000:.1f}",
+                    f"{len(queries) / options['requests']:.2f}",
+                ])
+
+        self.stdout.write(benchmarking.format_table(["authentication", "µs/request", "queries/request"], rows))
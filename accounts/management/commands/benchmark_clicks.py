@@ -0,0 +1,60 @@
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import benchmarking, links
+from accounts.clicks import ClickBuffer
+from accounts.models import AffiliateClick, AffiliateClickHourly, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay affiliate clicks against the click endpoint in a throwaway database and report "
+        "sustained clicks/sec on one worker for each buffer size (1 = write on every click)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clicks", type=int, default=5000)
+        parser.add_argument("--visitors", type=int, default=2000, help="Distinct fingerprints; repeats are deduplicated.")
+        parser.add_argument("--buffer-sizes", type=int, nargs="+", default=[1, 100, 500])
+
+    def handle(self, *args, **options):
+        rows = []
+        with benchmarking.throwaway_database():
+            self.stdout.write("Seeding...")
+            affiliates = benchmarking.seed(users=50, commissions=0, cashouts=0, orders=0, materials=0)
+            product_ids = list(Product.objects.values_list("pk", flat=True))
+            payloads = []
+            for i in range(options["clicks"]):
+                username, product_id = affiliates[i % len(affiliates)].username, product_ids[i % len(product_ids)]
+                payload = {"ref": username, "product": product_id, "t": links.link_token(username, product_id)}
+                payloads.append((payload, f"visitor-{i % options['visitors']}"))
+
+            for size in options["buffer_sizes"]:
+                # Flush inline, so the throughput includes the writes
+                with override_settings(BACKGROUND_WORKERS=0):
+                    elapsed = self.replay(payloads, ClickBuffer(size=size, interval=0))
+                rows.append([
+                    size, len(payloads), AffiliateClick.objects.count(),
+                    AffiliateClickHourly.objects.count(), f"{len(payloads) / elapsed:.0f}",
+                ])
+                AffiliateClick.objects.all().delete()
+                AffiliateClickHourly.objects.all().delete()
+
+        self.stdout.write(benchmarking.format_table(
+            ["buffer size", "clicks sent", "clicks stored", "rollup rows", "clicks/sec"], rows
+        ))
+
+    def replay(self, payloads, buffer):
+        client = APIClient()
+        url = reverse("affiliate-click")
+        with patch("accounts.views.click_buffer", buffer):
+            started = time.perf_counter()
+            for payload, visitor in payloads:
+                client.post(url, payload, format="json", HTTP_USER_AGENT=visitor)
+            buffer.flush()
+            return time.perf_counter() - started
@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import benchmarking
+from accounts.models import CashoutRequest, Commission, Order, Withdrawal
+
+# Models whose Meta.indexes serve the per-user and admin hot paths
+INDEXED_MODELS = [Commission, CashoutRequest, Withdrawal, Order]
+
+# Status each endpoint must answer with; anything else (a 429, a 400) would be timed as a fast path
+CREATED = {"register", "place-order"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and report per-endpoint latency for accounts/urls.py "
+        "with the hot-path indexes dropped (before) and in place (after)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--commissions", type=int, default=100, help="Commissions per user.")
+        parser.add_argument("--cashouts", type=int, default=10, help="Cashouts and withdrawals per user.")
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmarking.throwaway_database():
+            self.stdout.write("Seeding...")
+            affiliates = benchmarking.seed(
+                users=options["users"],
+                commissions=options["commissions"],
+                cashouts=options["cashouts"],
+                orders=options["orders"],
+            )
+            user = affiliates[0]
+            endpoints = self.endpoints(user)
+
+            # Every request comes from one client: lift the rate limits
+            unthrottled = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {
+                scope: "1000000/s" for scope in settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+            }}
+            with override_settings(REST_FRAMEWORK=unthrottled):
+                self.set_indexes(enabled=False)
+                before = self.run(endpoints, options["iterations"])
+                self.set_indexes(enabled=True)
+                after = self.run(endpoints, options["iterations"])
+
+        rows = [
+            [
+                name,
+                f"{before[name]['median']:.2f}", f"{before[name]['p95']:.2f}",
+                f"{after[name]['median']:.2f}", f"{after[name]['p95']:.2f}",
+                f"{before[name]['median'] / after[name]['median']:.2f}x",
+            ]
+            for name in endpoints
+        ]
+        self.stdout.write(benchmarking.format_table(
+            ["endpoint", "before p50 ms", "before p95 ms", "after p50 ms", "after p95 ms", "speedup"], rows
+        ))
+
+    def endpoints(self, user):
+        """``{url name: callable}`` issuing one request against each route in accounts/urls.py."""
+        client = APIClient()
+        authed = APIClient()
+        authed.force_authenticate(user)
+        counter = iter(range(10 ** 9))
+        product_id = Order.objects.values_list("product_id", flat=True).first()
+
+        return {
+            "register": lambda: client.post(reverse("register"), {
+                "username": f"newbie{next(counter)}", "phone": f"0900{next(counter):07d}",
+                "email": "newbie@example.com", "password": "pass12345",
+            }, format="json"),
+            "login": lambda: client.post(reverse("login"), {
+                "identifier": user.username, "password": benchmarking.BENCH_PASSWORD,
+            }, format="json"),
+            "profile": lambda: authed.get(reverse("profile")),
+            "dashboard": lambda: authed.get(reverse("dashboard")),
+            "cashout-request": lambda: authed.post(reverse("cashout-request"), {"action": "history"}, format="json"),
+            "cashout-history": lambda: authed.get(reverse("cashout-history")),
+            "marketing-materials": lambda: authed.get(reverse("marketing-materials")),
+            "product-list": lambda: authed.get(reverse("product-list")),
+            "product-detail": lambda: client.get(reverse("product-detail", args=[product_id])),
+            "get-affiliate-link": lambda: authed.get(reverse("get-affiliate-link", args=[product_id])),
+            "affiliate-links": lambda: authed.get(reverse("affiliate-links")),
+            "place-order": lambda: client.post(reverse("place-order"), {
+                "product": product_id, "affiliate_username": user.username,
+                "buyer_phone": "0800", "payment_method": "bank",
+            }),
+        }
+
+    def run(self, endpoints, iterations):
+        self.analyze()
+        caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")].clear()
+        results = {}
+        for name, call in endpoints.items():
+            results[name] = benchmarking.measure(self.checked(name, call), iterations=iterations)
+        return results
+
+    @staticmethod
+    def checked(name, call):
+        """``call``, failing the run when the response is not the endpoint's success status."""
+        expected = 201 if name in CREATED else 200
+
+        def request():
+            response = call()
+            if response.status_code != expected:
+                raise CommandError(
+                    f"{name} answered {response.status_code}, expected {expected}: {response.content[:200]!r}"
+                )
+            return response
+        return request
+
+    def set_indexes(self, enabled):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+
+    def analyze(self):
+        # Refresh planner statistics so both runs see the current index set
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
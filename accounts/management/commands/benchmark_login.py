@@ -0,0 +1,95 @@
+import asyncio
+import importlib.util
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import benchmarking
+from accounts.models import CustomUser
+
+POLICIES = {
+    "pbkdf2": "accounts.hashers.PBKDF2PasswordHasher",
+    "scrypt": "accounts.hashers.ScryptPasswordHasher",
+    "argon2": "accounts.hashers.Argon2PasswordHasher",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Log in repeatedly in a throwaway database and report logins/sec for each password hasher "
+        "policy: one at a time through the sync view, and concurrently through the async view "
+        "(hashing on the bounded pool)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=50)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=16, help="In-flight async logins.")
+        parser.add_argument("--policies", nargs="+", choices=list(POLICIES), default=list(POLICIES))
+
+    def handle(self, *args, **options):
+        rows = []
+        unthrottled = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {
+            scope: "1000000/s" for scope in settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+        }}
+        with benchmarking.throwaway_database():
+            self.stdout.write("Seeding...")
+            affiliates = benchmarking.seed(
+                users=options["users"], commissions=0, cashouts=0, products=1, orders=0, materials=0
+            )
+            identifiers = [
+                # Alternate usernames and phones: both resolve in the same single query
+                user.username if i % 2 else user.phone for i, user in enumerate(affiliates)
+            ]
+
+            for policy in options["policies"]:
+                if policy == "argon2" and importlib.util.find_spec("argon2") is None:
+                    self.stderr.write("Skipping argon2: argon2-cffi is not installed.")
+                    continue
+                hashers = [POLICIES[policy]] + [h for h in settings.PASSWORD_HASHERS if h != POLICIES[policy]]
+                # Every login comes from one client: lift the per-IP rate limit
+                with override_settings(PASSWORD_HASHERS=hashers, REST_FRAMEWORK=unthrottled):
+                    CustomUser.objects.update(password=make_password(benchmarking.BENCH_PASSWORD))
+                    sync_rate = options["logins"] / self.sync_logins(identifiers, options["logins"])
+                    async_rate = options["logins"] / asyncio.run(
+                        self.async_logins(identifiers, options["logins"], options["concurrency"])
+                    )
+                rows.append([policy, f"{sync_rate:.1f}", f"{async_rate:.1f}"])
+
+        self.stdout.write(benchmarking.format_table(
+            ["hasher", "sync logins/sec", f"async logins/sec (x{options['concurrency']})"], rows
+        ))
+
+    def credentials(self, identifiers, i):
+        return {"identifier": identifiers[i % len(identifiers)], "password": benchmarking.BENCH_PASSWORD}
+
+    def sync_logins(self, identifiers, count):
+        client = APIClient()
+        url = reverse("login")
+        started = time.perf_counter()
+        for i in range(count):
+            response = client.post(url, self.credentials(identifiers, i), format="json")
+            if response.status_code != 200:
+                raise RuntimeError(response.content)
+        return time.perf_counter() - started
+
+    async def async_logins(self, identifiers, count, concurrency):
+        client = AsyncClient()
+        url = reverse("login-async")
+        slots = asyncio.Semaphore(concurrency)
+
+        async def login(i):
+            async with slots:
+                response = await client.post(url, self.credentials(identifiers, i), content_type="application/json")
+            if response.status_code != 200:
+                raise RuntimeError(response.content)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(count)))
+        return time.perf_counter() - started
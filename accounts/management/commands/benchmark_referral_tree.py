@@ -0,0 +1,111 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts import benchmarking, referral_tree
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a referral tree in a throwaway database and time downline size, depth and upline "
+        "lookups for nodes with small to huge downlines: stored columns and one path-prefix scan "
+        "against walking referred_by level by level."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=100_000)
+        parser.add_argument("--chain-probability", type=float, default=0.5,
+                            help="Chance a node is referred by the previous one rather than a random earlier one.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Users per bulk_create.")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmarking.throwaway_database():
+            self.stdout.write(f"Building a {options['nodes']}-node tree...")
+            started = time.perf_counter()
+            ids = self.build(options)
+            self.stdout.write(f"Built in {time.perf_counter() - started:.1f}s")
+
+            rows = []
+            for label, user in self.samples(ids):
+                stats = {}
+                for name, lookup in (
+                    ("stored", self.stored), ("path scan", self.path_scan), ("walk", self.walk),
+                ):
+                    with CaptureQueriesContext(connection) as queries:
+                        lookup(user)
+                    result = lookup(user)
+                    stats[name] = (
+                        benchmarking.measure(lambda: lookup(user), iterations=options["iterations"])["median"],
+                        len(queries), result,
+                    )
+                if not stats["stored"][2] == stats["path scan"][2] == stats["walk"][2]:
+                    raise RuntimeError(f"Downline sizes disagree for {label}: {stats}")
+                rows.append([
+                    label, user.referral_depth, user.downline_size,
+                    *(f"{stats[name][0]:.2f} ms / {stats[name][1]}q" for name in ("stored", "path scan", "walk")),
+                ])
+
+        self.stdout.write(benchmarking.format_table(
+            ["node", "depth", "downline", "stored columns", "path prefix count", "referred_by walk"], rows
+        ))
+
+    def build(self, options):
+        """Insert a random tree a level at a time, so every referrer has an id first."""
+        rng = random.Random(options["seed"])
+        parents = [None]
+        for i in range(1, options["nodes"]):
+            parents.append(i - 1 if rng.random() < options["chain_probability"] else rng.randrange(i))
+        depths = [0] * options["nodes"]
+        for i in range(1, options["nodes"]):
+            depths[i] = depths[parents[i]] + 1
+
+        levels = {}
+        for i, depth in enumerate(depths):
+            levels.setdefault(depth, []).append(i)
+        ids = [None] * options["nodes"]
+        chunk_size = options["chunk_size"]
+        for depth in sorted(levels):
+            nodes = levels[depth]
+            for start in range(0, len(nodes), chunk_size):
+                users = [
+                    CustomUser(
+                        username=f"tree{i}", phone=f"tree{i}", email=f"tree{i}@example.com", password="!",
+                        referred_by_id=ids[parents[i]] if parents[i] is not None else None,
+                    )
+                    for i in nodes[start:start + chunk_size]
+                ]
+                CustomUser.objects.bulk_create(users)
+                for i, user in zip(nodes[start:start + chunk_size], users):
+                    ids[i] = user.pk
+        return ids
+
+    def samples(self, ids):
+        users = CustomUser.objects.filter(pk__in=ids)
+        deepest = users.order_by("-referral_depth", "pk").first()
+        picks = [
+            ("root", users.get(pk=ids[0])),
+            ("largest non-root", users.exclude(pk=ids[0]).order_by("-downline_size", "pk").first()),
+            ("mid-size", users.filter(downline_size__gte=50).order_by("downline_size", "pk").first()),
+            ("small", users.filter(downline_size__gte=5).order_by("downline_size", "pk").first()),
+            ("deepest leaf", deepest),
+        ]
+        return [(label, user) for label, user in picks if user is not None]
+
+    def stored(self, user):
+        return CustomUser.objects.values_list("downline_size", flat=True).get(pk=user.pk)
+
+    def path_scan(self, user):
+        return referral_tree.downline(user).count()
+
+    def walk(self, user):
+        total, level = 0, [user.pk]
+        while level:
+            level = list(CustomUser.objects.filter(referred_by_id__in=level).values_list("pk", flat=True))
+            total += len(level)
+        return total
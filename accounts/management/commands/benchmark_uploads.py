@@ -0,0 +1,178 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from importlib.util import find_spec
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from PIL import Image
+
+from accounts import benchmarking
+from accounts.models import CustomUser, Order, Product
+
+GUNICORN_CONFIG = os.path.join(settings.BASE_DIR, "bjsolutions", "gunicorn.conf.py")
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the WSGI and ASGI deployments from bjsolutions/gunicorn.conf.py against a throwaway "
+        "database, hold their workers with slow proof_of_payment uploads, and report the latency of "
+        "product-detail requests arriving meanwhile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--slow-clients", type=int, default=8)
+        parser.add_argument("--upload-kb", type=int, default=256)
+        parser.add_argument("--upload-seconds", type=float, default=5.0, help="Time each slow client takes to send its upload.")
+        parser.add_argument("--fast-requests", type=int, default=40)
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        missing = [module for module in ("gunicorn", "uvicorn") if find_spec(module) is None]
+        if missing:
+            raise CommandError(f"benchmark_uploads needs {', '.join(missing)} installed.")
+
+        rows = []
+        with benchmarking.throwaway_database():
+            if connection.vendor == "sqlite" and connection.is_in_memory_db():
+                raise CommandError("The server processes cannot open an in-memory test database; give it a TEST NAME.")
+            benchmarking.seed(users=1, commissions=0, cashouts=0, products=1, orders=0, materials=0)
+            self.affiliate = CustomUser.objects.get().username
+            self.product_id = Product.objects.get().pk
+            self.upload = self.make_upload(options["upload_kb"])
+
+            for mode in ("wsgi", "asgi"):
+                self.stdout.write(f"Running {mode.upper()} with {options['workers']} workers...")
+                with self.server(mode, options["workers"], options["port"]):
+                    result = asyncio.run(self.scenario(mode, options))
+                rows.append([
+                    mode.upper(),
+                    f"{result['uploads_ok']}/{options['slow_clients']}",
+                    f"{result['upload_median']:.2f}",
+                    f"{result['fast']['median']:.1f}", f"{result['fast']['p95']:.1f}", f"{result['fast']['max']:.1f}",
+                ])
+                for order in Order.objects.exclude(proof_of_payment=""):
+                    order.proof_of_payment.delete(save=False)
+                Order.objects.all().delete()
+
+        self.stdout.write(benchmarking.format_table(
+            ["deployment", "uploads stored", "upload s p50", "detail p50 ms", "detail p95 ms", "detail max ms"], rows
+        ))
+
+    def make_upload(self, kilobytes):
+        """A valid PNG of roughly ``kilobytes`` (noise does not compress)."""
+        side = max(1, int((kilobytes * 1024 / 3) ** 0.5))
+        buffer = BytesIO()
+        Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    @contextmanager
+    def server(self, mode, workers, port):
+        env = {
+            **os.environ,
+            "SERVER_MODE": mode, "WEB_CONCURRENCY": str(workers), "PORT": str(port),
+            "NUM_PROXIES": os.environ.get("NUM_PROXIES", "0"),  # clients connect directly
+            # The project settings read the database name from DB_NAME
+            "DB_NAME": str(connection.settings_dict["NAME"]),
+        }
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", GUNICORN_CONFIG, "--access-logfile", "/dev/null"],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_port(port, process)
+            yield
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def wait_for_port(self, port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("The server exited during startup; run it by hand to see why.")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not start listening on port {port}.")
+
+    async def scenario(self, mode, options):
+        suffix = "" if mode == "wsgi" else "-async"
+        order_path = reverse(f"place-order{suffix}")
+        detail_path = reverse(f"product-detail{suffix}", args=[self.product_id])
+        port = options["port"]
+
+        uploads = [
+            asyncio.create_task(self.slow_upload(port, order_path, options["upload_seconds"]))
+            for _ in range(options["slow_clients"])
+        ]
+        # Let the uploads occupy the workers before the fast requests arrive
+        await asyncio.sleep(min(1.0, options["upload_seconds"] / 4))
+        fast = await asyncio.gather(*(
+            self.request(port, "GET", detail_path) for _ in range(options["fast_requests"])
+        ))
+        uploads = await asyncio.gather(*uploads)
+
+        latencies = sorted(elapsed * 1000 for _, elapsed in fast)
+        return {
+            "uploads_ok": sum(status == 201 for status, _ in uploads),
+            "upload_median": statistics.median(elapsed for _, elapsed in uploads),
+            "fast": {
+                "median": statistics.median(latencies),
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            },
+        }
+
+    async def slow_upload(self, port, path, seconds, chunks=50):
+        boundary = uuid.uuid4().hex
+        fields = {
+            "product": self.product_id, "affiliate_username": self.affiliate,
+            "buyer_phone": "0800", "payment_method": "bank",
+        }
+        body = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        ) + (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="proof_of_payment"; filename="proof.png"\r\n'
+            f"Content-Type: image/png\r\n\r\n"
+        ).encode() + self.upload + f"\r\n--{boundary}--\r\n".encode()
+
+        step = -(-len(body) // chunks)
+        return await self.request(
+            port, "POST", path, body=[body[i:i + step] for i in range(0, len(body), step)],
+            content_type=f"multipart/form-data; boundary={boundary}", pause=seconds / chunks,
+        )
+
+    async def request(self, port, method, path, body=(), content_type=None, pause=0.0):
+        """Send one HTTP/1.1 request, trickling ``body`` chunks ``pause`` seconds apart; returns (status, seconds)."""
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        length = sum(len(chunk) for chunk in body)
+        head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+        if content_type:
+            head += f"Content-Type: {content_type}\r\nContent-Length: {length}\r\n"
+        writer.write(f"{head}\r\n".encode())
+        for chunk in body:
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(pause)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return int(status_line.split()[1]), time.perf_counter() - started
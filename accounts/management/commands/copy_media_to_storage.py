@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+
+# Media directories and the storage alias their files belong to
+DIRECTORIES = {
+    "payments": "proofs",
+    "products": "default",
+    "profile_pics": "default",
+    "marketing_materials": "default",
+    "variants": "default",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy media files from a local directory (MEDIA_ROOT by default) into the configured "
+        "storages, e.g. after switching to MEDIA_STORAGE=s3. Files keep their names, so stored "
+        "FileField values stay valid. Files already present are skipped unless --overwrite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=None, help="Local media directory (default: MEDIA_ROOT).")
+        parser.add_argument("--workers", type=int, default=16, help="Files uploaded in parallel.")
+        parser.add_argument("--overwrite", action="store_true", help="Replace files that already exist.")
+
+    def handle(self, *args, **options):
+        source = options["source"] or str(settings.MEDIA_ROOT)
+        if not os.path.isdir(source):
+            raise CommandError(f"{source} is not a directory.")
+        self.overwrite = options["overwrite"]
+
+        jobs = []
+        for directory, alias in DIRECTORIES.items():
+            for root, _, filenames in os.walk(os.path.join(source, directory)):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, source).replace(os.sep, "/")
+                    jobs.append((storages[alias], name, path))
+
+        copied = skipped = failed = size = 0
+        # Uploads are network-bound, so threads overlap the round trips
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            for name, result in zip((job[1] for job in jobs), pool.map(self.copy, jobs)):
+                if isinstance(result, Exception):
+                    failed += 1
+                    self.stderr.write(f"{name}: {result}")
+                elif result is None:
+                    skipped += 1
+                else:
+                    copied += 1
+                    size += result
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {copied} files copied ({size / (1024 * 1024):.1f} MB), {skipped} already present, {failed} failed."
+        ))
+
+    def copy(self, job):
+        """Bytes copied, None when skipped, or the exception raised."""
+        storage, name, path = job
+        try:
+            if storage.exists(name):
+                if not self.overwrite:
+                    return None
+                storage.delete(name)
+            with open(path, "rb") as fh:
+                stored = storage.save(name, File(fh, name=os.path.basename(name)))
+            if stored != name:
+                raise OSError(f"stored as {stored}")
+            return os.path.getsize(path)
+        except Exception as exc:
+            return exc
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts import proofs
+from accounts.models import Order
+
+
+def _optimize(order_id):
+    try:
+        return proofs.optimize(order_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Re-encode every proof of payment not yet processed (uploads from before background processing)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Images re-encoded in parallel (1 runs inline).")
+
+    def handle(self, *args, **options):
+        pending = list(
+            Order.objects.filter(proof_bytes_saved__isnull=True)
+            .exclude(proof_of_payment="").exclude(proof_of_payment__isnull=True)
+            .order_by("pk").values_list("pk", flat=True)
+        )
+        if options["workers"] > 1:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                results = [saved for saved in pool.map(_optimize, pending) if saved is not None]
+        else:
+            results = [saved for saved in map(proofs.optimize, pending) if saved is not None]
+
+        saved = sum(results)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(results)} proofs processed, {saved / (1024 * 1024):.1f} MB saved."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from accounts import ledger
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyLedger rows from Commission and CashoutRequest history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="users", default=[],
+                            help="Only rebuild this username (repeatable).")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Users rebuilt per transaction.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows per bulk_create INSERT.")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by("pk")
+        if options["users"]:
+            users = users.filter(username__in=options["users"])
+        user_ids = list(users.values_list("pk", flat=True))
+
+        chunk_size = options["chunk_size"]
+        total_rows = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            total_rows += ledger.rebuild(chunk, batch_size=options["batch_size"])
+            self.stdout.write(f"Rebuilt {min(start + chunk_size, len(user_ids))}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total_rows} ledger rows written."))
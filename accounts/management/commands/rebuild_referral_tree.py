@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts import referral_tree
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's referral path, depth and downline size from referred_by."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = referral_tree.rebuild(CustomUser)
+        self.stdout.write(self.style.SUCCESS(f"✅ Referral tree rebuilt for {total} users."))
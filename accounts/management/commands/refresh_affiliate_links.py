@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from accounts.links import build_link
+from accounts.models import AffiliateLink, CustomUser, Product
+
+
+class Command(BaseCommand):
+    help = "Create or refresh AffiliateLink rows for every (affiliate, product) pair in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="users", default=[],
+                            help="Only refresh this username (repeatable).")
+        parser.add_argument("--chunk-size", type=int, default=200,
+                            help="Affiliates handled per upsert round.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows per INSERT ... ON CONFLICT statement.")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_active=True).order_by("pk")
+        if options["users"]:
+            users = users.filter(username__in=options["users"])
+        affiliates = list(users.values_list("pk", "username"))
+        product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+
+        chunk_size = options["chunk_size"]
+        total = 0
+        for start in range(0, len(affiliates), chunk_size):
+            links = [
+                AffiliateLink(user_id=user_id, product_id=product_id, link=build_link(username, product_id))
+                for user_id, username in affiliates[start:start + chunk_size]
+                for product_id in product_ids
+            ]
+            AffiliateLink.objects.bulk_create(
+                links,
+                batch_size=options["batch_size"],
+                update_conflicts=True,
+                unique_fields=["user", "product"],
+                update_fields=["link"],
+            )
+            total += len(links)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} affiliate links written."))
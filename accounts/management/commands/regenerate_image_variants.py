@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts import images, variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the fixed-width WebP variants of every product picture and profile picture, "
+        "rendering in parallel across CPU cores. Existing variants are reused unless --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Rendering processes (1 renders in this process).")
+        parser.add_argument("--force", action="store_true", help="Re-render variants that already exist.")
+
+    def handle(self, *args, **options):
+        jobs = [
+            (model, instance)
+            for model, field in variants.FIELDS.items()
+            for instance in model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            .only(field).order_by("pk")
+        ]
+
+        workers = options["workers"]
+        pool = None
+        if workers > 1:
+            # Forked workers must not inherit open database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+
+        self.done = self.failed = 0
+        try:
+            # Bounded batches keep only a few source images in memory at once
+            batch_size = workers * 4
+            for start in range(0, len(jobs), batch_size):
+                self.run_batch(jobs[start:start + batch_size], pool, options["force"])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Variants ready for {self.done} pictures ({self.failed} failed)."))
+
+    def run_batch(self, batch, pool, force):
+        rendering = []
+        for model, instance in batch:
+            fieldfile = getattr(instance, variants.FIELDS[model])
+            try:
+                digest, data, missing = variants.plan(fieldfile, force)
+            except OSError as exc:
+                self.fail(model, instance, exc)
+                continue
+            if not missing:
+                render = dict
+            elif pool is None:
+                render = lambda data=data, missing=missing: images.widths(data, missing)  # noqa: E731
+            else:
+                render = pool.submit(images.widths, data, missing).result
+            rendering.append((model, instance, fieldfile, digest, render))
+
+        # Storage writes and the hash UPDATE stay in this process
+        for model, instance, fieldfile, digest, render in rendering:
+            try:
+                variants.store(fieldfile.storage, digest, render())
+            except Exception as exc:
+                self.fail(model, instance, exc)
+                continue
+            variants.record(model, instance.pk, digest)
+            self.done += 1
+
+    def fail(self, model, instance, exc):
+        self.failed += 1
+        self.stderr.write(f"{model.__name__} {instance.pk}: {exc}")
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts import direct_uploads
+from accounts.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete direct proof uploads (payments/uploads/) that no order claimed before their token "
+        "expired. Run it from cron, or use a bucket lifecycle rule on the prefix instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=direct_uploads.TOKEN_MAX_AGE,
+                            help="Seconds since upload (default: the token lifetime).")
+        parser.add_argument("--dry-run", action="store_true", help="List what would be deleted.")
+
+    def handle(self, *args, **options):
+        if not direct_uploads.enabled():
+            self.stdout.write("Direct uploads are not enabled; nothing to sweep.")
+            return
+
+        store = direct_uploads.storage()
+        cutoff = timezone.now() - timedelta(seconds=options["older_than"])
+        _, filenames = store.listdir(direct_uploads.UPLOAD_PREFIX)
+        names = [f"{direct_uploads.UPLOAD_PREFIX}{filename}" for filename in filenames]
+        expired = [name for name in names if store.get_modified_time(name) <= cutoff]
+        claimed = set()
+        for start in range(0, len(expired), 500):
+            claimed.update(
+                Order.objects.filter(proof_of_payment__in=expired[start:start + 500])
+                .values_list("proof_of_payment", flat=True)
+            )
+
+        swept = [name for name in expired if name not in claimed]
+        for name in swept:
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                store.delete(name)
+
+        verb = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(swept)} unclaimed uploads {verb}, {len(claimed)} attached to orders, "
+            f"{len(names) - len(expired)} still within their token lifetime."
+        ))
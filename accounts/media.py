@@ -0,0 +1,182 @@
+# accounts/media.py
+"""
+Serving uploaded media.
+
+``MEDIA_SERVING`` picks who moves the bytes for ``/media/<path>``:
+
+* ``"django"`` (default): a streamed response with ETag/Last-Modified
+  revalidation and single byte-range support (resumable downloads, video
+  seeking), built by :func:`ranged_file_response`.
+* ``"x-accel-redirect"``: nginx sends the file. Django only resolves the path
+  and answers with ``X-Accel-Redirect: <MEDIA_ACCEL_REDIRECT_PREFIX><path>``;
+  nginx needs a matching internal location, e.g.::
+
+      location /protected-media/ { internal; alias /app/media/; }
+
+* ``"x-sendfile"``: Apache (mod_xsendfile) or lighttpd send the file named in
+  ``X-Sendfile``.
+
+The front-end server handles Range and conditional requests itself in the
+last two modes. Whole-file responses in ``"django"`` mode are FileResponses,
+which WSGI servers with ``wsgi.file_wrapper`` (gunicorn) send with
+``os.sendfile``. Content-addressed image variants (``variants/``) never
+change and are cached as immutable; other media is revalidated daily.
+:func:`stored_file_response` applies the same rules to any storage, and
+redirects to the file's own URL when it lives in object storage.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_PREFIXES = ("variants/",)
+
+
+def _stream(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _requested_range(request, size, etag, last_modified):
+    """
+    ``(start, end)`` (inclusive) for a satisfiable single Range header, None to
+    send the whole file, or ``False`` when the range cannot be satisfied.
+    """
+    header = request.META.get("HTTP_RANGE", "").strip()
+    match = RANGE_RE.match(header)
+    if not match or not any(match.groups()):
+        return None  # absent, malformed or multi-range: a full 200 is always acceptable
+
+    # If-Range: only honour the range when the client's copy is still current
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        start, end = max(0, size - int(last)), size - 1  # suffix range: the final N bytes
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _set_disposition(response, filename, as_attachment):
+    if filename:
+        disposition = "attachment" if as_attachment else "inline"
+        response["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+def ranged_file_response(request, file, size, modified_time, content_type=None,
+                         filename=None, as_attachment=False):
+    """
+    Stream ``file`` (an open binary file of ``size`` bytes, last modified at
+    the ``modified_time`` timestamp) with ETag/Last-Modified validators and
+    ``Range``/``If-Range`` support. Takes ownership of ``file``.
+    """
+    last_modified = int(modified_time)
+    etag = quote_etag(f"{last_modified:x}-{size:x}")
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        file.close()
+    else:
+        byte_range = _requested_range(request, size, etag, last_modified)
+        if byte_range is False:
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        else:
+            content_type = content_type or "application/octet-stream"
+            if byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    _stream(file, start, end - start + 1), status=206, content_type=content_type
+                )
+                response["Content-Length"] = str(end - start + 1)
+                response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            else:
+                # Whole file: eligible for the server's sendfile path
+                response = FileResponse(file, content_type=content_type)
+                response["Content-Length"] = str(size)
+            _set_disposition(response, filename, as_attachment)
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _local_file_response(request, path, fullpath, filename=None, as_attachment=False):
+    """Serve ``fullpath`` (``path`` relative to MEDIA_ROOT) in the configured MEDIA_SERVING mode."""
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    mode = getattr(settings, "MEDIA_SERVING", "django")
+    if mode in ("x-accel-redirect", "x-sendfile"):
+        response = HttpResponse(content_type=content_type)
+        if mode == "x-accel-redirect":
+            response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+        else:
+            response["X-Sendfile"] = fullpath
+        _set_disposition(response, filename, as_attachment)
+    else:
+        stat = os.stat(fullpath)
+        response = ranged_file_response(
+            request, open(fullpath, "rb"), stat.st_size, stat.st_mtime, content_type,
+            filename=filename, as_attachment=as_attachment,
+        )
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
+
+
+def stored_file_response(request, fieldfile, as_attachment=False):
+    """
+    Serve a FileField's file: from disk (ranged, or offloaded to the
+    front-end server) when its storage is local, otherwise by redirecting to
+    the storage URL, which does its own Range handling.
+    """
+    try:
+        fullpath = fieldfile.path
+    except NotImplementedError:
+        return HttpResponseRedirect(fieldfile.url)
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found")
+    return _local_file_response(
+        request, fieldfile.name, fullpath,
+        filename=os.path.basename(fieldfile.name), as_attachment=as_attachment,
+    )
+
+
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found")
+
+    response = _local_file_response(request, path, fullpath)
+
+    if path.startswith(IMMUTABLE_PREFIXES):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=24 * 60 * 60)
+    return response
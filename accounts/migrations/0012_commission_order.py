@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:11
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SALE_REFERENCE = re.compile(r"^Order (\d+) - ")
+
+
+def backfill_commission_order(apps, schema_editor):
+    """Link existing commissions to their Order by parsing ``sale_reference``."""
+    Commission = apps.get_model("accounts", "Commission")
+    Order = apps.get_model("accounts", "Order")
+
+    candidates = {}
+    for pk, user_id, reference in Commission.objects.filter(
+        sale_reference__startswith="Order "
+    ).order_by("pk").values_list("pk", "user_id", "sale_reference").iterator():
+        match = SALE_REFERENCE.match(reference)
+        if match:
+            # Keep the first commission per (order, user); later duplicates stay unlinked
+            candidates.setdefault((int(match.group(1)), user_id), pk)
+
+    affiliates = dict(Order.objects.filter(
+        pk__in={order_id for order_id, _ in candidates}
+    ).values_list("pk", "affiliate_id"))
+
+    linked = []
+    for (order_id, user_id), pk in candidates.items():
+        if affiliates.get(order_id) == user_id:
+            linked.append(Commission(pk=pk, order_id=order_id))
+    Commission.objects.bulk_update(linked, ["order"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    # The backfill's FK writes leave deferred trigger events pending on
+    # PostgreSQL, which then refuses the ALTER TABLE of AddConstraint in the
+    # same transaction; each operation commits on its own instead
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0011_dailyledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="commission",
+            name="order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="commissions",
+                to="accounts.order",
+            ),
+        ),
+        migrations.RunPython(backfill_commission_order, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="commission",
+            constraint=models.UniqueConstraint(
+                fields=("order", "user"), name="unique_commission_per_order_user"
+            ),
+        ),
+    ]
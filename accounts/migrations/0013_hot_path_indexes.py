@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0012_commission_order"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cashoutrequest",
+            index=models.Index(
+                fields=["user", "status"], name="cashout_user_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cashoutrequest",
+            index=models.Index(
+                fields=["user", "-created_at"], name="cashout_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cashoutrequest",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["created_at"],
+                name="cashout_pending_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="commission",
+            index=models.Index(
+                fields=["user", "status"], name="commission_user_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="commission",
+            index=models.Index(
+                fields=["user", "-created_at"], name="commission_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "-created_at"], name="order_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="withdrawal",
+            index=models.Index(
+                fields=["user", "status"], name="withdrawal_user_status_idx"
+            ),
+        ),
+    ]
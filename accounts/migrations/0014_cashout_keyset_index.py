@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0013_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="cashoutrequest",
+            name="cashout_user_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="cashoutrequest",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="cashout_user_created_idx"
+            ),
+        ),
+    ]
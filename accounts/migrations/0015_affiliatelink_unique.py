@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:17
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_links(apps, schema_editor):
+    """Keep the oldest AffiliateLink per (user, product) before enforcing uniqueness."""
+    AffiliateLink = apps.get_model("accounts", "AffiliateLink")
+    keep = AffiliateLink.objects.values("user", "product").annotate(first=Min("id")).values("first")
+    AffiliateLink.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0014_cashout_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_links, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="affiliatelink",
+            constraint=models.UniqueConstraint(
+                fields=("user", "product"), name="unique_affiliate_link_per_product"
+            ),
+        ),
+    ]
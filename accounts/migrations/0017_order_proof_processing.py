@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0016_affiliate_clicks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="proof_bytes_saved",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="proof_thumbnail",
+            field=models.ImageField(
+                blank=True, editable=False, null=True, upload_to="payments/thumbnails/"
+            ),
+        ),
+    ]
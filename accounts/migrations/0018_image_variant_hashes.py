@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0017_order_proof_processing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="profile_picture_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="picture_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:39
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0018_image_variant_hashes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="proof_of_payment",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=accounts.models.proof_storage,
+                upload_to="payments/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="proof_thumbnail",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                null=True,
+                storage=accounts.models.proof_storage,
+                upload_to="payments/thumbnails/",
+            ),
+        ),
+    ]
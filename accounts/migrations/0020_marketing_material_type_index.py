@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_proof_storage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="marketingmaterial",
+            index=models.Index(
+                fields=["material_type", "-uploaded_at", "-id"],
+                name="material_type_uploaded_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0020_marketing_material_type_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="marketingmaterial",
+            name="download_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+def create_sequence_row(apps, schema_editor):
+    ReferralCodeSequence = apps.get_model("accounts", "ReferralCodeSequence")
+    ReferralCodeSequence.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0021_marketing_material_download_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferralCodeSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        # CustomUserManager is not used in migrations; historical models get a plain manager
+        migrations.AlterModelManagers(
+            name="customuser",
+            managers=[],
+        ),
+        migrations.RunPython(create_sequence_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+from accounts import referral_tree
+
+
+def build_referral_tree(apps, schema_editor):
+    """Paths, depths and downline sizes for the existing ``referred_by`` links."""
+    referral_tree.rebuild(apps.get_model("accounts", "CustomUser"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0022_referral_code_sequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="downline_size",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="referral_depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="referral_path",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=500
+            ),
+        ),
+        migrations.AlterField(
+            model_name="commission",
+            name="commission_type",
+            field=models.CharField(
+                choices=[
+                    ("flat", "Flat"),
+                    ("percent", "Percent"),
+                    ("referral", "Referral"),
+                ],
+                default="percent",
+                max_length=10,
+            ),
+        ),
+        migrations.RunPython(build_referral_tree, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0023_referral_tree"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("proof_of_payment", ""), _negated=True),
+                fields=("proof_of_payment",),
+                name="order_unique_proof_of_payment",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:02
+
+from django.db import migrations
+
+from accounts import referral_codes
+
+SEQUENCE = "accounts_referral_code_seq"
+MAX_VALUE = 2 ** referral_codes.BITS - 1  # permute() runs out past this
+
+
+def create_sequence(apps, schema_editor):
+    """On PostgreSQL, continue the counter in a real sequence from where the table left it."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    ReferralCodeSequence = apps.get_model("accounts", "ReferralCodeSequence")
+    rows = ReferralCodeSequence.objects.using(schema_editor.connection.alias).filter(pk=1)
+    last = rows.values_list("last_value", flat=True).first() or 0
+    schema_editor.execute(
+        f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} AS bigint MINVALUE 1 MAXVALUE {MAX_VALUE} START WITH {last + 1}"
+    )
+
+
+def drop_sequence(apps, schema_editor):
+    """Hand the counter back to the table, so no value is issued twice."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {SEQUENCE}")
+        (last,) = cursor.fetchone()
+    ReferralCodeSequence = apps.get_model("accounts", "ReferralCodeSequence")
+    ReferralCodeSequence.objects.using(schema_editor.connection.alias).update_or_create(
+        pk=1, defaults={"last_value": last}
+    )
+    schema_editor.execute(f"DROP SEQUENCE {SEQUENCE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0024_order_unique_proof_of_payment"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -1,7 +1,37 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import connections, models, router, transaction
 from django.conf import settings
-import uuid
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import LazyObject, empty
+
+from . import referral_codes, referral_tree
+from .links import build_link
+
+
+class ProofStorage(LazyObject):
+    """
+    ``STORAGES["proofs"]``, resolved on first use like ``default_storage``
+    (signed URLs when proofs live in a bucket).
+    """
+    def _setup(self):
+        self._wrapped = storages["proofs"]
+
+
+_proof_storage = ProofStorage()
+
+
+def proof_storage():
+    return _proof_storage
+
+
+@receiver(setting_changed)
+def reset_proof_storage(setting, **kwargs):
+    if setting == "STORAGES":
+        _proof_storage._wrapped = empty
 
 
 class Earnings(models.Model):
@@ -44,15 +74,74 @@ class Withdrawal(models.Model):
     status = models.CharField(max_length=20, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="withdrawal_user_status_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} ({self.status})"
 
 
+class ReferralCodeSequence(models.Model):
+    """
+    Counter behind referral codes (accounts/referral_codes.py). On PostgreSQL
+    it is the ``accounts_referral_code_seq`` sequence (migration 0025), whose
+    ``nextval`` never blocks concurrent sign-ups; elsewhere this single-row
+    table, whose UPDATE serializes them until commit.
+    """
+    SEQUENCE = "accounts_referral_code_seq"
+
+    last_value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count):
+        """Reserve ``count`` counter values and return their referral codes."""
+        if count <= 0:
+            return []
+        connection = connections[router.db_for_write(cls)]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT nextval(%s::regclass) FROM generate_series(1, %s)", [cls.SEQUENCE, count])
+                return [referral_codes.code_for(number) for (number,) in cursor.fetchall()]
+
+        with transaction.atomic(using=connection.alias):
+            # The UPDATE locks the row until commit, so the read sees this reservation
+            reserve = cls.objects.filter(pk=1)
+            if not reserve.update(last_value=models.F("last_value") + count):
+                # The migration creates the row; a flushed database (TransactionTestCase) has none
+                cls.objects.get_or_create(pk=1)
+                reserve.update(last_value=models.F("last_value") + count)
+            last = cls.objects.values_list("last_value", flat=True).get(pk=1)
+        return [referral_codes.code_for(number) for number in range(last - count + 1, last + 1)]
+
+
+class CustomUserManager(UserManager):
+    # Kept out of migrations: historical models must not allocate codes or
+    # touch the referral tree through today's schema
+    use_in_migrations = False
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so hand out the missing codes here, in one
+        # reservation, and place the users in the referral tree
+        objs = list(objs)
+        missing = [user for user in objs if not user.referral_code]
+        for user, code in zip(missing, ReferralCodeSequence.allocate(len(missing))):
+            user.referral_code = code
+        with transaction.atomic(using=self.db):
+            referral_tree.place(objs)
+            created = super().bulk_create(objs, *args, **kwargs)
+            referral_tree.added(objs)
+        return created
+
+
 class CustomUser(AbstractUser):
     phone = models.CharField(max_length=20, unique=True)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     full_name = models.CharField(max_length=150, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # sha256 of profile_picture once its width variants exist (accounts/variants.py)
+    profile_picture_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     bank_name = models.CharField(max_length=100, blank=True, null=True)
     bank_account = models.CharField(max_length=50, blank=True, null=True)
@@ -69,23 +158,64 @@ class CustomUser(AbstractUser):
         on_delete=models.SET_NULL,
         related_name="user_referrals"
     )
+    # Materialized referral tree, kept in sync by save() (accounts/referral_tree.py)
+    referral_path = models.CharField(
+        max_length=referral_tree.MAX_PATH_LENGTH, blank=True, default="", db_index=True, editable=False
+    )
+    referral_depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    downline_size = models.PositiveIntegerField(default=0, editable=False)
 
     REQUIRED_FIELDS = ["email", "phone"]
 
+    objects = CustomUserManager()
+
     def __str__(self):
         return self.username
 
+    def clean(self):
+        super().clean()
+        if self.pk and self.referred_by_id and (
+            self.referred_by_id == self.pk
+            or self.pk in referral_tree.ancestor_ids(self.referred_by.referral_path)
+        ):
+            raise ValidationError({"referred_by": "A user cannot be referred by someone in their own downline."})
+
     def save(self, *args, **kwargs):
+        deferred = self.get_deferred_fields()
         # Auto-generate referral code if not set
-        if not self.referral_code:
-            self.referral_code = str(uuid.uuid4()).replace("-", "")[:8].upper()
-        super().save(*args, **kwargs)
+        if "referral_code" not in deferred and not self.referral_code:
+            [self.referral_code] = ReferralCodeSequence.allocate(1)
+
+        if self._state.adding:
+            with transaction.atomic():
+                referral_tree.place([self])
+                super().save(*args, **kwargs)
+                referral_tree.added([self])
+            return
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            # The tree columns change under loaded instances (a referral joins,
+            # an ancestor moves), and the balance under concurrent F() credits
+            # and debits (accounts/balances.py); never write them back from
+            # memory. Deferred fields are left out as Django's own save() would
+            update_fields = {
+                field.attname for field in self._meta.concrete_fields if not field.primary_key
+            } - deferred - referral_tree.COLUMNS - {"commission_balance"}
+        if not {"referred_by", "referred_by_id"} & set(update_fields):
+            super().save(*args, **{**kwargs, "update_fields": update_fields})
+            return
+        with transaction.atomic():
+            if referral_tree.move(self):
+                update_fields = {*update_fields, "referral_path", "referral_depth"}
+            super().save(*args, **{**kwargs, "update_fields": update_fields})
 
 
 class Commission(models.Model):
     COMMISSION_TYPE = [
         ('flat', 'Flat'),
-        ('percent', 'Percent')
+        ('percent', 'Percent'),
+        ('referral', 'Referral'),  # an upline's share (accounts/approvals.py)
     ]
 
     user = models.ForeignKey(
@@ -96,9 +226,26 @@ class Commission(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     commission_type = models.CharField(max_length=10, choices=COMMISSION_TYPE, default='percent')
     status = models.CharField(max_length=20, default="pending")  # pending, paid
-    sale_reference = models.CharField(max_length=255, blank=True, null=True)  # link to order
+    sale_reference = models.CharField(max_length=255, blank=True, null=True)  # human-readable order label
+    order = models.ForeignKey(
+        "Order",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="commissions"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # One commission per order and earner; backs duplicate-commission checks
+            models.UniqueConstraint(fields=["order", "user"], name="unique_commission_per_order_user"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "status"], name="commission_user_status_idx"),
+            models.Index(fields=["user", "-created_at"], name="commission_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} ({self.status})"
     
@@ -123,6 +270,19 @@ class CashoutRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="cashout_user_status_idx"),
+            # Keyset pagination order for cashout/history/
+            models.Index(fields=["user", "-created_at", "-id"], name="cashout_user_created_idx"),
+            # Admin review queue: only the small pending slice is indexed
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="pending"),
+                name="cashout_pending_created_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         # Calculate net_amount automatically on save
         self.net_amount = self.requested_amount - self.processing_fee
@@ -132,6 +292,27 @@ class CashoutRequest(models.Model):
         return f"{self.user.username} requested {self.requested_amount} ({self.status})"
 
 
+class DailyLedger(models.Model):
+    """Per-user daily rollup of commissions and cashouts backing the dashboard chart."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_ledger"
+    )
+    date = models.DateField()
+    commissions_in = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cashouts_out = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="unique_daily_ledger_per_user_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.closing_balance})"
+
+
 class MarketingMaterial(models.Model):
     MATERIAL_TYPES = [
         ("image", "Image"),
@@ -143,6 +324,14 @@ class MarketingMaterial(models.Model):
     file = models.FileField(upload_to="marketing_materials/")
     material_type = models.CharField(max_length=10, choices=MATERIAL_TYPES)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Written in batches by accounts/downloads.py
+    download_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Per-type keyset pages of marketing-materials/?type=
+            models.Index(fields=["material_type", "-uploaded_at", "-id"], name="material_type_uploaded_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.material_type})"
@@ -153,6 +342,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     commission_amount = models.DecimalField(max_digits=10, decimal_places=2)
     picture = models.ImageField(upload_to="products/")
+    # sha256 of picture once its width variants exist (accounts/variants.py)
+    picture_hash = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -164,10 +355,14 @@ class AffiliateLink(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     link = models.URLField(blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="unique_affiliate_link_per_product"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.link:
-            base_url = "http://127.0.0.1:8000"  # change later to your domain
-            self.link = f"{base_url}/product/{self.product.id}/?ref={self.user.username}"
+            self.link = build_link(self.user.username, self.product_id)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -190,9 +385,59 @@ class Order(models.Model):
     affiliate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="orders")
     buyer_phone = models.CharField(max_length=20)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
-    proof_of_payment = models.ImageField(upload_to="payments/", blank=True, null=True)
+    proof_of_payment = models.ImageField(upload_to="payments/", storage=proof_storage, blank=True, null=True)
+    # Filled in by the background re-encode (accounts/proofs.py); null until it has run
+    proof_thumbnail = models.ImageField(
+        upload_to="payments/thumbnails/", storage=proof_storage, blank=True, null=True, editable=False
+    )
+    proof_bytes_saved = models.IntegerField(null=True, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+        ]
+        constraints = [
+            # A direct upload (accounts/direct_uploads.py) backs one order only
+            models.UniqueConstraint(
+                fields=["proof_of_payment"],
+                condition=~models.Q(proof_of_payment=""),
+                name="order_unique_proof_of_payment",
+            ),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.product.name} ({self.status})"
+
+
+class AffiliateClick(models.Model):
+    """One deduplicated ``?ref=`` visit, written in batches by accounts.clicks."""
+    affiliate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="clicks")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="clicks")
+    fingerprint = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["affiliate", "product", "created_at"], name="click_affiliate_product_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.affiliate_id} → {self.product_id} @ {self.created_at}"
+
+
+class AffiliateClickHourly(models.Model):
+    """Clicks per affiliate, product and hour, recounted from AffiliateClick on every flush."""
+    affiliate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="hourly_clicks")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="hourly_clicks")
+    hour = models.DateTimeField()
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["affiliate", "product", "hour"], name="unique_click_rollup_hour"),
+        ]
+
+    def __str__(self):
+        return f"{self.affiliate_id} → {self.product_id} @ {self.hour}: {self.clicks}"
@@ -0,0 +1,59 @@
+# accounts/onboarding.py
+"""
+Work that follows a user's approval (accounts/approvals.py): an AffiliateLink
+for every product and a welcome email.
+
+It runs on the background pool (accounts/background.py) once the approval
+commits, so approving thousands of users from the admin does not wait on link
+generation or the mail server. Both steps are idempotent: links that already
+exist are left alone.
+"""
+from django.core.mail import get_connection, send_mass_mail
+
+from .links import build_link
+from .models import AffiliateLink, CustomUser, Product
+
+WELCOME_SUBJECT = "Your affiliate account is approved"
+WELCOME_MESSAGE = (
+    "Hi {username},\n\n"
+    "Your affiliate account has been approved. Log in to find your affiliate "
+    "links and marketing materials.\n"
+)
+
+USERS_PER_ROUND = 200
+LINK_BATCH_SIZE = 1000
+
+
+def create_default_links(users):
+    """Bulk-create the missing AffiliateLinks for ``(user_id, username)`` pairs, every product each."""
+    product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+    created = 0
+    for start in range(0, len(users), USERS_PER_ROUND):
+        links = [
+            AffiliateLink(user_id=user_id, product_id=product_id, link=build_link(username, product_id))
+            for user_id, username in users[start:start + USERS_PER_ROUND]
+            for product_id in product_ids
+        ]
+        AffiliateLink.objects.bulk_create(links, batch_size=LINK_BATCH_SIZE, ignore_conflicts=True)
+        created += len(links)
+    return created
+
+
+def send_welcome_emails(users):
+    """One email per ``(username, email)`` pair with an address, over a single connection."""
+    messages = [
+        (WELCOME_SUBJECT, WELCOME_MESSAGE.format(username=username), None, [email])
+        for username, email in users if email
+    ]
+    if messages:
+        send_mass_mail(messages, connection=get_connection())
+    return len(messages)
+
+
+def onboard(user_ids):
+    users = list(
+        CustomUser.objects.filter(pk__in=user_ids, is_active=True).order_by("pk")
+        .values_list("pk", "username", "email")
+    )
+    create_default_links([(pk, username) for pk, username, _ in users])
+    send_welcome_emails([(username, email) for _, username, email in users])
@@ -0,0 +1,121 @@
+# accounts/pagination.py
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on ``(created_at, id)``.
+
+    The cursor encodes the last row of the previous page, so every page is an
+    index range scan (``created_at < x OR (created_at = x AND id < y)``)
+    whatever its depth, unlike OFFSET-based paging. Subclasses can key on
+    another timestamp with ``ordering_field``.
+    """
+    ordering_field = "created_at"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f"-{field}", "-id")
+        position = self.decode_cursor(request)
+        if position:
+            timestamp, pk = position
+            queryset = queryset.filter(Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "pk__lt": pk}))
+
+        rows = list(queryset[:page_size + 1])
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        raw = f"{getattr(row, self.ordering_field).isoformat()}|{row.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def get_next_link(self, url=None):
+        """Link to the following page, on ``url`` if given or else the current request's URL."""
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri(url)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+
+class CashoutHistoryPagination(KeysetPagination):
+    page_size = 20
+
+
+class MarketingMaterialPagination(KeysetPagination):
+    ordering_field = "uploaded_at"
+    page_size = 24
+
+
+class ProductPageNumberPagination(PageNumberPagination):
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class ProductCursorPagination(CursorPagination):
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "id"
+
+
+class ProductPagination(BasePagination):
+    """
+    Page-number paging by default; ``?paginate=cursor`` (or any ``?cursor=``)
+    switches to cursor paging, which stays cheap on deep pages.
+    """
+
+    def __init__(self):
+        self.page_number = ProductPageNumberPagination()
+        self.cursor = ProductCursorPagination()
+        self.active = self.page_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        use_cursor = (
+            request.query_params.get("paginate") == "cursor"
+            or self.cursor.cursor_query_param in request.query_params
+        )
+        self.active = self.cursor if use_cursor else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
@@ -0,0 +1,112 @@
+# accounts/passwords.py
+"""
+Login checks shared by the sync and async auth views.
+
+The identifier (username or phone, both unique) is resolved in one indexed
+``username = x OR phone = x`` query. Verifying the password also upgrades
+hashes made with an outdated algorithm or cost (see accounts/hashers.py).
+
+The async views run hashing on a dedicated, bounded thread pool
+(``PASSWORD_HASH_WORKERS``, one thread per CPU by default). scrypt, PBKDF2
+and argon2 release the GIL while hashing, so the threads spread across
+cores. The bound caps concurrent memory-hard hashes during login spikes, and
+the event loop stays free meanwhile.
+
+Failed logins are counted per identifier and client IP
+(accounts/throttling.py); over the limit, attempts are refused with a 429
+before anything is hashed.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from rest_framework import serializers
+
+from . import throttling
+from .models import CustomUser
+
+INVALID_CREDENTIALS = "Invalid username/phone or password"
+NOT_APPROVED = "Account not approved yet."
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+                thread_name_prefix="password-hash",
+            )
+    return _executor
+
+
+def _candidates(identifier):
+    return CustomUser.objects.filter(Q(username=identifier) | Q(phone=identifier))[:2]
+
+
+def _pick(users, identifier):
+    # A username match wins if the identifier is also someone else's phone
+    for user in users:
+        if user.username == identifier:
+            return user
+    return users[0] if users else None
+
+
+def find_user(identifier):
+    return _pick(list(_candidates(identifier)), identifier)
+
+
+async def afind_user(identifier):
+    return _pick([user async for user in _candidates(identifier)], identifier)
+
+
+def check(user, password):
+    """
+    Return ``user`` if they may log in with ``password``, else raise a
+    ValidationError. Rehashes the stored password when its hasher is outdated.
+    """
+    if user is None:
+        raise serializers.ValidationError(INVALID_CREDENTIALS)
+    if not user.is_active:
+        raise serializers.ValidationError(NOT_APPROVED)
+    if not user.check_password(password):
+        raise serializers.ValidationError(INVALID_CREDENTIALS)
+    return user
+
+
+def _verify(attempt, user, password):
+    # The attempt stays counted unless the password is right
+    user = check(user, password)
+    throttling.login_succeeded(attempt)
+    return user
+
+
+def authenticate(identifier, password, ip):
+    attempt = throttling.login_attempt(identifier, ip)
+    return _verify(attempt, find_user(identifier), password)
+
+
+def _run(fn, args):
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()  # a rehash may have saved the user from this thread
+
+
+async def hashing(fn, *args):
+    """Run ``fn(*args)`` on the password hashing pool."""
+    return await asyncio.get_running_loop().run_in_executor(executor(), _run, fn, args)
+
+
+async def aauthenticate(identifier, password, ip):
+    attempt = await sync_to_async(throttling.login_attempt, thread_sensitive=False)(identifier, ip)
+    user = await afind_user(identifier)
+    return await hashing(_verify, attempt, user, password)
@@ -0,0 +1,77 @@
+# accounts/proofs.py
+"""
+Background re-encoding of ``Order.proof_of_payment``.
+
+Receipts arrive as multi-megabyte phone photos. Once an order commits, its
+proof is re-encoded off the request path to at most
+``PROOF_OF_PAYMENT_MAX_DIMENSION`` pixels (WebP, or JPEG without WebP
+support) and a square thumbnail is stored for the admin list. The original is
+only replaced when the re-encode is smaller. ``Order.proof_bytes_saved``
+records the result and doubles as the "already processed" marker.
+
+Work runs on the shared background pool (accounts/background.py); Pillow
+releases the GIL while decoding and encoding, so threads parallelize well.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
+
+from . import background, images
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+
+def schedule(order_id):
+    """Optimize ``order_id``'s proof on the background pool once the current transaction commits."""
+    background.on_commit(optimize, order_id)
+
+
+def optimize(order_id):
+    """
+    Re-encode one order's proof and store its thumbnail. Returns the bytes
+    saved, or None when there was nothing to do (no proof, or already done).
+    """
+    order = Order.objects.filter(pk=order_id, proof_bytes_saved__isnull=True).first()
+    if order is None or not order.proof_of_payment:
+        return None
+
+    proof = order.proof_of_payment
+    with proof.open("rb") as source:
+        original = source.read()
+
+    try:
+        encoded, extension = images.bounded(original, settings.PROOF_OF_PAYMENT_MAX_DIMENSION)
+        thumb, thumb_extension = images.thumbnail(original, settings.PROOF_THUMBNAIL_SIZE)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        # A decompression bomb is treated as unreadable rather than retried on every backlog run
+        logger.warning("Order %s has an unreadable proof of payment; leaving it as uploaded", order_id)
+        Order.objects.filter(pk=order_id).update(proof_bytes_saved=0)
+        return 0
+
+    stem = os.path.splitext(os.path.basename(proof.name))[0]
+    updates = {"proof_bytes_saved": 0}
+    old_name = None
+    if len(encoded) < len(original):
+        old_name = proof.name
+        updates["proof_of_payment"] = proof.storage.save(f"payments/{stem}.{extension}", ContentFile(encoded))
+        updates["proof_bytes_saved"] = len(original) - len(encoded)
+    updates["proof_thumbnail"] = order.proof_thumbnail.storage.save(
+        f"payments/thumbnails/{stem}.{thumb_extension}", ContentFile(thumb)
+    )
+
+    # Claim with the marker so a concurrent run cannot swap the file twice
+    if Order.objects.filter(pk=order_id, proof_bytes_saved__isnull=True).update(**updates):
+        if old_name:
+            proof.storage.delete(old_name)
+        logger.info("Re-encoded the proof of payment for order %s, saving %s bytes", order_id, updates["proof_bytes_saved"])
+        return updates["proof_bytes_saved"]
+
+    # Lost the race: drop the files this run wrote
+    for name in (updates.get("proof_of_payment"), updates["proof_thumbnail"]):
+        if name:
+            proof.storage.delete(name)
+    return None
@@ -0,0 +1,75 @@
+# accounts/referral_codes.py
+"""
+Referral codes that are unique by construction.
+
+Each code encodes a number from a database counter
+(``ReferralCodeSequence``: a PostgreSQL sequence, or a single-row table
+elsewhere). One query reserves a whole batch, so a ``bulk_create`` of any
+size costs one reservation. The number goes through a
+keyed Feistel permutation of the 45-bit space, so consecutive users get
+unrelated-looking codes. It is then written as 9 Crockford base32 characters
+(no I, L, O or U).
+
+The permutation is a bijection and every counter value is handed out once,
+so two codes can never be equal. No probing or retry on IntegrityError is
+needed. Earlier codes were 8 hex characters, so they cannot clash with these
+either.
+
+``REFERRAL_CODE_KEY`` must never change once codes have been issued: a new
+key is a different permutation, which can repeat an existing code.
+"""
+import hashlib
+
+from django.conf import settings
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+LENGTH = 9
+BITS = LENGTH * 5  # 45
+HIGH_BITS = BITS // 2  # 22
+LOW_BITS = BITS - HIGH_BITS  # 23
+ROUNDS = 4  # even, so the halves end up their original widths
+
+
+def _round(index, value, bits):
+    digest = hashlib.blake2b(
+        value.to_bytes(4, "big"), digest_size=8, key=settings.REFERRAL_CODE_KEY.encode(),
+        person=f"round{index}".encode(),
+    ).digest()
+    return int.from_bytes(digest, "big") & ((1 << bits) - 1)
+
+
+def permute(number):
+    """Map ``number`` to another number of the 45-bit space, one to one."""
+    if not 0 <= number < 1 << BITS:
+        raise ValueError(f"Referral code numbers run out at {1 << BITS}")
+    # Unbalanced Feistel: the halves swap widths every round, each round is invertible
+    left, right = number >> LOW_BITS, number & ((1 << LOW_BITS) - 1)
+    left_bits = HIGH_BITS
+    for index in range(ROUNDS):
+        left, right = right, left ^ _round(index, right, left_bits)
+        left_bits = BITS - left_bits
+    return (left << (BITS - left_bits)) | right
+
+
+def unpermute(number):
+    """The inverse of :func:`permute`."""
+    left_bits = HIGH_BITS  # ROUNDS is even
+    left, right = number >> (BITS - left_bits), number & ((1 << (BITS - left_bits)) - 1)
+    for index in reversed(range(ROUNDS)):
+        # Undo one round: right was old_left ^ F(old_right), left was old_right
+        left_bits = BITS - left_bits
+        left, right = right ^ _round(index, left, left_bits), left
+    return (left << LOW_BITS) | right
+
+
+def encode(number):
+    chars = []
+    for _ in range(LENGTH):
+        number, digit = divmod(number, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def code_for(number):
+    """The referral code for counter value ``number``."""
+    return encode(permute(number))
@@ -0,0 +1,201 @@
+# accounts/referral_tree.py
+"""
+The referral tree (``CustomUser.referred_by``) stored as materialized paths.
+
+Each user keeps three columns:
+
+* ``referral_path``: the ids of their ancestors, root first, each followed
+  by ``/`` (``"1/5/"``; ``""`` for a root).
+* ``referral_depth``: how many ancestors that is.
+* ``downline_size``: how many users sit anywhere below them.
+
+So depth, downline size and the whole upline are read straight off the
+user's row. The downline is one range scan of the ``referral_path`` index
+(``startswith`` the user's subtree prefix) however deep the tree goes.
+
+The columns are kept in sync by ``CustomUser.save()``, the manager's
+``bulk_create`` and a pre_delete receiver. Placing a user costs one lookup
+of the parent's path. Moving or detaching a subtree rewrites its paths and
+the affected ancestors' counters in a constant number of UPDATEs.
+``rebuild`` recomputes everything from ``referred_by``.
+
+Functions take the user model from the instances they are given, so
+models.py can call them without an import cycle.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Concat, Substr
+
+SEPARATOR = "/"
+MAX_PATH_LENGTH = 500
+COLUMNS = {"referral_path", "referral_depth", "downline_size"}
+
+
+def ancestor_ids(path):
+    """Ancestor ids from a ``referral_path``, nearest first."""
+    return [int(part) for part in reversed(path.split(SEPARATOR)) if part]
+
+
+def subtree_prefix(user):
+    """The ``referral_path`` prefix shared by everyone in ``user``'s downline."""
+    return f"{user.referral_path}{user.pk}{SEPARATOR}"
+
+
+def _subtree(manager, prefix):
+    users = manager.filter(referral_path__startswith=prefix)
+    if connections[users.db].vendor == "sqlite":
+        # SQLite only uses an index for LIKE under case_sensitive_like; the
+        # same rows as a byte range ("/" + 1 is "0") use it
+        users = users.filter(referral_path__gte=prefix, referral_path__lt=f"{prefix[:-1]}0")
+    return users
+
+
+def downline(user):
+    return _subtree(type(user)._default_manager, subtree_prefix(user))
+
+
+def _child_path(parent_path, parent_id):
+    path = f"{parent_path}{parent_id}{SEPARATOR}"
+    if len(path) > MAX_PATH_LENGTH:
+        raise ValueError("Referral chain too deep")
+    return path
+
+
+def _bump(model, deltas):
+    """Add ``{user_id: delta}`` to downline sizes in one UPDATE, one CASE branch per distinct delta."""
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    if not by_delta:
+        return
+    model._default_manager.filter(pk__in=[pk for ids in by_delta.values() for pk in ids]).update(
+        downline_size=F("downline_size") + Case(
+            *[When(pk__in=ids, then=Value(delta)) for delta, ids in by_delta.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+    )
+
+
+# --------------------- CREATION ---------------------
+def place(users):
+    """Set path and depth on unsaved ``users`` from their referrers, in one query."""
+    users = [user for user in users if user.referred_by_id]
+    if not users:
+        return
+    model = type(users[0])
+    parents = dict(
+        model._default_manager.filter(pk__in={user.referred_by_id for user in users})
+        .values_list("pk", "referral_path")
+    )
+    for user in users:
+        if user.referred_by_id in parents:
+            user.referral_path = _child_path(parents[user.referred_by_id], user.referred_by_id)
+            user.referral_depth = len(ancestor_ids(user.referral_path))
+
+
+def added(users):
+    """Count freshly inserted ``users`` into their ancestors' downline sizes."""
+    deltas = Counter(pk for user in users for pk in ancestor_ids(user.referral_path))
+    if deltas:
+        _bump(type(users[0]), deltas)
+
+
+# --------------------- MOVES ---------------------
+def _stored(user):
+    return type(user)._default_manager.filter(pk=user.pk).values(
+        "referred_by_id", "referral_path", "referral_depth", "downline_size"
+    ).first()
+
+
+def move(user):
+    """
+    Re-root ``user``'s subtree under its current ``referred_by``, if that
+    changed since the row was saved; returns whether it did. Raises
+    ValueError on a cycle. The caller saves ``user`` (its own path and depth
+    are only set on the instance).
+    """
+    stored = _stored(user)
+    if stored is None or stored["referred_by_id"] == user.referred_by_id:
+        return False
+    model = type(user)
+    manager = model._default_manager
+
+    new_path = ""
+    if user.referred_by_id:
+        parent_path = manager.filter(pk=user.referred_by_id).values_list("referral_path", flat=True).first() or ""
+        if user.referred_by_id == user.pk or user.pk in ancestor_ids(parent_path):
+            raise ValueError("A user cannot be referred by someone in their own downline")
+        new_path = _child_path(parent_path, user.referred_by_id)
+
+    old_prefix = f"{stored['referral_path']}{user.pk}{SEPARATOR}"
+    new_prefix = f"{new_path}{user.pk}{SEPARATOR}"
+    depth_change = len(ancestor_ids(new_path)) - stored["referral_depth"]
+    _subtree(manager, old_prefix).update(
+        referral_path=Concat(Value(new_prefix), Substr("referral_path", len(old_prefix) + 1)),
+        referral_depth=F("referral_depth") + depth_change,
+    )
+
+    moved = stored["downline_size"] + 1
+    deltas = Counter({pk: -moved for pk in ancestor_ids(stored["referral_path"])})
+    deltas.update({pk: moved for pk in ancestor_ids(new_path)})
+    _bump(model, deltas)
+
+    user.referral_path = new_path
+    user.referral_depth = len(ancestor_ids(new_path))
+    user.downline_size = stored["downline_size"]
+    return True
+
+
+def detach(user):
+    """Before ``user`` is deleted: their referrals become roots, and leave the upline's counts."""
+    stored = _stored(user)
+    if stored is None:
+        return
+    manager = type(user)._default_manager
+    prefix = f"{stored['referral_path']}{user.pk}{SEPARATOR}"
+    _subtree(manager, prefix).update(
+        referral_path=Substr("referral_path", len(prefix) + 1),
+        referral_depth=F("referral_depth") - (stored["referral_depth"] + 1),
+    )
+    removed = stored["downline_size"] + 1
+    _bump(type(user), {pk: -removed for pk in ancestor_ids(stored["referral_path"])})
+
+
+# --------------------- REBUILD ---------------------
+def rebuild(model):
+    """
+    Recompute every user's path, depth and downline size from ``referred_by``,
+    a tree level per round. Users caught in a referral cycle become roots.
+    Returns the number of users updated.
+    """
+    manager = model._default_manager
+    parents = dict(manager.values_list("pk", "referred_by_id"))
+    children = defaultdict(list)
+    for pk, parent_id in parents.items():
+        if parent_id in parents:
+            children[parent_id].append(pk)
+
+    paths = {}
+    level = [pk for pk, parent_id in parents.items() if parent_id not in parents]
+    for pk in level:
+        paths[pk] = ""
+    while level:
+        next_level = []
+        for parent_id in level:
+            for pk in children[parent_id]:
+                paths[pk] = _child_path(paths[parent_id], parent_id)
+                next_level.append(pk)
+        level = next_level
+    for pk in parents.keys() - paths.keys():
+        paths[pk] = ""  # in a cycle: unreachable from any root
+
+    sizes = Counter(ancestor for path in paths.values() for ancestor in ancestor_ids(path))
+    users = [
+        model(pk=pk, referral_path=path, referral_depth=len(ancestor_ids(path)), downline_size=sizes[pk])
+        for pk, path in paths.items()
+    ]
+    manager.bulk_update(users, ["referral_path", "referral_depth", "downline_size"], batch_size=1000)
+    return len(users)
@@ -1,11 +1,13 @@
 # accounts/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.urls import reverse
 from .models import (
     CustomUser, Earnings, Referral, Withdrawal,
     MarketingMaterial, Product, AffiliateLink,
     CashoutRequest, Commission, Order
 )
+from . import direct_uploads, passwords, throttling, variants
 
 # ✅ LOGIN
 class LoginSerializer(serializers.Serializer):
@@ -13,26 +15,10 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        identifier = data.get("identifier")
-        password = data.get("password")
-
-        try:
-            # Try username first
-            user = CustomUser.objects.get(username=identifier)
-        except CustomUser.DoesNotExist:
-            try:
-                # Then try phone
-                user = CustomUser.objects.get(phone=identifier)
-            except CustomUser.DoesNotExist:
-                raise serializers.ValidationError("Invalid username/phone or password")
-
-        if not user.is_active:
-            raise serializers.ValidationError("Account not approved yet.")
-
-        if not user.check_password(password):
-            raise serializers.ValidationError("Invalid username/phone or password")
-
-        data["user"] = user
+        # One username-or-phone query, then the (possibly rehashing) password check
+        data["user"] = passwords.authenticate(
+            data.get("identifier"), data.get("password"), throttling.client_ip(self.context["request"])
+        )
         return data
 
 
@@ -51,6 +37,8 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 # ✅ PROFILE
 class ProfileSerializer(serializers.ModelSerializer):
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = CustomUser
         fields = [
@@ -62,12 +50,16 @@ class ProfileSerializer(serializers.ModelSerializer):
             "bank_account",
             "beneficiary_name",
             "profile_picture",
+            "profile_picture_srcset",
             "balance",
             "referral_code",
             "referred_by",
         ]
         read_only_fields = ["balance", "referral_code", "referred_by"]
 
+    def get_profile_picture_srcset(self, obj):
+        return variants.srcset(obj.profile_picture, obj.profile_picture_hash, self.context.get("request"))
+
 
 # ✅ DASHBOARD
 class DashboardSerializer(serializers.Serializer):
@@ -136,16 +128,42 @@ class CashoutRequestSerializer(serializers.ModelSerializer):
 
 # ✅ MARKETING MATERIALS
 class MarketingMaterialSerializer(serializers.ModelSerializer):
+    # Resumable (Range) download that is counted; ``file`` stays the plain media URL
+    download_url = serializers.SerializerMethodField()
+
     class Meta:
         model = MarketingMaterial
-        fields = ["id", "title", "file", "material_type", "uploaded_at"]
+        fields = ["id", "title", "file", "download_url", "material_type", "uploaded_at"]
+
+    def get_download_url(self, obj):
+        return reverse("marketing-material-download", args=[obj.pk])
+
+
+# ✅ SPARSE FIELDSETS
+class SparseFieldsMixin:
+    """Drop every field not named in the request's ``?fields=a,b,c`` (top-level serializers only)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = request.query_params.get("fields") if request else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(",")}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
 
 
 # ✅ PRODUCT
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # {"160w": url, "320w": url, ...}; empty until the variants are generated
+    picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
-        fields = ["id", "name", "price", "commission_amount", "picture"]
+        fields = ["id", "name", "price", "commission_amount", "picture", "picture_srcset"]
+
+    def get_picture_srcset(self, obj):
+        return variants.srcset(obj.picture, obj.picture_hash, self.context.get("request"))
 
 
 # ✅ AFFILIATE LINK
@@ -162,6 +180,8 @@ class OrderSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
     affiliate_username = serializers.CharField(write_only=True, required=True)
     affiliate_display = serializers.CharField(source="affiliate.username", read_only=True)
+    # Token from orders/proof-upload/ when the proof went straight to the bucket
+    proof_upload = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Order
@@ -174,17 +194,29 @@ class OrderSerializer(serializers.ModelSerializer):
             "buyer_phone",
             "payment_method",
             "proof_of_payment",
+            "proof_upload",
             "status",
             "created_at",
         ]
         read_only_fields = ["status", "created_at", "affiliate_display"]
 
+    def validate_proof_upload(self, value):
+        return direct_uploads.claim(value)
+
+    @staticmethod
+    def attach_upload(validated_data):
+        """Swap a claimed ``proof_upload`` for the stored file it names."""
+        name = validated_data.pop("proof_upload", None)
+        if name:
+            validated_data["proof_of_payment"] = name
+        return validated_data
+
     def create(self, validated_data):
+        self.attach_upload(validated_data)
         affiliate_username = validated_data.pop("affiliate_username", None)
         try:
             affiliate = CustomUser.objects.get(username=affiliate_username)
         except CustomUser.DoesNotExist:
             raise serializers.ValidationError({"affiliate_username": "Invalid affiliate username."})
 
-        order = Order.objects.create(affiliate=affiliate, **validated_data)
-        return order
+        return direct_uploads.create_order(affiliate=affiliate, **validated_data)
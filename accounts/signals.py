@@ -1,37 +1,106 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Commission, CashoutRequest
+from .models import Commission, CashoutRequest, CustomUser, MarketingMaterial, Order, Product
+from . import balances, catalogue, ledger, proofs, referral_tree, variants
+from .authentication import user_cache
+
+# Fields whose change can move an object's DailyLedger contribution
+LEDGER_FIELDS = {"amount", "requested_amount", "status", "created_at"}
 
 
 @receiver(post_save, sender=Commission)
 def update_user_commission_balance(sender, instance, created, **kwargs):
-    user = instance.user
-
     if created and instance.status == "pending":
         # Add commission on creation
-        user.commission_balance += instance.amount
-        user.save()
+        balances.credit(instance.user_id, instance.amount)
 
     elif not created:
         # If status was changed in admin
         if instance.status == "cancelled":
             # If commission is cancelled, remove it from balance
-            user.commission_balance -= instance.amount
-            user.save()
+            balances.debit(instance.user_id, instance.amount, allow_negative=True)
 
 
 @receiver(post_save, sender=CashoutRequest)
 def handle_cashout_approval(sender, instance, created, **kwargs):
-    user = instance.user
-
     # Only act when status is approved AND not already processed
     if not created and instance.status == "approved" and not instance.processed:
-        # Deduct from commission balance
-        if user.commission_balance >= instance.requested_amount:
-            user.commission_balance -= instance.requested_amount
-            user.save()
+        # The requested amount was debited when the request was made
+        # (CashoutRequestCreateView); approval only marks it processed
+        CashoutRequest.objects.filter(pk=instance.pk, processed=False).update(processed=True)
+        instance.processed = True
+
+
+# --------------------- DAILY LEDGER ---------------------
+@receiver(pre_save, sender=Commission)
+@receiver(pre_save, sender=CashoutRequest)
+def remember_ledger_contribution(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        instance._ledger_before = None
+    elif update_fields and not LEDGER_FIELDS & set(update_fields):
+        # Saves like the processed flag cannot move the ledger; skip the lookup
+        instance._ledger_before = ledger.contribution(instance)
+    else:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        instance._ledger_before = ledger.contribution(previous) if previous else None
+
+
+@receiver(post_save, sender=Commission)
+@receiver(post_save, sender=CashoutRequest)
+def update_daily_ledger(sender, instance, **kwargs):
+    before = getattr(instance, "_ledger_before", None)
+    ledger.apply_change(instance.user_id, before, ledger.contribution(instance))
+
+
+@receiver(post_delete, sender=Commission)
+@receiver(post_delete, sender=CashoutRequest)
+def remove_from_daily_ledger(sender, instance, **kwargs):
+    ledger.apply_change(instance.user_id, ledger.contribution(instance), None, create=False)
+
+
+# --------------------- PRODUCT CATALOGUE CACHE ---------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_catalogue(sender, **kwargs):
+    catalogue.bump_version()
+
+
+@receiver(post_save, sender=MarketingMaterial)
+@receiver(post_delete, sender=MarketingMaterial)
+def invalidate_marketing_materials(sender, **kwargs):
+    catalogue.bump_version(catalogue.MARKETING)
+
+
+@receiver(post_save, sender=Order)
+def optimize_proof_of_payment(sender, instance, created, **kwargs):
+    # Re-encode the uploaded receipt off the request path (accounts/proofs.py)
+    if created and instance.proof_of_payment:
+        proofs.schedule(instance.pk)
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=CustomUser)
+def remember_picture_change(sender, instance, update_fields=None, **kwargs):
+    instance._refresh_variants = variants.needs_refresh(instance, update_fields)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=CustomUser)
+def build_picture_variants(sender, instance, **kwargs):
+    # Width variants are rendered off the request path (accounts/variants.py)
+    if getattr(instance, "_refresh_variants", False):
+        instance._refresh_variants = False
+        variants.schedule(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
 
-            # Mark this request as processed so it won't run again
-            instance.processed = True
-            instance.save(update_fields=["processed"])
 
+# --------------------- REFERRAL TREE ---------------------
+@receiver(pre_delete, sender=CustomUser)
+def detach_from_referral_tree(sender, instance, **kwargs):
+    # referred_by is SET_NULL: the user's referrals become roots of their own trees
+    referral_tree.detach(instance)
@@ -1,3 +1,1726 @@
-from django.test import TestCase
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipIf, skipUnless
+from unittest.mock import Mock, patch
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import FileResponse
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import exceptions, serializers
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+try:
+    import boto3
+    from moto import mock_aws  # requirements-dev.txt: an in-process S3 stand-in
+except ImportError:
+    mock_aws = None
+
+from . import (
+    approvals, balances, direct_uploads, links, passwords, proofs, referral_codes, referral_tree, throttling, variants,
+)
+from .authentication import ClaimsJWTAuthentication, user_cache
+from .clicks import ClickBuffer
+from .downloads import DownloadCounter
+from .models import (
+    CustomUser, Referral, Withdrawal, Commission, CashoutRequest, DailyLedger, MarketingMaterial, Order, Product,
+    AffiliateLink, AffiliateClick, AffiliateClickHourly, ReferralCodeSequence
+)
+
+
+def make_user(username, **extra):
+    user = CustomUser.objects.create_user(
+        username=username, password="pass12345", email=f"{username}@example.com",
+        phone=extra.pop("phone", username), **extra
+    )
+    user.refresh_from_db()  # load Decimal balances instead of the float field defaults
+    return user
+
+
+def png_bytes(size=(8, 8)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_product(name="Power Bank", commission_amount="1500.00"):
+    return Product.objects.create(
+        name=name, price=Decimal("15000.00"), commission_amount=Decimal(commission_amount),
+        picture="products/power_bank.jpeg",
+    )
+
+
+# --------------------- DASHBOARD ---------------------
+class DashboardViewTests(TestCase):
+    QUERY_BUDGET = 3
+
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def seed(self, commissions=5, cashouts=5):
+        for i in range(commissions):
+            Commission.objects.create(user=self.user, amount=Decimal("2000.00"), status="pending")
+        for i in range(cashouts):
+            CashoutRequest.objects.create(
+                user=self.user, requested_amount=Decimal("1500.00"), processing_fee=Decimal("1000.00"),
+                status="approved", processed=True,
+            )
+        Referral.objects.create(user=self.user, referred_user=make_user("friend"))
+        Withdrawal.objects.create(user=self.user, amount=Decimal("300.00"))
+        self.user.refresh_from_db()
+
+    def test_counters(self):
+        self.seed(commissions=2, cashouts=1)
+        data = self.client.get(reverse("dashboard")).json()
+
+        self.assertEqual(data["total_referrals"], 1)
+        self.assertEqual(Decimal(data["pending_withdrawals"]), Decimal("300.00"))
+        self.assertEqual(Decimal(data["pending_commissions"]), Decimal("4000.00"))
+        self.assertEqual(data["total_cashout"], 500.0)
+        self.assertEqual(len(data["cashout_history"]), 1)
+        self.assertEqual(data["commission_history"][-1]["amount"], 2500.0)
+
+    def test_query_budget_does_not_grow_with_history(self):
+        self.seed(commissions=30, cashouts=30)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+
+
+class CommissionHistoryTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def at(self, obj, day):
+        type(obj).objects.filter(pk=obj.pk).update(
+            created_at=timezone.make_aware(datetime(2025, 9, day, 12))
+        )
+
+    def seed(self):
+        for day, amount in [(1, "2000.00"), (2, "3000.00"), (9, "1000.00")]:
+            self.at(Commission.objects.create(user=self.user, amount=Decimal(amount)), day)
+        cashout = CashoutRequest.objects.create(
+            user=self.user, requested_amount=Decimal("1500.00"), processing_fee=Decimal("1000.00")
+        )
+        self.at(cashout, 2)
+        rejected = CashoutRequest.objects.create(
+            user=self.user, requested_amount=Decimal("9000.00"), processing_fee=Decimal("1000.00"),
+            status="rejected",
+        )
+        self.at(rejected, 3)
+        # Backdating bypasses the signals, so rebuild the rollup from the raw rows
+        call_command("rebuild_ledger", stdout=StringIO())
+
+    def history(self, **params):
+        response = self.client.get(reverse("dashboard"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["commission_history"]
+
+    def test_daily_running_balance(self):
+        self.seed()
+        self.assertEqual(self.history(), [
+            {"date": "2025-09-01", "amount": 2000.0},
+            {"date": "2025-09-02", "amount": 3500.0},
+            {"date": "2025-09-09", "amount": 4500.0},
+        ])
+
+    def test_range_carries_opening_balance(self):
+        self.seed()
+        self.assertEqual(self.history(**{"from": "2025-09-02", "to": "2025-09-08"}), [
+            {"date": "2025-09-02", "amount": 3500.0},
+        ])
+        self.assertEqual(self.history(**{"from": "2025-09-05"}), [
+            {"date": "2025-09-09", "amount": 4500.0},
+        ])
+
+    def test_monthly_granularity(self):
+        self.seed()
+        self.assertEqual(self.history(granularity="month"), [
+            {"date": "2025-09-01", "amount": 4500.0},
+        ])
+
+    def test_invalid_params(self):
+        for params in ({"granularity": "year"}, {"from": "yesterday"}, {"from": "2025-09-09", "to": "2025-09-01"}):
+            response = self.client.get(reverse("dashboard"), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class DailyLedgerTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+
+    def ledger(self):
+        return list(DailyLedger.objects.filter(user=self.user).order_by("date").values_list(
+            "commissions_in", "cashouts_out", "closing_balance"
+        ))
+
+    def cashout(self, amount, **extra):
+        return CashoutRequest.objects.create(
+            user=self.user, requested_amount=Decimal(amount), processing_fee=Decimal("1000.00"), **extra
+        )
+
+    def test_signals_keep_ledger_in_sync_with_rebuild(self):
+        Commission.objects.create(user=self.user, amount=Decimal("5000.00"))
+        commission = Commission.objects.create(user=self.user, amount=Decimal("2000.00"))
+        cashout = self.cashout("3000.00")
+        self.cashout("1500.00", status="rejected")
+
+        self.assertEqual(self.ledger(), [(Decimal("7000.00"), Decimal("3000.00"), Decimal("4000.00"))])
+
+        cashout.status = "rejected"
+        cashout.save()
+        commission.delete()
+        self.assertEqual(self.ledger(), [(Decimal("5000.00"), Decimal("0.00"), Decimal("5000.00"))])
+
+        incremental = self.ledger()
+        call_command("rebuild_ledger", stdout=StringIO())
+        self.assertEqual(self.ledger(), incremental)
+
+    def test_rebuild_carries_closing_balance_across_days(self):
+        for day, amount in [(1, "2000.00"), (5, "3000.00")]:
+            commission = Commission.objects.create(user=self.user, amount=Decimal(amount))
+            Commission.objects.filter(pk=commission.pk).update(
+                created_at=timezone.make_aware(datetime(2025, 9, day, 12))
+            )
+        call_command("rebuild_ledger", "--chunk-size", "1", stdout=StringIO())
+
+        self.assertEqual(self.ledger(), [
+            (Decimal("2000.00"), Decimal("0.00"), Decimal("2000.00")),
+            (Decimal("3000.00"), Decimal("0.00"), Decimal("5000.00")),
+        ])
+
+
+# --------------------- BALANCES ---------------------
+class BalanceServiceTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def balance(self):
+        self.user.refresh_from_db(fields=["commission_balance"])
+        return self.user.commission_balance
+
+    def test_debit_is_guarded(self):
+        balances.credit(self.user.pk, Decimal("100.00"))
+        self.assertFalse(balances.debit(self.user.pk, Decimal("150.00")))
+        self.assertTrue(balances.debit(self.user.pk, Decimal("100.00")))
+        self.assertEqual(self.balance(), Decimal("0.00"))
+
+    def test_cashout_deducts_once_and_approval_once(self):
+        balances.credit(self.user.pk, Decimal("20000.00"))
+        self.user.refresh_from_db()
+
+        response = self.client.post(reverse("cashout-request"), {"requested_amount": "6000"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.json()["commission_balance"]), Decimal("14000.00"))
+
+        cashout = CashoutRequest.objects.get(user=self.user)
+        cashout.status = "approved"
+        cashout.save()
+        cashout.save()
+        self.assertEqual(self.balance(), Decimal("14000.00"))
+        self.assertTrue(CashoutRequest.objects.get(pk=cashout.pk).processed)
+
+    def test_profile_save_keeps_a_concurrent_credit(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        balances.credit(self.user.pk, Decimal("1500.00"))  # e.g. an order approved meanwhile
+        user.first_name = "Ada"
+        user.save()
+        self.assertEqual(self.balance(), Decimal("1500.00"))
+
+        response = self.client.patch(reverse("profile"), {"first_name": "Grace"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balance(), Decimal("1500.00"))
+
+    def test_approved_order_credits_commission_once(self):
+        from .admin import OrderAdmin
+
+        product = make_product()
+        order = Order.objects.create(
+            product=product, affiliate=self.user, buyer_phone="0800", payment_method="bank"
+        )
+        OrderAdmin(Order, None)._approve_order(order)
+        OrderAdmin(Order, None)._approve_order(order)
+        self.assertEqual(self.balance(), Decimal("1500.00"))
+
+
+class ConcurrentBalanceTests(TransactionTestCase):
+    """Hammer the balance service from several threads against the test database."""
+    THREADS = 8
+    OPERATIONS = 25
+
+    def setUp(self):
+        self.user = make_user("affiliate")
+
+    def run_concurrently(self, operation):
+        def worker(_):
+            try:
+                return [operation() for _ in range(self.OPERATIONS)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            return [result for batch in pool.map(worker, range(self.THREADS)) for result in batch]
+
+    def balance(self):
+        self.user.refresh_from_db(fields=["commission_balance"])
+        return self.user.commission_balance
+
+    def test_concurrent_credits_are_not_lost(self):
+        self.run_concurrently(lambda: balances.credit(self.user.pk, Decimal("10.00")))
+        self.assertEqual(self.balance(), Decimal("10.00") * self.THREADS * self.OPERATIONS)
+
+    def test_concurrent_debits_never_overdraw(self):
+        available = self.THREADS * self.OPERATIONS // 2
+        balances.credit(self.user.pk, Decimal(available))
+
+        applied = self.run_concurrently(lambda: balances.debit(self.user.pk, Decimal("1.00")))
+        self.assertEqual(applied.count(True), available)
+        self.assertEqual(self.balance(), Decimal("0.00"))
+
+
+# --------------------- CASHOUT HISTORY ---------------------
+class CashoutHistoryTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def seed(self, count):
+        CashoutRequest.objects.bulk_create([
+            CashoutRequest(user=self.user, requested_amount=Decimal(2000 + i), processing_fee=Decimal("1000.00"),
+                           net_amount=Decimal(1000 + i))
+            for i in range(count)
+        ])
+        # Several rows share a timestamp so the id tiebreak is exercised
+        same_moment = timezone.now()
+        CashoutRequest.objects.filter(pk__in=CashoutRequest.objects.order_by("pk").values("pk")[:5]).update(
+            created_at=same_moment
+        )
+
+    def test_pages_through_every_row_once(self):
+        self.seed(25)
+        seen = []
+        url = reverse("cashout-history") + "?page_size=10"
+        while url:
+            data = self.client.get(url).json()
+            seen += [row["id"] for row in data["results"]]
+            url = data["next"]
+
+        expected = list(CashoutRequest.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("cashout-history"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_returns_only_the_new_request(self):
+        self.seed(3)
+        balances.credit(self.user.pk, Decimal("10000.00"))
+        self.user.refresh_from_db()
+
+        data = self.client.post(reverse("cashout-request"), {"requested_amount": "6000"}, format="json").json()
+        self.assertEqual(set(data), {"commission_balance", "cashout"})
+        self.assertEqual(Decimal(data["cashout"]["requested_amount"]), Decimal("6000.00"))
+
+    def test_legacy_history_action_is_paged(self):
+        self.seed(25)
+        data = self.client.post(reverse("cashout-request"), {"action": "history"}, format="json").json()
+        self.assertEqual(len(data["cashout_history"]), 20)
+        self.assertIn(reverse("cashout-history"), data["next"])
+
+
+# --------------------- PRODUCT CATALOGUE ---------------------
+CATALOGUE_TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "catalogue": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "catalogue-tests"},
+    "throttle": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "throttle-tests"},
+}
+
+
+@override_settings(CACHES=CATALOGUE_TEST_CACHES)
+class ProductCatalogueCacheTests(TestCase):
+    def setUp(self):
+        caches["catalogue"].clear()
+        self.product = make_product()
+        self.client = APIClient()
+        self.url = reverse("product-detail", args=[self.product.pk])
+
+    def test_repeat_reads_skip_the_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()["name"], "Power Bank")
+
+    def test_conditional_get_returns_304(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_save_invalidates(self):
+        first = self.client.get(self.url)
+        self.product.name = "Solar Power Bank"
+        self.product.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Solar Power Bank")
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse("product-detail", args=[999])).status_code, 404)
+
+
+@override_settings(CACHES=CATALOGUE_TEST_CACHES)
+class ProductListViewTests(TestCase):
+    def setUp(self):
+        caches["catalogue"].clear()
+        for i in range(30):
+            make_product(name=f"{'Lamp' if i % 3 else 'Kettle'} {i:02d}", commission_amount=f"{100 + i}.00")
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("affiliate"))
+
+    def get(self, **params):
+        response = self.client.get(reverse("product-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_page_number_pagination(self):
+        data = self.get(page_size=10, page=3)
+        self.assertEqual(data["count"], 30)
+        self.assertEqual(len(data["results"]), 10)
+        self.assertIsNone(data["next"])
+
+    def test_cursor_pagination_follows_next(self):
+        client_url = reverse("product-list") + "?paginate=cursor&page_size=7&ordering=-commission_amount"
+        names = []
+        while client_url:
+            data = self.client.get(client_url).json()
+            names += [row["name"] for row in data["results"]]
+            client_url = data["next"]
+        self.assertEqual(len(names), 30)
+        self.assertEqual(names[0], "Lamp 29")
+
+    def test_search_ordering_and_sparse_fields(self):
+        data = self.get(search="kettle", ordering="-name", fields="id,name")
+        self.assertEqual(data["count"], 10)
+        self.assertEqual(data["results"][0]["name"], "Kettle 27")
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+
+    def test_response_shapes_the_frontend_reads(self):
+        # products.js: a page object, followed through "next"
+        fields = "id,name,price,commission_amount,picture,picture_srcset"
+        data = self.get(page_size=24, fields=fields)
+        self.assertEqual(set(data), {"count", "next", "previous", "results"})
+        self.assertIsInstance(data["results"], list)
+        self.assertEqual(set(data["results"][0]), set(fields.split(",")))
+        self.assertEqual(len(self.client.get(data["next"]).json()["results"]), 6)
+
+        # order.js and product_details.js: one product from the detail endpoint
+        product_id = data["results"][0]["id"]
+        product = APIClient().get(reverse("product-detail", args=[product_id])).json()
+        self.assertEqual((product["id"], product["name"]), (product_id, data["results"][0]["name"]))
+        self.assertIn("price", product)
+
+
+# --------------------- MARKETING MATERIALS ---------------------
+@override_settings(CACHES=CATALOGUE_TEST_CACHES)
+class MarketingMaterialsTests(TestCase):
+    def setUp(self):
+        caches["catalogue"].clear()
+        start = timezone.make_aware(datetime(2025, 1, 1))
+        for i, material_type in enumerate(["image", "video", "image", "pdf", "image", "image"]):
+            material = MarketingMaterial.objects.create(
+                title=f"Material {i}", file=f"marketing_materials/{i}.bin", material_type=material_type
+            )
+            MarketingMaterial.objects.filter(pk=material.pk).update(uploaded_at=start + timedelta(days=i))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("affiliate"))
+        self.url = reverse("marketing-materials")
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_grouped_payload_is_cached_and_revalidated(self):
+        first = self.get()
+        self.assertEqual([row["title"] for row in first.json()["image"]],
+                         ["Material 5", "Material 4", "Material 2", "Material 0"])
+        self.assertEqual(len(first.json()["pdf"]), 1)
+
+        with self.assertNumQueries(0):
+            self.get()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        MarketingMaterial.objects.create(title="New", file="marketing_materials/new.bin", material_type="video")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["video"]), 2)
+
+    def test_since_returns_only_newer_materials(self):
+        data = self.get(since="2025-01-04T12:00:00").json()
+        self.assertEqual([row["title"] for row in data["image"]], ["Material 5", "Material 4"])
+        self.assertEqual(data["video"], [])
+        self.assertEqual(self.client.get(self.url, {"since": "yesterday"}).status_code, 400)
+
+    def test_per_type_pages(self):
+        titles, params = [], {"type": "image", "page_size": 3}
+        data = self.get(**params).json()
+        titles += [row["title"] for row in data["results"]]
+        data = self.client.get(data["next"]).json()
+        titles += [row["title"] for row in data["results"]]
+        self.assertEqual(titles, ["Material 5", "Material 4", "Material 2", "Material 0"])
+        self.assertIsNone(data["next"])
+
+        self.assertEqual(self.client.get(self.url, {"type": "audio"}).status_code, 400)
+
+
+class MarketingMaterialDownloadTests(TestCase):
+    BODY = os.urandom(4096)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.material = MarketingMaterial.objects.create(
+            title="Promo", material_type="video", file=SimpleUploadedFile("promo.mp4", self.BODY),
+        )
+        self.counter = DownloadCounter(size=1000, interval=0)
+        self.enterContext(patch("accounts.views.download_counter", self.counter))
+        self.url = reverse("marketing-material-download", args=[self.material.pk])
+
+    def test_download_resumes_with_range_requests(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, FileResponse)  # wsgi.file_wrapper / sendfile path
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+        self.assertEqual(response["Content-Length"], str(len(self.BODY)))
+        self.assertTrue(response["Content-Disposition"].startswith("attachment;"))
+
+        # The connection dropped after 1000 bytes: pick up from there
+        rest = self.client.get(self.url, headers={"range": "bytes=1000-", "if-range": response["ETag"]})
+        self.assertEqual(rest.status_code, 206)
+        self.assertEqual(rest["Content-Range"], f"bytes 1000-{len(self.BODY) - 1}/{len(self.BODY)}")
+        self.assertEqual(b"".join(rest.streaming_content), self.BODY[1000:])
+
+    def test_downloads_are_counted_in_batches(self):
+        self.client.get(self.url)
+        self.client.get(self.url, headers={"range": "bytes=2048-"})  # a resume is not a new download
+        self.client.get(self.url, headers={"range": "bytes=0-1023"})
+        self.client.head(self.url)
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.download_count, 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counter.flush(), 2)
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.download_count, 2)
+
+    def test_offloaded_download(self):
+        with self.settings(MEDIA_SERVING="x-accel-redirect"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.material.file.name}")
+        self.assertIn("promo", response["Content-Disposition"])
+
+    def test_missing_material_is_404(self):
+        self.assertEqual(self.client.get(reverse("marketing-material-download", args=[999])).status_code, 404)
+
+
+# --------------------- AFFILIATE LINKS ---------------------
+@override_settings(AFFILIATE_LINK_BASE_URL="https://shop.example.com/")
+class AffiliateLinkTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.products = [make_product(name=f"Product {i}") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_single_link_writes_nothing(self):
+        product = self.products[0]
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse("get-affiliate-link", args=[product.pk])).json()
+        self.assertEqual(data["link"], links.build_link("affiliate", product.pk))
+        self.assertTrue(data["link"].startswith(f"https://shop.example.com/product/{product.pk}/?ref=affiliate&t="))
+        self.assertFalse(AffiliateLink.objects.exists())
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse("get-affiliate-link", args=[999])).status_code, 404)
+
+    def test_bulk_links(self):
+        data = self.client.get(reverse("affiliate-links")).json()
+        self.assertEqual([row["product_id"] for row in data], [p.pk for p in self.products])
+
+    def test_token_verification(self):
+        token = links.link_token("affiliate", 1)
+        self.assertTrue(links.verify_token("affiliate", 1, token))
+        self.assertFalse(links.verify_token("affiliate", 2, token))
+        self.assertFalse(links.verify_token("someone-else", 1, token))
+
+    def test_refresh_command_upserts(self):
+        AffiliateLink.objects.create(user=self.user, product=self.products[0], link="http://stale.example.com/")
+        call_command("refresh_affiliate_links", stdout=StringIO())
+        call_command("refresh_affiliate_links", stdout=StringIO())
+
+        self.assertEqual(AffiliateLink.objects.count(), 3)
+        self.assertEqual(
+            AffiliateLink.objects.get(product=self.products[0]).link,
+            links.build_link("affiliate", self.products[0].pk),
+        )
+
+
+# --------------------- ORDER APPROVAL ---------------------
+class ApproveOrdersTests(TestCase):
+    QUERY_BUDGET = 13  # including savepoints
+
+    def setUp(self):
+        self.affiliates = [make_user(f"affiliate{i}") for i in range(3)]
+        self.product = make_product()
+
+    def place_orders(self, count):
+        Order.objects.bulk_create([
+            Order(product=self.product, affiliate=self.affiliates[i % 3], buyer_phone="0800",
+                  payment_method="bank")
+            for i in range(count)
+        ])
+
+    def test_credits_balances_and_ledger(self):
+        self.place_orders(6)
+        counts = approvals.approve_orders(Order.objects.all())
+
+        self.assertEqual(counts, {"approved": 6, "commissions": 6})
+        self.assertFalse(Order.objects.filter(status="pending").exists())
+        for affiliate in self.affiliates:
+            affiliate.refresh_from_db()
+            self.assertEqual(affiliate.commission_balance, Decimal("3000.00"))
+
+        incremental = list(DailyLedger.objects.order_by("user_id").values_list("user_id", "closing_balance"))
+        call_command("rebuild_ledger", stdout=StringIO())
+        rebuilt = list(DailyLedger.objects.order_by("user_id").values_list("user_id", "closing_balance"))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_skips_orders_already_credited(self):
+        self.place_orders(2)
+        first = Order.objects.order_by("pk").first()
+        Commission.objects.create(user=first.affiliate, order=first, amount=Decimal("1500.00"))
+        counts = approvals.approve_orders(Order.objects.all())
+        self.assertEqual(counts, {"approved": 2, "commissions": 1})
+        self.assertEqual(approvals.approve_orders(Order.objects.all()), {"approved": 0, "commissions": 0})
+
+    def test_backfills_order_from_sale_reference(self):
+        from django.apps import apps
+        backfill = import_module("accounts.migrations.0012_commission_order").backfill_commission_order
+
+        self.place_orders(2)
+        first, second = Order.objects.order_by("pk")
+        linked = Commission.objects.create(
+            user=first.affiliate, amount=Decimal("1500.00"),
+            sale_reference=approvals.sale_reference(first.pk, "Renamed Product"),
+        )
+        duplicate = Commission.objects.create(
+            user=first.affiliate, amount=Decimal("1500.00"),
+            sale_reference=approvals.sale_reference(first.pk, self.product.name),
+        )
+        wrong_user = Commission.objects.create(
+            user=first.affiliate, amount=Decimal("1500.00"),
+            sale_reference=approvals.sale_reference(second.pk, self.product.name),
+        )
+        backfill(apps, None)
+
+        linked.refresh_from_db()
+        self.assertEqual(linked.order_id, first.pk)
+        self.assertFalse(Commission.objects.filter(pk__in=[duplicate.pk, wrong_user.pk], order__isnull=False).exists())
+
+    def test_query_count_is_independent_of_batch_size(self):
+        for batch_size in (3, 60, 300):
+            self.place_orders(batch_size)
+            with CaptureQueriesContext(connection) as queries:
+                counts = approvals.approve_orders(Order.objects.all())
+            self.assertEqual(counts["commissions"], batch_size)
+            # bulk_create splits its INSERT under the backend's bound-parameter cap
+            # (SQLite's is low); everything else must stay flat
+            others = [query for query in queries if not query["sql"].lstrip().upper().startswith("INSERT")]
+            self.assertLessEqual(len(others), self.QUERY_BUDGET)
+
+    @skipUnless(connection.features.has_select_for_update, "the backend takes no row locks")
+    def test_locks_only_the_order_rows(self):
+        self.place_orders(3)
+        with CaptureQueriesContext(connection) as queries:
+            approvals.approve_orders(Order.objects.select_related("product", "affiliate"))
+        [locking] = [query["sql"] for query in queries if "FOR UPDATE" in query["sql"]]
+        self.assertNotIn("JOIN", locking)
+
+
+# --------------------- REFERRAL CODES ---------------------
+class ReferralCodeTests(TestCase):
+    def test_permutation_is_one_to_one(self):
+        numbers = list(range(5000)) + [2 ** 22, 2 ** 23 - 1, 2 ** 45 - 1]
+        codes = [referral_codes.code_for(number) for number in numbers]
+        self.assertEqual(len(set(codes)), len(numbers))
+        for number, code in zip(numbers, codes):
+            self.assertEqual(len(code), referral_codes.LENGTH)
+            self.assertLessEqual(set(code), set(referral_codes.ALPHABET))
+            self.assertEqual(referral_codes.unpermute(referral_codes.permute(number)), number)
+        with self.assertRaises(ValueError):
+            referral_codes.permute(2 ** 45)
+
+    @skipIf(connection.vendor == "postgresql", "PostgreSQL reserves from a sequence")
+    def test_save_and_bulk_create_get_distinct_codes(self):
+        user = make_user("affiliate")
+        self.assertEqual(len(user.referral_code), referral_codes.LENGTH)
+
+        start = ReferralCodeSequence.objects.get().last_value
+        with CaptureQueriesContext(connection) as queries:
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f"bulk{i}", phone=f"070{i}", email=f"bulk{i}@example.com") for i in range(50)
+            ] + [CustomUser(username="custom", phone="0800999", email="c@example.com", referral_code="CUSTOM")])
+        self.assertEqual(sum("referralcodesequence" in q["sql"] for q in queries.captured_queries), 2)
+        self.assertEqual(ReferralCodeSequence.objects.get().last_value, start + 50)
+
+        codes = list(CustomUser.objects.values_list("referral_code", flat=True))
+        self.assertEqual(len(set(codes)), 52)
+        self.assertIn("CUSTOM", codes)
+
+    @skipUnless(connection.vendor == "postgresql", "the sequence only exists on PostgreSQL")
+    def test_postgresql_reserves_from_a_sequence(self):
+        start = ReferralCodeSequence.objects.get().last_value
+        with CaptureQueriesContext(connection) as queries:
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f"bulk{i}", phone=f"070{i}", email=f"bulk{i}@example.com") for i in range(50)
+            ])
+        self.assertEqual(sum("nextval" in q["sql"] for q in queries.captured_queries), 1)
+        self.assertFalse(any("referralcodesequence" in q["sql"] for q in queries.captured_queries))
+        self.assertEqual(ReferralCodeSequence.objects.get().last_value, start)
+        self.assertEqual(len(set(CustomUser.objects.values_list("referral_code", flat=True))), 50)
+
+    def test_backfill_command_fills_only_missing_codes(self):
+        kept = make_user("kept").referral_code
+        for i in range(5):
+            make_user(f"old{i}")
+        CustomUser.objects.filter(username__startswith="old").update(referral_code=None)
+        CustomUser.objects.filter(username="old0").update(referral_code="")
+
+        call_command("backfill_referral_codes", "--chunk-size", "2", stdout=StringIO())
+        self.assertEqual(CustomUser.objects.get(username="kept").referral_code, kept)
+        codes = set(CustomUser.objects.values_list("referral_code", flat=True))
+        self.assertEqual(len(codes), 6)
+        self.assertFalse(codes & {None, ""})
+
+
+# --------------------- REFERRAL TREE ---------------------
+class ReferralTreeTests(TestCase):
+    def setUp(self):
+        # root -> a -> b, root -> c
+        self.root = make_user("root")
+        self.a = make_user("a", referred_by=self.root)
+        self.b = make_user("b", referred_by=self.a)
+        self.c = make_user("c", referred_by=self.root)
+
+    def tree(self):
+        return {
+            user.username: (user.referral_path, user.referral_depth, user.downline_size)
+            for user in CustomUser.objects.all()
+        }
+
+    def assertTree(self, expected):
+        self.assertEqual(self.tree(), expected)
+        call_command("rebuild_referral_tree", stdout=StringIO())
+        self.assertEqual(self.tree(), expected)  # incremental upkeep matches a rebuild
+
+    def test_paths_depths_and_downline_sizes(self):
+        r, a = self.root.pk, self.a.pk
+        self.assertTree({
+            "root": ("", 0, 3), "a": (f"{r}/", 1, 1), "b": (f"{r}/{a}/", 2, 0), "c": (f"{r}/", 1, 0),
+        })
+        self.root.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.assertEqual(set(referral_tree.downline(self.root).values_list("username", flat=True)), {"a", "b", "c"})
+        self.b.refresh_from_db()
+        self.assertEqual(referral_tree.ancestor_ids(self.b.referral_path), [a, r])
+
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f"bulk{i}", phone=f"070{i}", email=f"bulk{i}@example.com", referred_by=self.b)
+            for i in range(3)
+        ])
+        self.assertEqual(
+            list(CustomUser.objects.filter(username__in=["root", "a", "b"]).order_by("pk")
+                 .values_list("downline_size", flat=True)),
+            [6, 4, 3],
+        )
+
+    def test_moving_a_subtree(self):
+        r, c = self.root.pk, self.c.pk
+        self.a.referred_by = self.c
+        self.a.save()
+        self.assertTree({
+            "root": ("", 0, 3), "c": (f"{r}/", 1, 2), "a": (f"{r}/{c}/", 2, 1), "b": (f"{r}/{c}/{self.a.pk}/", 3, 0),
+        })
+
+        self.a.referred_by = None
+        self.a.save(update_fields=["referred_by"])
+        self.assertTree({"root": ("", 0, 1), "c": (f"{r}/", 1, 0), "a": ("", 0, 1), "b": (f"{self.a.pk}/", 1, 0)})
+
+        # No cycles, from code or from the admin form
+        self.a.referred_by = self.b
+        with self.assertRaises(ValueError):
+            self.a.save()
+        with self.assertRaises(ValidationError):
+            self.a.clean()
+
+    def test_stale_instances_do_not_overwrite_the_tree(self):
+        stale_root = CustomUser.objects.get(pk=self.root.pk)
+        make_user("d", referred_by=self.c)
+        stale_root.full_name = "Root"
+        stale_root.save()
+        self.assertEqual(CustomUser.objects.get(pk=self.root.pk).downline_size, 4)
+
+    def test_deferred_fields_are_not_fetched_on_save(self):
+        user = CustomUser.objects.only("pk", "full_name").get(pk=self.a.pk)
+        user.full_name = "A"
+        with self.assertNumQueries(1):  # the UPDATE
+            user.save()
+        self.assertEqual(CustomUser.objects.get(pk=self.a.pk).full_name, "A")
+
+        user = CustomUser.objects.only("pk", "referred_by").get(pk=self.b.pk)
+        user.referred_by_id = self.c.pk
+        user.save()
+        self.assertEqual(self.tree()["b"], (f"{self.root.pk}/{self.c.pk}/", 2, 0))
+
+    def test_deleting_a_user_detaches_their_downline(self):
+        self.a.delete()
+        self.assertTree({"root": ("", 0, 1), "b": ("", 0, 0), "c": (f"{self.root.pk}/", 1, 0)})
+
+    @override_settings(REFERRAL_COMMISSION_RATES=[Decimal("0.10"), Decimal("0.05")])
+    def test_order_commission_is_split_up_the_tree(self):
+        product = make_product()  # 1500.00 commission
+        Order.objects.bulk_create([
+            Order(product=product, affiliate=affiliate, buyer_phone="0800", payment_method="bank")
+            for affiliate in (self.b, self.c)
+        ])
+        counts = approvals.approve_orders(Order.objects.all())
+        self.assertEqual(counts, {"approved": 2, "commissions": 5})
+
+        balances = dict(CustomUser.objects.values_list("username", "commission_balance"))
+        self.assertEqual(balances, {
+            "b": Decimal("1275.00"), "a": Decimal("150.00"),  # b's order: 10% to a, 5% to root
+            "c": Decimal("1350.00"), "root": Decimal("75.00") + Decimal("150.00"),  # c's order: 10% to root
+        })
+        referral = Commission.objects.get(user=self.a)
+        self.assertEqual((referral.commission_type, referral.sale_reference),
+                         ("referral", f"Order {referral.order_id} - {product.name} (referral level 1)"))
+
+        # The single-order admin path pays the same shares
+        from .admin import OrderAdmin
+        order = Order.objects.create(product=product, affiliate=self.b, buyer_phone="0800", payment_method="bank")
+        order.status = "approved"
+        OrderAdmin(Order, None)._approve_order(order)
+        self.assertEqual(
+            dict(Commission.objects.filter(order=order).values_list("user__username", "amount")),
+            {"b": Decimal("1275.00"), "a": Decimal("150.00"), "root": Decimal("75.00")},
+        )
+
+    def test_commission_rates_are_validated_at_startup(self):
+        approvals.check_commission_rates([Decimal("0.5"), Decimal("0.5")])
+        for rates in ([Decimal("1.5")], [Decimal("-0.1")], [Decimal("0.6"), Decimal("0.5")]):
+            with self.subTest(rates=rates), self.assertRaises(ImproperlyConfigured):
+                approvals.check_commission_rates(rates)
+        with self.settings(REFERRAL_COMMISSION_RATES=[Decimal("2")]), self.assertRaises(ImproperlyConfigured):
+            apps.get_app_config("accounts").ready()
+
+
+# --------------------- USER APPROVAL ---------------------
+@override_settings(BACKGROUND_WORKERS=0)
+class ApproveUsersTests(TestCase):
+    def setUp(self):
+        self.referrer = make_user("referrer")
+        self.products = [make_product(name=f"Product {i}") for i in range(2)]
+
+    def register(self, count, **extra):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f"new{i}", phone=f"090{i}", email=f"new{i}@example.com", is_active=False,
+                       referral_code=f"NEW{i}", **extra)
+            for i in range(count)
+        ])
+        return CustomUser.objects.filter(username__startswith="new")
+
+    def test_approves_in_bulk_then_onboards_after_commit(self):
+        pending = self.register(4, referred_by=self.referrer)
+        Referral.objects.create(user=self.referrer, referred_user=pending.get(username="new0"))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(6):  # select, update, referral probe and insert, plus a savepoint
+                counts = approvals.approve_users(CustomUser.objects.all())
+        self.assertEqual(counts, {"approved": 4, "referrals": 3})
+        self.assertFalse(CustomUser.objects.filter(is_active=False).exists())
+        self.assertEqual(Referral.objects.filter(user=self.referrer).count(), 4)
+        self.assertFalse(AffiliateLink.objects.exists())  # not before the commit
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(AffiliateLink.objects.count(), 4 * len(self.products))
+        self.assertEqual(
+            AffiliateLink.objects.get(user__username="new1", product=self.products[0]).link,
+            links.build_link("new1", self.products[0].pk),
+        )
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"new{i}@example.com" for i in range(4)])
+
+        self.assertEqual(approvals.approve_users(CustomUser.objects.all()), {"approved": 0, "referrals": 0})
+
+    def test_command(self):
+        self.register(3)
+        with self.assertRaises(CommandError):
+            call_command("approve_users", stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("approve_users", "--user", "new0", "--user", "new2", stdout=StringIO())
+        self.assertEqual(
+            list(CustomUser.objects.filter(is_active=True, username__startswith="new").values_list("username", flat=True)
+                 .order_by("username")),
+            ["new0", "new2"],
+        )
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_admin_action_and_form(self):
+        admin = make_user("admin", is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        pending = list(self.register(2, referred_by=self.referrer))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("admin:accounts_customuser_changelist"), {
+                "action": "approve_users", "_selected_action": [pending[0].pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Referral.objects.filter(referred_user=pending[0]).exists())
+        self.assertEqual(AffiliateLink.objects.filter(user=pending[0]).count(), 2)
+
+        # Ticking is_active on the change form onboards the user too
+        form = self.change_form(pending[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("admin:accounts_customuser_change", args=[pending[1].pk]), form)
+        self.assertEqual(response.status_code, 302, response.content[:2000])
+        self.assertTrue(Referral.objects.filter(referred_user=pending[1]).exists())
+        self.assertEqual(len(mail.outbox), 2)
+
+    @staticmethod
+    def change_form(user):
+        return {
+            "email": user.email, "username": user.username, "password": user.password,
+            "commission_balance": "0", "referral_code": user.referral_code, "referred_by": user.referred_by_id,
+            "is_active": "on",
+        }
+
+
+# --------------------- AFFILIATE CLICKS ---------------------
+@override_settings(BACKGROUND_WORKERS=0)
+class ClickBufferTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate")
+        self.product = make_product()
+        self.buffer = ClickBuffer(size=100, interval=0, dedup_window=60)
+
+    def test_repeat_click_within_window_is_dropped(self):
+        self.assertTrue(self.buffer.record("affiliate", self.product.pk, "visitor-a"))
+        self.assertFalse(self.buffer.record("affiliate", self.product.pk, "visitor-a"))
+        self.assertTrue(self.buffer.record("affiliate", self.product.pk, "visitor-b"))
+        self.buffer.flush()
+        self.assertEqual(AffiliateClick.objects.count(), 2)
+
+    def test_nothing_is_written_until_the_buffer_fills(self):
+        buffer = ClickBuffer(size=3, interval=0, dedup_window=60)
+        for visitor in ("a", "b"):
+            buffer.record("affiliate", self.product.pk, visitor)
+        self.assertFalse(AffiliateClick.objects.exists())
+
+        buffer.record("affiliate", self.product.pk, "c")
+        self.assertEqual(AffiliateClick.objects.count(), 3)
+
+    def test_flush_is_batched_and_maintains_hourly_rollups(self):
+        other = make_product(name="Charger")
+        for i in range(50):
+            self.buffer.record("affiliate", self.product.pk if i % 5 else other.pk, f"visitor-{i}")
+        self.buffer.record("ghost", self.product.pk, "visitor-x")
+
+        # Resolve users, resolve products, insert clicks, recount, upsert rollups (+ savepoint pair)
+        with self.assertNumQueries(7):
+            self.assertEqual(self.buffer.flush(), 50)
+        rollups = dict(AffiliateClickHourly.objects.values_list("product_id", "clicks"))
+        self.assertEqual(rollups, {self.product.pk: 40, other.pk: 10})
+
+        # A later flush in the same hour recounts rather than double-adds
+        self.buffer.record("affiliate", self.product.pk, "visitor-late")
+        self.buffer.flush()
+        self.assertEqual(AffiliateClickHourly.objects.get(product=self.product).clicks, 41)
+
+    def test_endpoint_buffers_signed_clicks_only(self):
+        client = APIClient()
+        token = links.link_token("affiliate", self.product.pk)
+        url = reverse("affiliate-click")
+        with patch("accounts.views.click_buffer", self.buffer):
+            with self.assertNumQueries(0):
+                response = client.post(url, {"ref": "affiliate", "product": self.product.pk, "t": token}, format="json")
+            self.assertEqual(response.status_code, 202)
+            forged = client.post(url, {"ref": "someone-else", "product": self.product.pk, "t": token}, format="json")
+            self.assertEqual(forged.status_code, 400)
+
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_failed_flush_keeps_the_batch_off_the_request_path(self):
+        buffer = ClickBuffer(size=2, interval=0, dedup_window=60)
+        client = APIClient()
+        with (
+            patch("accounts.views.click_buffer", buffer),
+            patch.object(AffiliateClick.objects, "bulk_create", side_effect=DatabaseError("down")),
+            self.assertLogs("accounts.clicks", "ERROR"),
+        ):
+            for visitor in ("a", "b"):
+                payload = {"ref": "affiliate", "product": self.product.pk,
+                           "t": links.link_token("affiliate", self.product.pk)}
+                response = client.post(reverse("affiliate-click"), payload, format="json", HTTP_USER_AGENT=visitor)
+                self.assertEqual(response.status_code, 202)
+        self.assertFalse(AffiliateClick.objects.exists())
+        self.assertEqual(buffer.flush(), 2)
+
+    def test_links_shared_from_the_product_page_are_counted(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        link = client.get(reverse("affiliate-links")).json()[0]
+        # products.js copies ref and t from the link into product_details.html, which posts them back
+        query = parse_qs(urlsplit(link["link"]).query)
+        payload = {"ref": query["ref"][0], "product": link["product_id"], "t": query["t"][0]}
+        with patch("accounts.views.click_buffer", self.buffer):
+            response = APIClient().post(reverse("affiliate-click"), payload, format="json")
+        self.assertEqual(response.json(), {"recorded": True})
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_rotating_forwarded_for_is_one_visitor(self):
+        client = APIClient(REMOTE_ADDR="198.51.100.7")
+        payload = {"ref": "affiliate", "product": self.product.pk, "t": links.link_token("affiliate", self.product.pk)}
+        with patch("accounts.views.click_buffer", self.buffer):
+            for i in range(5):
+                client.post(reverse("affiliate-click"), payload, format="json", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}")
+        self.assertEqual(self.buffer.flush(), 1)
+
+
+# --------------------- ASYNC ENDPOINTS ---------------------
+@override_settings(CACHES=CATALOGUE_TEST_CACHES)
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        caches["catalogue"].clear()
+        self.user = make_user("affiliate")
+        self.product = make_product()
+
+    async def test_product_detail_matches_sync_view(self):
+        client = AsyncClient()
+        response = await client.get(reverse("product-detail-async", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 200)
+        expected = await client.get(reverse("product-detail", args=[self.product.pk]))
+        self.assertEqual(response.json(), expected.json())
+
+        revalidated = await client.get(
+            reverse("product-detail-async", args=[self.product.pk]), headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+        missing = await client.get(reverse("product-detail-async", args=[999]))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_place_order_with_upload(self):
+        proof = SimpleUploadedFile("proof.png", png_bytes(), content_type="image/png")
+        response = await AsyncClient().post(reverse("place-order-async"), {
+            "product": self.product.pk, "affiliate_username": "affiliate",
+            "buyer_phone": "0800", "payment_method": "bank", "proof_of_payment": proof,
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(body["product_name"], "Power Bank")
+        self.assertEqual(body["status"], "pending")
+        order = await Order.objects.select_related("affiliate").aget(pk=body["id"])
+        self.assertEqual(order.affiliate.username, "affiliate")
+        self.assertTrue(order.proof_of_payment.name.startswith("payments/"))
+        await sync_to_async(order.proof_of_payment.delete)(save=False)
+
+    async def test_place_order_rejects_unknown_affiliate_and_bad_image(self):
+        client = AsyncClient()
+        payload = {"product": self.product.pk, "buyer_phone": "0800", "payment_method": "bank"}
+
+        response = await client.post(reverse("place-order-async"), {**payload, "affiliate_username": "nobody"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("affiliate_username", response.json())
+
+        bogus = SimpleUploadedFile("proof.png", b"not an image", content_type="image/png")
+        response = await client.post(
+            reverse("place-order-async"), {**payload, "affiliate_username": "affiliate", "proof_of_payment": bogus}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("proof_of_payment", response.json())
+        self.assertFalse(await Order.objects.aexists())
+
+
+# --------------------- PROOF OF PAYMENT ---------------------
+@override_settings(PROOF_OF_PAYMENT_MAX_DIMENSION=400, PROOF_THUMBNAIL_SIZE=64, BACKGROUND_WORKERS=0)
+class ProofOfPaymentTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = make_user("affiliate")
+        self.product = make_product()
+
+    def order_payload(self, image):
+        return {
+            "product": self.product.pk, "affiliate_username": "affiliate", "buyer_phone": "0800",
+            "payment_method": "bank", "proof_of_payment": SimpleUploadedFile("receipt.png", image, "image/png"),
+        }
+
+    def test_upload_is_reencoded_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(reverse("place-order"), self.order_payload(png_bytes((1200, 900))))
+        self.assertEqual(response.status_code, 201, response.content)
+
+        order = Order.objects.get()
+        self.assertGreater(order.proof_bytes_saved, 0)
+        self.assertTrue(order.proof_of_payment.name.endswith((".webp", ".jpg")))
+        with Image.open(order.proof_of_payment) as proof:
+            self.assertEqual(proof.size, (400, 300))
+        with Image.open(order.proof_thumbnail) as thumb:
+            self.assertEqual(thumb.size, (64, 64))
+
+        # Already processed: nothing left to do
+        self.assertIsNone(proofs.optimize(order.pk))
+
+    def test_decompression_bomb_is_left_as_uploaded(self):
+        order = Order.objects.create(
+            product=self.product, affiliate=self.user, buyer_phone="0800", payment_method="bank",
+            proof_of_payment=SimpleUploadedFile("receipt.png", png_bytes((900, 900))),
+        )
+        with (
+            patch.object(Image, "MAX_IMAGE_PIXELS", 100_000),  # 900x900 is over twice the limit
+            self.assertLogs("accounts.proofs", "WARNING"),
+        ):
+            self.assertEqual(proofs.optimize(order.pk), 0)
+        order.refresh_from_db()
+        self.assertEqual(order.proof_bytes_saved, 0)
+        self.assertFalse(order.proof_thumbnail)
+
+    def test_backlog_command_processes_unoptimized_orders(self):
+        order = Order.objects.create(
+            product=self.product, affiliate=self.user, buyer_phone="0800", payment_method="bank",
+            proof_of_payment=SimpleUploadedFile("receipt.png", png_bytes((900, 900))),
+        )  # outside captureOnCommitCallbacks, so the receiver's on_commit never fires
+        out = StringIO()
+        call_command("optimize_payment_proofs", "--workers", "1", stdout=out)
+        self.assertIn("1 proofs processed", out.getvalue())
+        order.refresh_from_db()
+        self.assertIsNotNone(order.proof_bytes_saved)
+        self.assertTrue(order.proof_thumbnail)
+
+    @override_settings(PROOF_OF_PAYMENT_MAX_BYTES=1024)
+    def test_oversized_upload_is_rejected(self):
+        payload = self.order_payload(os.urandom(4096))
+        self.assertEqual(APIClient().post(reverse("place-order"), payload).status_code, 413)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(PROOF_OF_PAYMENT_MAX_BYTES=1024)
+    async def test_oversized_upload_is_rejected_on_async_path(self):
+        response = await AsyncClient().post(reverse("place-order-async"), self.order_payload(os.urandom(4096)))
+        self.assertEqual(response.status_code, 413)
+
+    @override_settings(MAX_REQUEST_BODY_BYTES=1024)
+    async def test_asgi_app_stops_reading_oversized_bodies(self):
+        from bjsolutions.asgi import application
+
+        async def call(headers, chunks):
+            chunks, sent = list(chunks), []
+
+            async def receive():
+                body = chunks.pop(0)
+                return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+            async def send(message):
+                sent.append(message)
+            scope = {"type": "http", "method": "POST", "path": reverse("place-order-async"),
+                     "headers": headers, "query_string": b""}
+            await application(scope, receive, send)
+            return sent[0]["status"], len(chunks)
+
+        # Streamed without a length: refused at the chunk that crosses the cap
+        self.assertEqual(await call([], [b"x" * 512] * 10), (413, 7))
+        # A declared length over the cap is refused before reading anything
+        self.assertEqual(await call([(b"content-length", b"5120")], [b"x" * 512] * 10), (413, 10))
+
+    def test_direct_uploads_need_object_storage(self):
+        response = APIClient().post(reverse("proof-upload"), {"content_type": "image/png"}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+
+# --------------------- OBJECT STORAGE ---------------------
+S3_TEST_OPTIONS = {"bucket_name": "bj-media", "region_name": "us-east-1", "file_overwrite": False}
+S3_TEST_STORAGES = {
+    "default": {"BACKEND": "storages.backends.s3.S3Storage",
+                "OPTIONS": {**S3_TEST_OPTIONS, "querystring_auth": False}},
+    "proofs": {"BACKEND": "storages.backends.s3.S3Storage", "OPTIONS": S3_TEST_OPTIONS},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@skipUnless(mock_aws, "moto is not installed (pip install -r requirements-dev.txt)")
+@override_settings(STORAGES=S3_TEST_STORAGES, PROOF_OF_PAYMENT_MAX_DIMENSION=400, BACKGROUND_WORKERS=0)
+class ObjectStorageTests(TestCase):
+    def setUp(self):
+        self.enterContext(patch.dict(os.environ, {
+            "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+        }))
+        self.enterContext(mock_aws())
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="bj-media")
+        self.user = make_user("affiliate")
+        self.product = make_product()
+
+    def upload_slot(self, **data):
+        return APIClient().post(reverse("proof-upload"), {"content_type": "image/png", **data}, format="json")
+
+    def order_payload(self, token):
+        return {
+            "product": self.product.pk, "affiliate_username": "affiliate", "buyer_phone": "0800",
+            "payment_method": "bank", "proof_upload": token,
+        }
+
+    def test_proof_goes_straight_to_the_bucket(self):
+        response = self.upload_slot(size=2048)
+        self.assertEqual(response.status_code, 201, response.content)
+        slot = response.json()
+        key = slot["fields"]["key"]
+        self.assertTrue(key.startswith("payments/uploads/"))
+        self.assertIn("policy", slot["fields"])
+
+        # What the browser does with the slot
+        self.s3.put_object(Bucket="bj-media", Key=key, Body=png_bytes((1200, 900)), ContentType="image/png")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(reverse("place-order"), self.order_payload(slot["token"]))
+        self.assertEqual(response.status_code, 201, response.content)
+
+        # The background re-encode reads and writes the bucket too
+        order = Order.objects.get()
+        self.assertGreater(order.proof_bytes_saved, 0)
+        with Image.open(order.proof_of_payment) as proof:
+            self.assertEqual(proof.size, (400, 300))
+        self.assertIn("Signature=", order.proof_of_payment.url)
+        self.assertNotIn("Signature=", self.product.picture.url)
+
+    async def test_async_order_accepts_upload_token(self):
+        slot = (await sync_to_async(self.upload_slot)()).json()
+        await sync_to_async(self.s3.put_object)(Bucket="bj-media", Key=slot["fields"]["key"], Body=png_bytes())
+
+        response = await AsyncClient().post(reverse("place-order-async"), self.order_payload(slot["token"]))
+        self.assertEqual(response.status_code, 201, response.content)
+        order = await Order.objects.aget()
+        self.assertEqual(order.proof_of_payment.name, slot["fields"]["key"])
+
+    def test_forged_or_unfinished_uploads_are_rejected(self):
+        forged = APIClient().post(reverse("place-order"), self.order_payload("payments/someone-elses.png"))
+        self.assertEqual(forged.status_code, 400)
+
+        token = self.upload_slot().json()["token"]  # slot issued, nothing uploaded
+        response = APIClient().post(reverse("place-order"), self.order_payload(token))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("proof_upload", response.json())
+        self.assertFalse(Order.objects.exists())
+
+    def uploaded_slot(self):
+        slot = self.upload_slot().json()
+        self.s3.put_object(Bucket="bj-media", Key=slot["fields"]["key"], Body=png_bytes(), ContentType="image/png")
+        return slot
+
+    def test_an_upload_backs_one_order(self):
+        token = self.uploaded_slot()["token"]
+        self.assertEqual(APIClient().post(reverse("place-order"), self.order_payload(token)).status_code, 201)
+        response = APIClient().post(reverse("place-order"), self.order_payload(token))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"proof_upload": [direct_uploads.ALREADY_USED]})
+
+        # A concurrent claim that got past the check hits the constraint
+        name = Order.objects.get().proof_of_payment.name
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Order.objects.create(product=self.product, affiliate=self.user, buyer_phone="0800",
+                                 payment_method="bank", proof_of_payment=name)
+        with patch("django.db.models.QuerySet.exists", return_value=False):  # as if checked first
+            with self.assertRaises(serializers.ValidationError):
+                direct_uploads.create_order(product=self.product, affiliate=self.user, buyer_phone="0800",
+                                            payment_method="bank", proof_of_payment=name)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_sweep_removes_unclaimed_uploads(self):
+        claimed, unclaimed = self.uploaded_slot(), self.uploaded_slot()
+        APIClient().post(reverse("place-order"), self.order_payload(claimed["token"]))
+
+        out = StringIO()
+        call_command("sweep_proof_uploads", stdout=out)  # both still within their token lifetime
+        self.assertIn("0 unclaimed uploads deleted", out.getvalue())
+
+        call_command("sweep_proof_uploads", "--older-than", "0", stdout=StringIO())
+        keys = {obj["Key"] for obj in self.s3.list_objects_v2(Bucket="bj-media")["Contents"]}
+        self.assertIn(claimed["fields"]["key"], keys)
+        self.assertNotIn(unclaimed["fields"]["key"], keys)
+
+    @override_settings(PROOF_OF_PAYMENT_MAX_BYTES=1024)
+    def test_upload_slot_validation(self):
+        self.assertEqual(self.upload_slot(content_type="application/pdf").status_code, 400)
+        self.assertEqual(self.upload_slot(size=4096).status_code, 413)
+
+    def test_copy_media_to_storage(self):
+        with tempfile.TemporaryDirectory() as source:
+            for name in ("products/phone.png", "payments/receipt.png", "variants/ab/abc/64w.webp"):
+                os.makedirs(os.path.join(source, os.path.dirname(name)), exist_ok=True)
+                with open(os.path.join(source, name), "wb") as file:
+                    file.write(png_bytes())
+
+            out = StringIO()
+            call_command("copy_media_to_storage", "--source", source, stdout=out)
+            self.assertIn("3 files copied", out.getvalue())
+            self.assertTrue(default_storage.exists("variants/ab/abc/64w.webp"))
+
+            call_command("copy_media_to_storage", "--source", source, stdout=out)
+            self.assertIn("0 files copied (0.0 MB), 3 already present", out.getvalue())
+
+
+# --------------------- IMAGE VARIANTS ---------------------
+@override_settings(IMAGE_VARIANT_WIDTHS=(64, 128), BACKGROUND_WORKERS=0, CACHES=CATALOGUE_TEST_CACHES)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        caches["catalogue"].clear()
+
+    def upload_product(self, size=(300, 150)):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name="Blender", price=Decimal("100.00"), commission_amount=Decimal("10.00"),
+                picture=SimpleUploadedFile("blender.png", png_bytes(size)),
+            )
+        product.refresh_from_db()
+        return product
+
+    def test_upload_generates_each_width_and_srcset(self):
+        product = self.upload_product()
+        self.assertEqual(len(product.picture_hash), 64)
+
+        srcset = APIClient().get(reverse("product-detail", args=[product.pk])).json()["picture_srcset"]
+        self.assertEqual(set(srcset), {"64w", "128w"})
+        for width in (64, 128):
+            with default_storage.open(variants.variant_name(product.picture_hash, width)) as variant:
+                self.assertEqual(Image.open(variant).size, (width, width // 2))
+
+    def test_small_pictures_are_not_upscaled(self):
+        product = self.upload_product(size=(100, 100))
+        with default_storage.open(variants.variant_name(product.picture_hash, 128)) as variant:
+            self.assertEqual(Image.open(variant).size, (100, 100))
+
+    def test_generation_is_idempotent(self):
+        product = self.upload_product()
+        with patch("accounts.images.widths") as render:
+            self.assertEqual(variants.refresh(Product, product.pk), product.picture_hash)
+        render.assert_not_called()
+
+        # Saving without a new picture queues nothing
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.name = "Renamed"
+            product.save()
+        self.assertEqual(callbacks, [])
+
+    def test_profile_serializer_exposes_srcset(self):
+        user = make_user("affiliate")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_picture = SimpleUploadedFile("me.png", png_bytes((256, 256)))
+            user.save()
+        user.refresh_from_db()
+        client = APIClient()
+        client.force_authenticate(user)
+        srcset = client.get(reverse("profile")).json()["profile_picture_srcset"]
+        self.assertEqual(set(srcset), {"64w", "128w"})
+
+    def test_regenerate_command_backfills(self):
+        product = self.upload_product()
+        digest = product.picture_hash
+        Product.objects.filter(pk=product.pk).update(picture_hash="")
+        for width in (64, 128):
+            default_storage.delete(variants.variant_name(digest, width))
+
+        out = StringIO()
+        call_command("regenerate_image_variants", "--workers", "1", stdout=out, stderr=StringIO())
+        self.assertIn("Variants ready for 1 pictures", out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.picture_hash, digest)
+        self.assertTrue(default_storage.exists(variants.variant_name(digest, 64)))
+
+
+# --------------------- MEDIA & STATIC SERVING ---------------------
+class MediaServingTests(TestCase):
+    BODY = bytes(range(256)) * 4
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, "variants"))
+        for name in ("receipt.bin", "variants/image.webp"):
+            with open(os.path.join(media.name, name), "wb") as file:
+                file.write(self.BODY)
+
+    def get(self, path, **headers):
+        return self.client.get(f"/media/{path}", headers=headers)
+
+    def test_full_download_with_validators(self):
+        response = self.get("receipt.bin")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=86400", response["Cache-Control"])
+
+        self.assertEqual(self.get("receipt.bin", if_none_match=response["ETag"]).status_code, 304)
+        self.assertIn("immutable", self.get("variants/image.webp")["Cache-Control"])
+
+    def test_byte_ranges(self):
+        response = self.get("receipt.bin", range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.BODY)}")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[10:20])
+
+        suffix = self.get("receipt.bin", range="bytes=-5")
+        self.assertEqual(b"".join(suffix.streaming_content), self.BODY[-5:])
+
+        self.assertEqual(self.get("receipt.bin", range="bytes=5000-").status_code, 416)
+
+        # A stale If-Range gets the whole (changed) file instead of a partial
+        stale = self.get("receipt.bin", range="bytes=0-9", if_range='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_path_traversal_and_missing_files_are_404(self):
+        self.assertEqual(self.get("../settings.py").status_code, 404)
+        self.assertEqual(self.get("missing.bin").status_code, 404)
+
+    def test_offload_to_front_end_server(self):
+        with self.settings(MEDIA_SERVING="x-accel-redirect"):
+            response = self.get("receipt.bin")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/receipt.bin")
+        self.assertEqual(response.content, b"")
+
+        with self.settings(MEDIA_SERVING="x-sendfile"):
+            response = self.get("receipt.bin")
+        self.assertTrue(response["X-Sendfile"].endswith("receipt.bin"))
+
+
+class StaticBuildTests(TestCase):
+    def test_frontend_pages_point_at_fingerprinted_compressed_assets(self):
+        # Only the Frontend/ directory; the app static files add nothing but time
+        only_frontend = ["django.contrib.staticfiles.finders.FileSystemFinder"]
+        with tempfile.TemporaryDirectory() as root, \
+                override_settings(STATIC_ROOT=root, STATICFILES_FINDERS=only_frontend):
+            call_command("collectstatic", "--noinput", verbosity=0)
+            with open(os.path.join(root, "Frontend", "products.html")) as page:
+                html = page.read()
+            script = re.search(r'src="(js/products\.[0-9a-f]{12}\.js)"', html)
+            self.assertIsNotNone(script, html)
+            self.assertTrue(os.path.exists(os.path.join(root, "Frontend", script.group(1) + ".gz")))
+
+
+# --------------------- AUTHENTICATION ---------------------
+@override_settings(AUTH_USER_CACHE_TTL=60)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = make_user("affiliate", commission_balance=Decimal("8000.00"))
+        make_product()
+        response = APIClient().post(reverse("login"), {"identifier": "affiliate", "password": "pass12345"},
+                                    format="json")
+        self.header = f"Bearer {response.json()['access']}"
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.header)
+
+    def test_reads_load_the_user_once(self):
+        with self.assertNumQueries(2):  # the products and the user row, then cached
+            response = self.client.get(reverse("affiliate-links"))
+        with self.assertNumQueries(1):
+            self.client.get(reverse("affiliate-links"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ref=affiliate", response.json()[0]["link"])
+
+    def test_links_follow_a_rename(self):
+        self.client.get(reverse("affiliate-links"))  # cache the row under the old name
+        response = self.client.patch(reverse("profile"), {"username": "renamed"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        # Same access token, which was issued before the rename
+        self.assertIn("ref=renamed", self.client.get(reverse("affiliate-links")).json()[0]["link"])
+
+    def test_user_row_is_cached_until_saved(self):
+        request = Request(
+            APIRequestFactory().get("/", HTTP_AUTHORIZATION=self.header),
+            authenticators=[ClaimsJWTAuthentication()],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(request.user.pk, self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user.email, "affiliate@example.com")
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cache.get(self.user.pk).email, "affiliate@example.com")
+
+        self.user.email = "new@example.com"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(user_cache.get(self.user.pk).email, "new@example.com")
+
+    def test_money_is_read_fresh(self):
+        user_cache.get(self.user.pk)  # cached with the old balances
+        balances.credit(self.user.pk, Decimal("500.00"))
+        CustomUser.objects.filter(pk=self.user.pk).update(balance=Decimal("700.00"))
+        self.assertEqual(self.client.get(reverse("dashboard")).json()["available_commission"], 8500.0)
+        self.assertEqual(Decimal(self.client.get(reverse("profile")).json()["balance"]), Decimal("700.00"))
+
+    def test_writes_load_the_user(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(reverse("cashout-request"), {"requested_amount": "6000"}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10, PASSWORD_SCRYPT_PARALLELISM=1)
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user("affiliate", phone="08012345678")
+
+    def login(self, identifier, password="pass12345"):
+        return APIClient().post(reverse("login"), {"identifier": identifier, "password": password}, format="json")
+
+    def test_username_or_phone_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(passwords.find_user("08012345678"), self.user)
+        self.assertEqual(self.login("affiliate").status_code, 200)
+        self.assertEqual(self.login("08012345678").status_code, 200)
+        self.assertEqual(self.login("08012345678", "wrong").status_code, 400)
+        self.assertEqual(self.login("nobody").json(), {"non_field_errors": [passwords.INVALID_CREDENTIALS]})
+
+        # An identifier that is one user's username and another's phone means the username
+        other = make_user("08099999999", phone="affiliate")
+        self.assertEqual(passwords.find_user("affiliate"), self.user)
+        self.assertEqual(passwords.find_user("08099999999"), other)
+
+    def test_outdated_hashes_are_upgraded_on_login(self):
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.user.password = make_password("pass12345", hasher="pbkdf2_sha256")
+            self.user.save()
+            self.assertEqual(self.login("affiliate").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+        # A changed cost counts as outdated too
+        with self.settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertEqual(self.login("affiliate").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIn(f"${2 ** 11}$", self.user.password)
+
+        # Hashes from Django's other default hashers still verify
+        self.user.password = make_password("pass12345", hasher="pbkdf2_sha1")
+        self.user.save()
+        self.assertEqual(self.login("affiliate").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+    async def test_async_login_and_register(self):
+        client = AsyncClient()
+        response = await client.post(reverse("login-async"), {"identifier": "08012345678", "password": "pass12345"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.json())
+
+        response = await client.post(reverse("login-async"), {"identifier": "affiliate"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json())
+
+        response = await client.post(reverse("register-async"), {
+            "username": "newbie", "phone": "0901", "email": "newbie@example.com", "password": "pass12345",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        newbie = await CustomUser.objects.aget(username="newbie")
+        self.assertFalse(newbie.is_active)
+        self.assertTrue(newbie.password.startswith("scrypt$"))
+
+        duplicate = await client.post(reverse("register-async"), {
+            "username": "newbie", "phone": "0902", "email": "x@example.com", "password": "pass12345",
+        }, content_type="application/json")
+        self.assertEqual(duplicate.status_code, 400)
+
+
+# --------------------- RATE LIMITS ---------------------
+def throttle_rates(**rates):
+    return {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {
+        **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"], **rates,
+    }}
+
+
+@override_settings(REST_FRAMEWORK=throttle_rates(
+    login="3/m", login_failures="2/m", register="1/h", order="1/h", proof_upload="1/h",
+))
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        caches["throttle"].clear()
+        self.enterContext(self.assertLogs("accounts.throttling", "WARNING"))  # every refusal is logged
+        # Mid-window, so a test never straddles a window boundary
+        self.enterContext(patch.object(throttling, "time", Mock(time=lambda: 60 * 1000 + 30)))
+        self.user = make_user("affiliate", phone="08012345678")
+
+    def login(self, identifier="affiliate", password="pass12345", ip="10.0.0.1", **extra):
+        return APIClient().post(reverse("login"), {"identifier": identifier, "password": password},
+                                format="json", REMOTE_ADDR=ip, **extra)
+
+    def test_sliding_window(self):
+        start = 60 * 1000  # the start of a one-minute window
+        self.assertEqual(throttling.hit("login", "k", now=start), (True, 0))
+        self.assertEqual(throttling.hit("login", "k", now=start + 1), (True, 0))
+        self.assertEqual(throttling.hit("login", "k", now=start + 2), (True, 0))
+        self.assertEqual(throttling.hit("login", "k", now=start + 3), (False, 57))
+
+        # Halfway through the next window the previous one weighs 3 * 0.5
+        self.assertEqual(throttling.hit("login", "k", now=start + 90), (True, 0))
+        self.assertEqual(throttling.hit("login", "k", now=start + 90), (True, 0))
+        # 3 * (1 - elapsed) + 2 drops under 3 at 2/3 of the window, 10s on
+        self.assertEqual(throttling.hit("login", "k", now=start + 90), (False, 10))
+        self.assertEqual(throttling.parse_rate("10/15m"), (10, 900))
+
+    def test_login_burst_is_refused_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 200)
+        with patch("accounts.passwords.check") as check:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response["Retry-After"]) <= 60)
+        check.assert_not_called()
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, 200)  # other clients are unaffected
+
+    def test_spoofed_forwarded_for_shares_one_bucket(self):
+        for i in range(3):
+            self.assertEqual(self.login(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}").status_code, 200)
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="203.0.113.99").status_code, 429)
+
+        # Behind one trusted proxy, the right-most entry is the client
+        caches["throttle"].clear()
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            for i in range(3):
+                response = self.login(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}, 198.51.100.7")
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="203.0.113.99, 198.51.100.7").status_code, 429)
+            self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="198.51.100.8").status_code, 200)
+
+    def test_concurrent_hits_cannot_overshoot_the_limit(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: throttling.hit("login", "k", now=60 * 1000)[0], range(20)))
+        self.assertEqual(results.count(True), 3)
+
+    def test_failed_logins_lock_the_identifier_per_ip(self):
+        self.assertEqual(self.login(password="wrong").status_code, 400)
+        self.assertEqual(self.login(" Affiliate", password="wrong").status_code, 400)
+        with patch("accounts.passwords.check") as check:
+            self.assertEqual(self.login("Affiliate").status_code, 429)
+        check.assert_not_called()
+
+        # The guesser's address is locked out, not the account's owner
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, 200)
+
+        # Only failures count, and only against the identifier used
+        make_user("other")
+        for i in range(3, 6):
+            self.assertEqual(self.login("other", ip=f"10.0.0.{i}").status_code, 200)
+
+    def test_failure_keys_are_safe_for_memcached(self):
+        key = throttling.login_attempt(" Some Name " + "x" * 300, "10.0.0.1")
+        self.assertLess(len(key), 250)
+        self.assertNotRegex(key, r"\s")
+        throttling.login_attempt("some name " + "x" * 300, "10.0.0.1")
+        with self.assertRaises(exceptions.Throttled):  # the same bucket, however it was typed
+            throttling.login_attempt("SOME NAME " + "x" * 300, "10.0.0.1")
+
+    def test_a_refused_request_counts_against_no_further_limit(self):
+        request = APIRequestFactory().post("/", REMOTE_ADDR="10.0.0.1")
+        limits = [throttling.RegisterRateThrottle, throttling.OrderRateThrottle]
+        self.assertIsNone(throttling.throttled_response(request, [throttling.RegisterRateThrottle]))
+        self.assertEqual(throttling.throttled_response(request, limits).status_code, 429)
+        self.assertIsNone(throttling.throttled_response(request, [throttling.OrderRateThrottle]))
+
+    def test_order_is_refused_before_the_upload_is_parsed(self):
+        product = make_product()
+        payload = {"product": product.pk, "affiliate_username": "affiliate", "buyer_phone": "0800",
+                   "payment_method": "bank"}
+        self.assertEqual(APIClient().post(reverse("place-order"), payload).status_code, 201)
+        with patch("rest_framework.parsers.MultiPartParser.parse") as parse:
+            payload["proof_of_payment"] = SimpleUploadedFile("receipt.png", png_bytes(), "image/png")
+            response = APIClient().post(reverse("place-order"), payload)
+        self.assertEqual(response.status_code, 429)
+        parse.assert_not_called()
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_upload_slots_are_throttled(self):
+        url = reverse("proof-upload")
+        self.assertEqual(APIClient().post(url, {"content_type": "image/png"}, format="json").status_code, 404)
+        self.assertEqual(APIClient().post(url, {"content_type": "image/png"}, format="json").status_code, 429)
+
+    async def test_async_views_share_the_limits(self):
+        client = AsyncClient(REMOTE_ADDR="10.0.0.9")
+        with patch("accounts.async_views._parse_upload") as parse:
+            self.assertEqual((await client.post(reverse("place-order"), {})).status_code, 400)
+            response = await client.post(reverse("place-order-async"), {})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        parse.assert_not_called()
+
+        register = {"username": "newbie", "phone": "0901", "email": "newbie@example.com", "password": "pass12345"}
+        self.assertEqual((await client.post(reverse("register-async"), register)).status_code, 201)
+        self.assertEqual((await client.post(reverse("register"), {**register, "username": "n2"})).status_code, 429)
+
+        wrong = {"identifier": "affiliate", "password": "wrong"}
+        for _ in range(2):
+            self.assertEqual((await client.post(reverse("login-async"), wrong)).status_code, 400)
+        with patch("accounts.passwords.check") as check:
+            response = await client.post(reverse("login-async"), {**wrong, "password": "pass12345"})
+        self.assertEqual(response.status_code, 429)
+        check.assert_not_called()
+
+    def test_rejections_are_counted_for_staff(self):
+        for _ in range(4):
+            self.login()
+        self.assertEqual(throttling.rejections()["login"], 1)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse("throttle-rejections")).status_code, 403)
+        admin = make_user("admin", is_staff=True)
+        client.force_authenticate(admin)
+        self.assertEqual(client.get(reverse("throttle-rejections")).json(),
+                         {"login": 1, "login_failures": 0, "register": 0, "order": 0, "proof_upload": 0})
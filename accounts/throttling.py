@@ -0,0 +1,207 @@
+# accounts/throttling.py
+"""
+Rate limits for the public login, registration and order endpoints.
+
+Limits are sliding-window counters: each ``(scope, key)`` keeps one counter
+per fixed window of the rate's period, and a request is allowed while
+``previous window * (1 - elapsed fraction) + current window < limit``. The
+counters live in the ``THROTTLE_CACHE_ALIAS`` cache (locmem, so per process,
+by default; point it at Redis or Memcached to share limits between workers).
+A request bumps its counter with ``incr``, atomic on those stores, before
+comparing, so each of a concurrent burst sees a distinct count and no more
+than the limit get through; a refused request is taken back out.
+
+* Per client IP (:func:`client_ip`): every attempt counts. The throttles run in DRF's ``initial()`` and first thing in
+  the async views, before any password hashing or multipart parsing.
+* Per login identifier and client IP: each attempt is counted before the
+  password is hashed and taken back once it verifies, so only failures add
+  up (accounts/passwords.py). Guessing from one address locks out that
+  address, not the account's owner logging in from elsewhere.
+
+Rates are DRF's ``DEFAULT_THROTTLE_RATES``, written ``<requests>/<period>``
+with an optional multiplier (``10/15m``). Every refusal is counted per scope
+in the same cache; :func:`rejections` reads the totals.
+"""
+import hashlib
+import logging
+import math
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+RATE_RE = re.compile(r"^(\d+)/(\d*)([smhd])")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+SCOPES = ("login", "login_failures", "register", "order", "proof_upload")
+
+
+def _cache():
+    return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+
+def parse_rate(rate):
+    """``"10/15m"`` -> ``(10, 900)``: requests allowed per period in seconds."""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid throttle rate {rate!r}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * UNITS[unit]
+
+
+def _rate(scope):
+    return parse_rate(api_settings.DEFAULT_THROTTLE_RATES[scope])
+
+
+def _window_keys(scope, key, period, now):
+    window = int(now // period)
+    return f"throttle:{scope}:{key}:{window - 1}", f"throttle:{scope}:{key}:{window}"
+
+
+def _incr(key, period, delta=1):
+    """Atomically add ``delta`` to a window counter and return its new value."""
+    cache = _cache()
+    # Two periods: the key is still read as the previous window
+    if delta > 0 and cache.add(key, delta, timeout=2 * period):
+        return delta
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # expired since
+        if delta < 0:
+            return 0
+        cache.set(key, delta, timeout=2 * period)
+        return delta
+
+
+def _wait(previous, current, limit, period, now):
+    """Seconds until a window holding ``previous`` and ``current`` requests admits one more."""
+    elapsed = (now % period) / period
+    if previous and current < limit:
+        # The previous window's weight decays until the estimate drops under the limit
+        wait = ((previous + current - limit) / previous - elapsed) * period
+    else:
+        wait = period - now % period
+    return max(0, math.ceil(wait))
+
+
+def hit(scope, key, now=None):
+    """Count one request for ``key``; returns ``(allowed, seconds to wait)``. Refused requests are not counted."""
+    limit, period = _rate(scope)
+    now = time.time() if now is None else now
+    previous_key, current_key = _window_keys(scope, key, period, now)
+    previous = _cache().get(previous_key, 0)
+    current = _incr(current_key, period)
+    elapsed = (now % period) / period
+    # Compared as before this request, as a check-then-count would
+    if previous * (1 - elapsed) + current - 1 >= limit:
+        _incr(current_key, period, -1)
+        reject(scope)
+        return False, _wait(previous, current - 1, limit, period, now)
+    return True, 0
+
+
+def refund(scope, key, now=None):
+    """Take back one request counted by :func:`hit`."""
+    _, period = _rate(scope)
+    _incr(_window_keys(scope, key, period, time.time() if now is None else now)[1], period, -1)
+
+
+def reject(scope):
+    logger.warning("Rate limit %r refused a request", scope)
+    cache = _cache()
+    key = f"throttle:rejected:{scope}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def rejections():
+    """``{scope: refused requests}`` since the throttle cache was last cleared."""
+    counts = _cache().get_many([f"throttle:rejected:{scope}" for scope in SCOPES])
+    return {scope: counts.get(f"throttle:rejected:{scope}", 0) for scope in SCOPES}
+
+
+# --------------------- PER IP ---------------------
+def client_ip(request):
+    """
+    The client's address: ``REMOTE_ADDR``, or with ``NUM_PROXIES`` trusted
+    proxies in front, the X-Forwarded-For entry that many hops from the right.
+    Entries further left are client-supplied and never used.
+    """
+    return BaseThrottle().get_ident(request)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """DRF throttle counting every request per client IP against ``DEFAULT_THROTTLE_RATES[scope]``."""
+    scope = None
+
+    def allow_request(self, request, view):
+        allowed, self._wait = hit(self.scope, self.get_ident(request))
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoginRateThrottle(SlidingWindowThrottle):
+    scope = "login"
+
+
+class RegisterRateThrottle(SlidingWindowThrottle):
+    scope = "register"
+
+
+class OrderRateThrottle(SlidingWindowThrottle):
+    scope = "order"
+
+
+class ProofUploadRateThrottle(SlidingWindowThrottle):
+    scope = "proof_upload"
+
+
+def json_response(error):
+    """The 429 DRF's exception handler would build for ``error``, for views outside DRF."""
+    return JsonResponse({"detail": error.detail}, status=error.status_code, headers={"Retry-After": str(error.wait)})
+
+
+def throttled_response(request, throttle_classes):
+    """For views outside DRF: a 429 when a throttle refuses ``request``, else None."""
+    for throttle in (throttle_class() for throttle_class in throttle_classes):
+        # Later throttles are not consulted, so a refused request counts against no other limit
+        if not throttle.allow_request(request, None):
+            return json_response(exceptions.Throttled(throttle.wait()))
+    return None
+
+
+# --------------------- PER IDENTIFIER ---------------------
+async def athrottled_response(request, throttle_classes):
+    """:func:`throttled_response` for async views, with the cache calls off the event loop."""
+    return await sync_to_async(throttled_response, thread_sensitive=False)(request, throttle_classes)
+
+
+def login_attempt(identifier, ip):
+    """
+    Count a login attempt for ``identifier`` from ``ip`` before its password
+    is checked; raise Throttled once too many have failed lately. Returns the
+    key to pass to :func:`login_succeeded`.
+    """
+    # Hashed: identifiers are user input, and memcached keys allow no spaces or 250+ characters
+    identifier = hashlib.sha256(str(identifier or "").strip().lower().encode()).hexdigest()
+    key = f"{identifier}|{ip}"
+    allowed, wait = hit("login_failures", key)
+    if not allowed:
+        raise exceptions.Throttled(wait)
+    return key
+
+
+def login_succeeded(key):
+    refund("login_failures", key)
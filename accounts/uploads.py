@@ -0,0 +1,99 @@
+# accounts/uploads.py
+"""
+Size-capped, disk-streamed multipart uploads.
+
+:func:`limit_upload_size` swaps a request's upload handlers for a byte
+counter followed by Django's TemporaryFileUploadHandler, so file parts are
+streamed to a temporary file as they arrive (never held in memory) and the
+request is aborted as soon as either the declared Content-Length or the
+bytes actually received exceed the cap.
+
+Under ASGI, Django reads the whole request body before a view (or its
+throttles) runs, so those checks come too late to limit bytes.
+:func:`limit_request_body` wraps the ASGI application and answers 413 as soon
+as a body passes MAX_REQUEST_BODY_BYTES.
+"""
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Room for the non-file form fields and multipart framing around the file
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Upload too large."
+    default_code = "upload_too_large"
+
+
+class SizeLimitedUploadHandler(FileUploadHandler):
+    def __init__(self, max_bytes, request=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+
+    def too_large(self):
+        return UploadTooLarge(f"Uploads are limited to {self.max_bytes // (1024 * 1024)} MB.")
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Refuse before reading the body when the client already told us its size
+        if content_length and content_length > self.max_bytes + FORM_OVERHEAD:
+            raise self.too_large()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            raise self.too_large()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def limit_upload_size(request, max_bytes=None):
+    """Cap each uploaded file on ``request`` (a Django HttpRequest) at ``max_bytes``; call before touching FILES."""
+    if max_bytes is None:
+        max_bytes = settings.PROOF_OF_PAYMENT_MAX_BYTES
+    request.upload_handlers = [
+        SizeLimitedUploadHandler(max_bytes, request),
+        TemporaryFileUploadHandler(request),
+    ]
+
+
+async def _refuse(send, max_bytes):
+    body = json.dumps({"detail": f"Request bodies are limited to {max_bytes // (1024 * 1024)} MB."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def limit_request_body(app):
+    """Wrap the ASGI ``app`` so HTTP bodies over MAX_REQUEST_BODY_BYTES get a 413 while still arriving."""
+    async def limited(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        max_bytes = settings.MAX_REQUEST_BODY_BYTES
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > max_bytes:
+            return await _refuse(send, max_bytes)
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    await _refuse(send, max_bytes)
+                    # Django drops a request whose client went away, sending nothing itself
+                    return {"type": "http.disconnect"}
+            return message
+
+        return await app(scope, counted_receive, send)
+    return limited
@@ -1,23 +1,28 @@
 # accounts/urls.py
 from django.urls import path
-from . import views
+from . import async_views, views
 from .views import (
-    ProfileView, DashboardView, CashoutRequestCreateView,
-    MarketingMaterialsView, ProductListView, ProductDetailView,
-    GetAffiliateLinkView, PlaceOrderView
+    ProfileView, DashboardView, CashoutRequestCreateView, CashoutHistoryView,
+    MarketingMaterialsView, MarketingMaterialDownloadView, ProductListView, ProductDetailView,
+    GetAffiliateLinkView, AffiliateLinksView, AffiliateClickView, PlaceOrderView,
+    ProofUploadView,
 )
 
 urlpatterns = [
     path("register/", views.register_user, name="register"),
     path("login/", views.login_user, name="login"),
+    path("throttle-rejections/", views.throttle_rejections, name="throttle-rejections"),  # staff only
     path("profile/", ProfileView.as_view(), name="profile"),
     path("dashboard/", DashboardView.as_view(), name="dashboard"),
 
     # Cashout
     path("cashout/", CashoutRequestCreateView.as_view(), name="cashout-request"),
+    path("cashout/history/", CashoutHistoryView.as_view(), name="cashout-history"),
 
     # Marketing
     path("marketing-materials/", MarketingMaterialsView.as_view(), name="marketing-materials"),
+    path("marketing-materials/<int:pk>/download/", MarketingMaterialDownloadView.as_view(),
+         name="marketing-material-download"),  # public
 
     # Products (list + detail)
     path("products/", ProductListView.as_view(), name="product-list"),          # requires auth
@@ -25,7 +30,16 @@ urlpatterns = [
 
     # Affiliate links (requires auth)
     path("affiliate-link/<int:product_id>/", GetAffiliateLinkView.as_view(), name="get-affiliate-link"),
+    path("affiliate-links/", AffiliateLinksView.as_view(), name="affiliate-links"),
+    path("clicks/", AffiliateClickView.as_view(), name="affiliate-click"),  # public
 
     # Orders (public — customers place orders here)
     path("orders/", PlaceOrderView.as_view(), name="place-order"),
+    path("orders/proof-upload/", ProofUploadView.as_view(), name="proof-upload"),
+
+    # Async variants of the public endpoints, for ASGI deployments
+    path("async/products/<int:pk>/", async_views.product_detail, name="product-detail-async"),
+    path("async/orders/", async_views.place_order, name="place-order-async"),
+    path("async/login/", async_views.login, name="login-async"),
+    path("async/register/", async_views.register, name="register-async"),
 ]
@@ -0,0 +1,110 @@
+# accounts/variants.py
+"""
+Fixed-width WebP renditions of ``Product.picture`` and
+``CustomUser.profile_picture``.
+
+Variants are content-addressed: they live under
+``variants/<aa>/<sha256>/<width>w.webp``, so regenerating is idempotent, identical
+uploads share files, and a replaced picture can never be served stale
+variants. Once every width exists the digest is stored on the row
+(``picture_hash`` / ``profile_picture_hash``), which is all the serializers
+need to build their ``srcset`` maps without touching storage.
+
+Saving a new picture queues generation on the background pool; the
+``regenerate_image_variants`` command backfills existing media.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from . import background, catalogue, images
+from .models import CustomUser, Product
+
+# Image field per model; each has a ``<field>_hash`` sibling
+FIELDS = {Product: "picture", CustomUser: "profile_picture"}
+
+
+def widths():
+    return tuple(settings.IMAGE_VARIANT_WIDTHS)
+
+
+def extension():
+    return "webp" if images.WEBP_AVAILABLE else "jpg"
+
+
+def variant_name(digest, width):
+    return f"variants/{digest[:2]}/{digest}/{width}w.{extension()}"
+
+
+def srcset(fieldfile, digest, request=None):
+    """``{"320w": url, ...}`` for a picture whose variants exist, else ``{}``."""
+    if not digest:
+        return {}
+    storage = fieldfile.storage
+    urls = {f"{width}w": storage.url(variant_name(digest, width)) for width in widths()}
+    if request is not None:
+        urls = {key: request.build_absolute_uri(url) for key, url in urls.items()}
+    return urls
+
+
+def plan(fieldfile, force=False):
+    """``(digest, source bytes, widths still to render)`` for ``fieldfile``."""
+    with fieldfile.open("rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    missing = [
+        width for width in widths()
+        if force or not fieldfile.storage.exists(variant_name(digest, width))
+    ]
+    return digest, data, missing
+
+
+def store(storage, digest, renditions):
+    for width, (content, _) in renditions.items():
+        name = variant_name(digest, width)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(content))
+
+
+def record(model, pk, digest):
+    """Store ``digest`` as the row's picture hash, publishing its srcset."""
+    model.objects.filter(pk=pk).update(**{f"{FIELDS[model]}_hash": digest})
+    if model is Product:
+        catalogue.bump_version()  # cached catalogue payloads embed the srcset
+
+
+def refresh(model, pk, force=False):
+    """Make sure the variants of one row's picture exist and record its digest."""
+    instance = model.objects.filter(pk=pk).only(FIELDS[model]).first()
+    if instance is None:
+        return None
+    fieldfile = getattr(instance, FIELDS[model])
+
+    digest = ""
+    if fieldfile:
+        digest, data, missing = plan(fieldfile, force)
+        if missing:
+            store(fieldfile.storage, digest, images.widths(data, missing))
+    record(model, pk, digest)
+    return digest
+
+
+def needs_refresh(instance, update_fields=None):
+    """
+    Whether a save of ``instance`` needs its variants (re)built: call from
+    pre_save, while a fresh upload is still uncommitted.
+    """
+    field = FIELDS[type(instance)]
+    if update_fields is not None and field not in update_fields:
+        return False
+    fieldfile = getattr(instance, field)
+    digest = getattr(instance, f"{field}_hash")
+    if not fieldfile:
+        return bool(digest)  # picture removed: clear the srcset
+    return not fieldfile._committed or not digest
+
+
+def schedule(instance):
+    background.on_commit(refresh, type(instance), instance.pk)
@@ -1,9 +1,12 @@
 # accounts/views.py
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, generics, permissions
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework import status, generics, permissions, filters, serializers
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.db.models import Sum
 from decimal import Decimal
 
@@ -20,85 +23,32 @@ from .models import (
     MarketingMaterial, Product, AffiliateLink, Order
 )
 from rest_framework.permissions import IsAuthenticated
+from . import balances, catalogue, direct_uploads, throttling
+from .authentication import login_payload
+from .clicks import click_buffer, fingerprint
+from .downloads import download_counter, starts_download
+from .pagination import CashoutHistoryPagination, MarketingMaterialPagination, ProductPagination
+from .links import build_link, verify_token
+from .media import stored_file_response
+from .uploads import UploadTooLarge, limit_upload_size
 
 # --------------------- DASHBOARD ---------------------
-from collections import defaultdict
-from decimal import Decimal
-from django.db.models import Sum
+from .dashboard import build_dashboard, parse_series_params
 
 class DashboardView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
+        # Optional ?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month for the chart
+        params = parse_series_params(request.query_params)
 
-        # 1) High-level counters
-        total_earnings = user.balance
-        total_referrals = user.referral_made.count()
-
-        pending_withdrawals = Withdrawal.objects.filter(
-            user=user, status='pending'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        # ✔ Show the *available* commission
-        available_commission = user.commission_balance
-
-        # 2) Total approved cashout
-        total_cashout = CashoutRequest.objects.filter(
-            user=user, status='approved'
-        ).aggregate(total=Sum('net_amount'))['total'] or 0
-
-        # 3) Build running-balance history
-        events_by_date = defaultdict(Decimal)
-
-        # + commissions
-        for c in Commission.objects.filter(user=user).only("amount", "created_at"):
-            events_by_date[c.created_at.date()] += Decimal(c.amount)
-
-        # - cashouts (subtract requested_amount)
-        for co in CashoutRequest.objects.filter(user=user).exclude(status='rejected').only(
-            "requested_amount", "status", "created_at", "updated_at"
-        ):
-            date_for_event = co.created_at.date()
-            events_by_date[date_for_event] -= Decimal(co.requested_amount)
-
-        # turn events into a sorted running balance
-        history = []
-        running = Decimal("0.00")
-        for d in sorted(events_by_date.keys()):
-            running += events_by_date[d]
-            history.append({
-                "date": d.isoformat(),
-                "amount": float(running)
-            })
-
-        # 4) Keep pending_commissions for compatibility
-        pending_commissions = Commission.objects.filter(
-            user=user, status='pending'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        # 5) Cashout history
-        cashouts = CashoutRequest.objects.filter(user=user).order_by("-created_at")
-        cashout_history = [
-            {
-                "date": c.created_at.strftime("%Y-%m-%d"),
-                "requested": float(c.requested_amount),
-                "net": float(c.net_amount),
-                "status": c.status,
-            }
-            for c in cashouts
-        ]
-
-        return Response({
-            "total_earnings": total_earnings,
-            "total_referrals": total_referrals,
-            "pending_withdrawals": pending_withdrawals,
-            "pending_commissions": pending_commissions,
-            "available_commission": float(available_commission),
-            "total_cashout": float(total_cashout),
-            "commission_history": history,
-            "cashout_history": cashout_history,
-        })
+        # Counters, running balance and cashout history in a fixed query budget
+        return Response(build_dashboard(
+            request.user,
+            start=params["from"],
+            end=params["to"],
+            granularity=params["granularity"],
+        ))
 
 
 # --------------------- PRODUCTS & ORDERS ---------------------
@@ -111,55 +61,197 @@ class PlaceOrderView(generics.CreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.AllowAny]
     parser_classes = [MultiPartParser, FormParser]
+    # Checked in initial(), before request.data parses the upload
+    throttle_classes = [throttling.OrderRateThrottle]
+
+    def initial(self, request, *args, **kwargs):
+        # Stream proof_of_payment to disk and stop reading past the size cap
+        limit_upload_size(request._request)
+        super().initial(request, *args, **kwargs)
 
     # No perform_create override — serializer.create() handles affiliate lookup.
 
+
+class ProofUploadView(APIView):
+    """
+    Hand out a presigned slot for uploading proof_of_payment straight to the
+    media bucket; the order is then placed with the returned ``token`` as
+    ``proof_upload``. See accounts/direct_uploads.py.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [throttling.ProofUploadRateThrottle]
+
+    def post(self, request):
+        if not direct_uploads.enabled():
+            return Response({"detail": "Direct uploads are not enabled."}, status=status.HTTP_404_NOT_FOUND)
+
+        content_type = str(request.data.get("content_type") or "")
+        if content_type not in direct_uploads.CONTENT_TYPES:
+            return Response(
+                {"error": f"content_type must be one of: {', '.join(direct_uploads.CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            size = int(request.data.get("size") or 0)
+        except (TypeError, ValueError):
+            size = 0
+        max_bytes = settings.PROOF_OF_PAYMENT_MAX_BYTES
+        if size > max_bytes:
+            raise UploadTooLarge(f"Uploads are limited to {max_bytes // (1024 * 1024)} MB.")
+
+        return Response(direct_uploads.presign(content_type), status=status.HTTP_201_CREATED)
+
 class ProductListView(generics.ListAPIView):
     """
     Authenticated endpoint for affiliates to list products.
+    Paginated (?page= / ?page_size=, or ?paginate=cursor), searchable (?search=),
+    orderable (?ordering=price,-commission_amount) and trimmable (?fields=id,name).
+    Served from the catalogue cache with ETag/Last-Modified revalidation.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProductPagination
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ["name"]
+    ordering_fields = ["name", "price", "commission_amount"]
+    ordering = ["id"]
+
+    def list(self, request, *args, **kwargs):
+        return catalogue.cached_response(
+            request, lambda: super(ProductListView, self).list(request, *args, **kwargs).data,
+            public=False,
+        )
 
 
 class ProductDetailView(generics.RetrieveAPIView):
     """
     Public product detail view so customers can view product info without login.
+    Served from the catalogue cache with ETag/Last-Modified revalidation.
     URL: /api/accounts/products/<pk>/
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        return catalogue.cached_response(
+            request, lambda: super(ProductDetailView, self).retrieve(request, *args, **kwargs).data
+        )
+
 
 class GetAffiliateLinkView(generics.RetrieveAPIView):
+    """
+    The caller's link for one product. Links are derived, not stored, so this
+    never writes a row (``id`` is null); see accounts/links.py.
+    """
     serializer_class = AffiliateLinkSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_url_kwarg = "product_id"
 
     def get_object(self):
-        product_id = self.kwargs.get("product_id")
-        product = Product.objects.get(id=product_id)
-        link, created = AffiliateLink.objects.get_or_create(
-            user=self.request.user, product=product
+        product = get_object_or_404(Product, pk=self.kwargs.get("product_id"))
+        return AffiliateLink(
+            user_id=self.request.user.pk,
+            product=product,
+            link=build_link(self.request.user.username, product.pk),
         )
-        return link
 
 
+class AffiliateLinksView(APIView):
+    """The caller's links for every product in one response."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        username = request.user.username
+        return Response([
+            {"product_id": product_id, "product_name": name, "link": build_link(username, product_id)}
+            for product_id, name in Product.objects.order_by("id").values_list("id", "name")
+        ])
+
+
+
+class AffiliateClickView(APIView):
+    """
+    Record a visit through an affiliate link (``ref``, ``product`` and the
+    link's ``t`` token). Clicks are buffered and written in batches (see
+    accounts/clicks.py), so this answers 202 without touching the database.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        ref = str(request.data.get("ref") or "")
+        try:
+            product_id = int(request.data.get("product"))
+        except (TypeError, ValueError):
+            return Response({"error": "A valid product id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not verify_token(ref, product_id, str(request.data.get("t") or "")):
+            return Response({"error": "Invalid affiliate link"}, status=status.HTTP_400_BAD_REQUEST)
+
+        recorded = click_buffer.record(ref, product_id, fingerprint(request))
+        return Response({"recorded": recorded}, status=status.HTTP_202_ACCEPTED)
+
 # --------------------- MARKETING MATERIALS ---------------------
 class MarketingMaterialsView(APIView):
+    """
+    Marketing materials grouped by type: ``{"image": [...], "video": [...], "pdf": [...]}``.
+
+    ``?since=<ISO datetime>`` keeps only materials uploaded after it, so
+    clients can sync just what is new (deletions are not reported; refetch
+    without it to reconcile). ``?type=image|video|pdf`` returns one type,
+    newest first and keyset-paginated (``page_size``, ``cursor``). Served from
+    the cache until a material changes, with ETag/Last-Modified revalidation.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        materials = MarketingMaterial.objects.all().order_by("-uploaded_at")
-        serializer = MarketingMaterialSerializer(materials, many=True)
+        return catalogue.cached_response(
+            request, lambda: self.build(request), public=False, namespace=catalogue.MARKETING
+        )
 
-        grouped = {"image": [], "video": [], "pdf": []}
-        for item in serializer.data:
+    def build(self, request):
+        materials = MarketingMaterial.objects.order_by("-uploaded_at", "-id")
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since = serializers.DateTimeField().to_internal_value(since)
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({"since": exc.detail})
+            materials = materials.filter(uploaded_at__gt=since)
+
+        material_type = request.query_params.get("type")
+        if material_type:
+            if material_type not in dict(MarketingMaterial.MATERIAL_TYPES):
+                raise serializers.ValidationError({"type": f'"{material_type}" is not a material type.'})
+            paginator = MarketingMaterialPagination()
+            page = paginator.paginate_queryset(materials.filter(material_type=material_type), request, self)
+            return paginator.get_paginated_response(MarketingMaterialSerializer(page, many=True).data).data
+
+        grouped = {material_type: [] for material_type, _ in MarketingMaterial.MATERIAL_TYPES}
+        for item in MarketingMaterialSerializer(materials, many=True).data:
             grouped[item["material_type"]].append(item)
+        return grouped
 
-        return Response(grouped)
+
+class MarketingMaterialDownloadView(APIView):
+    """
+    Download one material's file with HTTP Range support, so interrupted
+    downloads resume where they stopped (accounts/media.py). Whole-file
+    responses go out through the server's sendfile path or MEDIA_SERVING
+    offload. Public like the media URLs themselves, so plain links work.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, pk):
+        material = get_object_or_404(MarketingMaterial.objects.only("file"), pk=pk)
+        response = stored_file_response(request._request, material.file, as_attachment=True)
+        if starts_download(request, response):
+            download_counter.record(material.pk)
+        return response
 
 
 # --------------------- CASHOUT ---------------------
@@ -167,6 +259,19 @@ MINIMUM_CASHOUT_THRESHOLD = Decimal('5000.00')
 PROCESSING_FEE = Decimal('1000.00')
 
 
+class CashoutHistoryView(generics.ListAPIView):
+    """
+    The caller's cashout requests, newest first, keyset-paginated.
+    ?page_size=N (max 100) and the opaque ?cursor= from the previous page's "next".
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = CashoutRequestSerializer
+    pagination_class = CashoutHistoryPagination
+
+    def get_queryset(self):
+        return CashoutRequest.objects.filter(user_id=self.request.user.pk)
+
+
 class CashoutRequestCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CashoutRequestSerializer
@@ -174,11 +279,12 @@ class CashoutRequestCreateView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         user = request.user
 
-        # ✅ NEW: handle action=history
+        # ✅ Legacy action=history: first page only, follow "next" on cashout/history/
         action = request.data.get("action")
         if action == "history":
-            cashout_history = CashoutRequest.objects.filter(user=user).order_by('-created_at')
-            serializer = CashoutRequestSerializer(cashout_history, many=True)
+            paginator = CashoutHistoryPagination()
+            page = paginator.paginate_queryset(CashoutRequest.objects.filter(user=user), request, view=self)
+            serializer = CashoutRequestSerializer(page, many=True)
 
             total_cashout = CashoutRequest.objects.filter(
                 user=user, status='approved'
@@ -188,6 +294,7 @@ class CashoutRequestCreateView(generics.CreateAPIView):
                 "commission_balance": user.commission_balance,
                 "total_cashout": float(total_cashout),
                 "cashout_history": serializer.data,
+                "next": paginator.get_next_link(reverse("cashout-history")),
             })
 
         # ✅ Normal POST
@@ -207,30 +314,26 @@ class CashoutRequestCreateView(generics.CreateAPIView):
 
         net_amount = requested_amount - PROCESSING_FEE
 
-        cashout_request = CashoutRequest.objects.create(
-            user=user,
-            requested_amount=requested_amount,
-            processing_fee=PROCESSING_FEE,
-            net_amount=net_amount,
-            status='pending',
-        )
-
-        # Deduct requested amount immediately
-        user.commission_balance -= requested_amount
-        user.save()
-
-        # Return updated balance + history
-        cashout_history = CashoutRequest.objects.filter(user=user).order_by('-created_at')
-        serializer = CashoutRequestSerializer(cashout_history, many=True)
-
-        total_cashout = CashoutRequest.objects.filter(
-            user=user, status='approved'
-        ).aggregate(total=Sum('net_amount'))['total'] or 0
-
+        with transaction.atomic():
+            # Deduct requested amount immediately; the guarded UPDATE fails if a
+            # concurrent request already spent the balance
+            if not balances.debit(user.pk, requested_amount):
+                return Response({"detail": "Requested amount exceeds commission balance."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            cashout_request = CashoutRequest.objects.create(
+                user=user,
+                requested_amount=requested_amount,
+                processing_fee=PROCESSING_FEE,
+                net_amount=net_amount,
+                status='pending',
+            )
+        user.refresh_from_db(fields=["commission_balance"])
+
+        # Return the new request + updated balance; history lives on cashout/history/
         return Response({
             "commission_balance": user.commission_balance,
-            "total_cashout": float(total_cashout),
-            "cashout_history": serializer.data,
+            "cashout": CashoutRequestSerializer(cashout_request).data,
         }, status=status.HTTP_201_CREATED)
 
 
@@ -240,29 +343,25 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ProfileSerializer
 
     def get_object(self):
+        # Reads may be authenticated from token claims alone (accounts/authentication.py);
+        # show a fresh row rather than a cached one
+        if self.request.method in permissions.SAFE_METHODS:
+            return CustomUser.objects.get(pk=self.request.user.pk)
         return self.request.user
 
 
 # --------------------- AUTH ---------------------
 @api_view(["POST"])
+@throttle_classes([throttling.LoginRateThrottle])
 def login_user(request):
-    serializer = LoginSerializer(data=request.data)
+    serializer = LoginSerializer(data=request.data, context={"request": request})
     if serializer.is_valid():
-        user = serializer.validated_data["user"]
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-            "user": {
-                "username": user.username,
-                "email": user.email,
-                "phone": user.phone,
-            }
-        })
+        return Response(login_payload(serializer.validated_data["user"]))
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(["POST"])
+@throttle_classes([throttling.RegisterRateThrottle])
 def register_user(request):
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
@@ -272,3 +371,10 @@ def register_user(request):
             status=status.HTTP_201_CREATED
         )
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def throttle_rejections(request):
+    """Requests refused by the rate limits in accounts/throttling.py, per scope."""
+    return Response(throttling.rejections())
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bjsolutions.settings")
 
 application = get_asgi_application()
+
+# Imported once Django is set up; caps request bodies before Django spools them
+from accounts.uploads import limit_request_body  # noqa: E402
+
+application = limit_request_body(application)
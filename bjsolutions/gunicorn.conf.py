@@ -0,0 +1,54 @@
+"""
+Gunicorn configuration (used by the Procfile: ``gunicorn -c bjsolutions/gunicorn.conf.py``).
+
+SERVER_MODE selects the deployment:
+
+* ``asgi`` (default): ``bjsolutions.asgi`` on uvicorn workers. Each worker is
+  an event loop, so slow clients (e.g. a customer trickling a
+  ``proof_of_payment`` upload over a mobile connection) wait as idle
+  coroutines instead of holding a worker. Pair with the async endpoints under
+  ``/api/accounts/async/`` (accounts/async_views.py). Django reads the whole
+  body before any view or throttle runs, so ``bjsolutions.asgi`` refuses
+  bodies over MAX_REQUEST_BODY_BYTES as they arrive (accounts/uploads.py).
+* ``wsgi``: ``bjsolutions.wsgi`` on classic sync workers, one request per
+  worker at a time. Kept as the fallback.
+
+Without gunicorn (e.g. on Windows or for local testing), the ASGI app runs
+directly under uvicorn:
+
+    uvicorn bjsolutions.asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+``benchmark_uploads`` compares the two modes under concurrent slow uploads.
+
+NUM_PROXIES is required here: the number of proxies (platform router, load
+balancer, CDN) that append to X-Forwarded-For in front of the app, 0 if
+clients connect directly. The rate limits and click dedup key on the client
+IP it selects (accounts/throttling.py); behind a router with the default of
+0, every request would share the router's address and one limit.
+"""
+import multiprocessing
+import os
+
+if "NUM_PROXIES" not in os.environ:
+    raise RuntimeError(
+        "Set NUM_PROXIES to the number of proxies in front of the app (e.g. 1 behind the platform "
+        "router, 0 if none); per-IP rate limits depend on it."
+    )
+
+SERVER_MODE = os.getenv("SERVER_MODE", "asgi")
+
+if SERVER_MODE == "wsgi":
+    wsgi_app = "bjsolutions.wsgi:application"
+    worker_class = "sync"
+else:
+    wsgi_app = "bjsolutions.asgi:application"
+    # uvicorn.workers is deprecated; the worker now ships as the uvicorn-worker package
+    worker_class = "uvicorn_worker.UvicornWorker"
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# (2 x cores) + 1 by default; platforms such as Heroku set WEB_CONCURRENCY per dyno size
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
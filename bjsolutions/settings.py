@@ -1,6 +1,9 @@
 import os
+from decimal import Decimal
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
+from django.conf import global_settings
 from datetime import timedelta
 
 # Load environment variables
@@ -103,6 +106,33 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# Password hashing (accounts/hashers.py). PASSWORD_HASHER picks the algorithm
+# for new hashes; the others stay listed so existing hashes keep verifying and
+# are upgraded on the next login. The defaults are Django's (OWASP minimums):
+# scrypt is memory-hard and cheaper in CPU than PBKDF2's million iterations
+# (benchmark_login); argon2 needs argon2-cffi.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "scrypt")
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", 2 ** 14))
+PASSWORD_SCRYPT_PARALLELISM = int(os.getenv("PASSWORD_SCRYPT_PARALLELISM", 5))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", 19 * 1024))  # KiB
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 1_000_000))
+_PASSWORD_HASHERS = {
+    "scrypt": "accounts.hashers.ScryptPasswordHasher",
+    "argon2": "accounts.hashers.Argon2PasswordHasher",
+    "pbkdf2": "accounts.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    # Django's other defaults (pbkdf2_sha1, bcrypt_sha256), so those hashes
+    # verify too; the ones tuned above replace their same-named base class
+    hasher for hasher in global_settings.PASSWORD_HASHERS
+    if hasher.rsplit(".", 1)[1] not in {tuned.rsplit(".", 1)[1] for tuned in _PASSWORD_HASHERS.values()}
+]
+# Threads hashing passwords for the async login/register views (0 = one per CPU)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+
 # Custom User model
 AUTH_USER_MODEL = "accounts.CustomUser"
 
@@ -113,13 +143,120 @@ USE_I18N = True
 USE_TZ = True
 
 # Static files
+# collectstatic fingerprints and pre-compresses everything, including the
+# Frontend/ pages and their JS/CSS (served at /static/Frontend/...); see
+# bjsolutions/storage.py. WhiteNoise serves hashed files as immutable.
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
-STATICFILE_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STATICFILES_DIRS = [("Frontend", BASE_DIR / "Frontend")]
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # Proofs of payment; kept apart so object storage can sign their URLs
+    "proofs": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "bjsolutions.storage.FrontendStaticFilesStorage"},
+}
 
 # Media files
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# How /media/ is answered (accounts/media.py): "django" streams the file with
+# Range and conditional-GET support; "x-accel-redirect" (nginx) and
+# "x-sendfile" (Apache/lighttpd) hand the transfer to the front-end server
+MEDIA_SERVING = os.getenv("MEDIA_SERVING", "django")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+
+# MEDIA_STORAGE=s3 moves uploads to an S3-compatible bucket (AWS, R2, MinIO...)
+# through django-storages; credentials come from AWS_ACCESS_KEY_ID and
+# AWS_SECRET_ACCESS_KEY. Catalogue media gets plain URLs (put a CDN on
+# AWS_S3_CUSTOM_DOMAIN), proofs of payment get short-lived signed URLs and
+# can be uploaded straight to the bucket (accounts/direct_uploads.py; the
+# bucket's CORS rules must allow POST from the frontend origin).
+# copy_media_to_storage moves existing files across.
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+if MEDIA_STORAGE == "s3":
+    S3_MEDIA_OPTIONS = {
+        "bucket_name": os.getenv("AWS_STORAGE_BUCKET_NAME"),
+        "region_name": os.getenv("AWS_S3_REGION_NAME"),
+        "endpoint_url": os.getenv("AWS_S3_ENDPOINT_URL") or None,
+        "location": os.getenv("AWS_LOCATION", "media"),
+        "file_overwrite": False,
+    }
+    STORAGES["default"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            **S3_MEDIA_OPTIONS,
+            "custom_domain": os.getenv("AWS_S3_CUSTOM_DOMAIN") or None,
+            "querystring_auth": False,
+        },
+    }
+    STORAGES["proofs"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {**S3_MEDIA_OPTIONS, "querystring_auth": True, "querystring_expire": 15 * 60},
+    }
+
+# Keys the permutation behind referral codes (accounts/referral_codes.py), at
+# most 64 bytes. Never change it once codes have been issued: codes could repeat
+REFERRAL_CODE_KEY = os.getenv("REFERRAL_CODE_KEY", "bjsolutions-referral-codes")
+
+# Multi-level referral commissions (accounts/approvals.py): the share of an
+# order's commission paid to the affiliate's referrer, their referrer, and so
+# on up the tree; the affiliate keeps the rest. e.g. "0.10,0.05". Empty: none
+REFERRAL_COMMISSION_RATES = [
+    Decimal(rate) for rate in os.getenv("REFERRAL_COMMISSION_RATES", "").split(",") if rate.strip()
+]
+
+# Welcome emails on approval (accounts/onboarding.py); set EMAIL_BACKEND to
+# django.core.mail.backends.smtp.EmailBackend plus the EMAIL_* settings to send them
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 25))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "false").lower() == "true"
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+
+# Threads for off-request work such as image re-encoding (accounts/background.py);
+# 0 runs the work inline after the triggering transaction commits
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 2))
+
+# Proof-of-payment uploads: hard size cap, then a background re-encode to at
+# most this many pixels per side plus an admin thumbnail (accounts/proofs.py)
+PROOF_OF_PAYMENT_MAX_BYTES = int(os.getenv("PROOF_OF_PAYMENT_MAX_BYTES", 10 * 1024 * 1024))
+PROOF_OF_PAYMENT_MAX_DIMENSION = 1600
+# Largest request body the ASGI app accepts (bjsolutions/asgi.py). Django reads
+# the whole body before any view or throttle runs, so this is the only cap on
+# what a client can make it spool; it covers admin uploads too
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", PROOF_OF_PAYMENT_MAX_BYTES + 1024 * 1024))
+PROOF_THUMBNAIL_SIZE = 160
+
+# Fixed-width WebP renditions of product and profile pictures (accounts/variants.py)
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1024)
+
+# Caches
+# The catalogue cache must be shared by every worker process so a Product
+# change invalidates it everywhere: file-based by default, or point
+# CATALOGUE_CACHE_BACKEND/CATALOGUE_CACHE_LOCATION at Redis/Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "bjsolutions-default"),
+    },
+    "catalogue": {
+        "BACKEND": os.getenv("CATALOGUE_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv(
+            "CATALOGUE_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "bjsolutions-catalogue")
+        ),
+    },
+    # Rate limit counters (accounts/throttling.py); use a shared store such as
+    # Redis so limits hold across workers
+    "throttle": {
+        "BACKEND": os.getenv("THROTTLE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("THROTTLE_CACHE_LOCATION", "bjsolutions-throttle"),
+    },
+}
+CATALOGUE_CACHE_ALIAS = "catalogue"
+THROTTLE_CACHE_ALIAS = "throttle"
+CATALOGUE_CACHE_TIMEOUT = 60 * 60
 
 # CORS for local frontend
 CORS_ALLOW_ALL_ORIGINS = True  # ✅ Important for JS fetch
@@ -127,11 +264,27 @@ CORS_ALLOW_ALL_ORIGINS = True  # ✅ Important for JS fetch
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # simplejwt tokens; reads trust the claims instead of loading the user
+        "accounts.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",  # ✅ Allow login without auth
     ),
+    # Proxies in front of the app that append to X-Forwarded-For. The client IP
+    # (throttling, click dedup) is taken that many hops from the right; with 0
+    # it is REMOTE_ADDR and the client-supplied header is ignored.
+    # PRODUCTION: behind a platform router this must be 1 (or more), or every
+    # request shares the router's address and the per-IP limits become
+    # site-wide. bjsolutions/gunicorn.conf.py refuses to start without it.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+    # Per client IP, except login_failures (per identifier); see accounts/throttling.py
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.getenv("THROTTLE_LOGIN_RATE", "30/m"),
+        "login_failures": os.getenv("THROTTLE_LOGIN_FAILURES_RATE", "10/15m"),
+        "register": os.getenv("THROTTLE_REGISTER_RATE", "20/h"),
+        "order": os.getenv("THROTTLE_ORDER_RATE", "60/h"),
+        "proof_upload": os.getenv("THROTTLE_PROOF_UPLOAD_RATE", "30/h"),
+    },
 }
 
 # Simple JWT
@@ -142,5 +295,22 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# Per-process cache of users loaded by ClaimsJWTAuthentication (seconds; 0 disables)
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 30))
+
+# Affiliate links are built from this base (see accounts/links.py)
+AFFILIATE_LINK_BASE_URL = os.getenv("AFFILIATE_LINK_BASE_URL", "http://127.0.0.1:8000")
+
+# Affiliate click buffering (see accounts/clicks.py): flush after this many
+# events or seconds, and drop repeat clicks from one visitor within the window
+CLICK_BUFFER_SIZE = int(os.getenv("CLICK_BUFFER_SIZE", 500))
+CLICK_FLUSH_INTERVAL = float(os.getenv("CLICK_FLUSH_INTERVAL", 5))
+CLICK_DEDUP_WINDOW = int(os.getenv("CLICK_DEDUP_WINDOW", 30 * 60))
+
+# Marketing material download counts (see accounts/downloads.py): written
+# after this many downloads or seconds
+DOWNLOAD_BUFFER_SIZE = int(os.getenv("DOWNLOAD_BUFFER_SIZE", 100))
+DOWNLOAD_FLUSH_INTERVAL = float(os.getenv("DOWNLOAD_FLUSH_INTERVAL", 10))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
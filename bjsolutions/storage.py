@@ -0,0 +1,45 @@
+"""
+Static files storage for ``collectstatic``.
+
+WhiteNoise's CompressedManifestStaticFilesStorage gives every file a
+content-hashed name (served with a one-year ``immutable`` Cache-Control) and
+pre-compresses it to .gz and .br. On top of that, the Frontend/ pages are
+treated as entry points: their ``<script src>``, ``<link href>`` and
+``<img src>`` references are rewritten to the hashed asset names, and the
+rewritten page is also stored under its plain name (e.g.
+``Frontend/products.html``) so it keeps a stable, briefly-cached URL while
+everything it loads is fingerprinted.
+"""
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+FRONTEND_PREFIX = "Frontend/"
+
+
+class FrontendPagesMixin(ManifestStaticFilesStorage):
+    patterns = ManifestStaticFilesStorage.patterns + (
+        ("*.html", (
+            (
+                r"""(?P<matched>(?P<head><(?:script|link|img)\b[^>]*?\b(?:src|href)=(?P<quote>["']))"""
+                r"""(?P<url>[^"']+)(?P=quote))""",
+                "%(head)s%(url)s%(quote)s",
+            ),
+        )),
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Runs before WhiteNoise compresses, so the .gz/.br copies match
+        for name in paths:
+            if name.startswith(FRONTEND_PREFIX) and name.endswith(".html"):
+                with self.open(self.stored_name(name)) as rewritten:
+                    content = rewritten.read()
+                self.delete(name)
+                self._save(name, ContentFile(content))
+
+
+class FrontendStaticFilesStorage(CompressedManifestStaticFilesStorage, FrontendPagesMixin):
+    pass